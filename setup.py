@@ -3,16 +3,23 @@ from setuptools import setup, find_packages
 setup(
     name="autrade",
     version="0.1.0",
-    packages=find_packages(),
+    package_dir={"": "src"},
+    packages=find_packages("src"),
     install_requires=[
         "aiohttp",
+        "numpy",
         "pandas",
         "ta",
         "python-telegram-bot",
         "python-binance",
-        "matplotlib",
-        "seaborn"
+        "python-dotenv",
+        "pillow"
     ],
+    extras_require={
+        "jit": ["numba"],
+        "rules": ["pyyaml"],
+        "dataset": ["pyarrow"]
+    },
     author="Your Name",
     author_email="your.email@example.com",
     description="""
@@ -98,4 +105,9 @@ setup(
         "Operating System :: OS Independent",
     ],
     python_requires=">=3.7",
+    entry_points={
+        "console_scripts": [
+            "autrade=autrade.cli:main",
+        ],
+    },
 ) 
\ No newline at end of file
@@ -0,0 +1,425 @@
+"""
+Command line entry point: ``autrade run`` starts the bot, the other
+subcommands are offline tools that never touch the exchange.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+
+
+def _run(args: argparse.Namespace) -> int:
+    from .main import main
+
+    if not args.record:
+        main()
+        return 0
+
+    from .services.replay import SessionRecorder
+    os.makedirs(os.path.dirname(args.record) or ".", exist_ok=True)
+    recorder = SessionRecorder(args.record)
+    try:
+        main(prepare=recorder.attach)
+    finally:
+        recorder.close()
+    return 0
+
+
+def _use_workdir_journals(bot, workdir: str) -> None:
+    """Keep the journals of a scratch run (one per hosted strategy) inside ``workdir``"""
+    for member in getattr(bot, "bots", [bot]):
+        member.csv_file = os.path.join(workdir, os.path.basename(member.csv_file))
+        member._ensure_csv_exists()
+
+
+def _replay(args: argparse.Namespace) -> int:
+    from .services.replay import SessionReplayer
+
+    replayer = SessionReplayer(args.recording, args.pace, args.speed, args.max_seconds)
+
+    # A clean scratch area, so replays start alike and never touch live state
+    shutil.rmtree(args.workdir, ignore_errors=True)
+    os.makedirs(args.workdir)
+    os.environ["BOT_MODE"] = replayer.header.get("bot_mode", "DEMO")
+    os.environ["STATE_DIR"] = os.path.join(args.workdir, "state")
+    os.environ["MARKET_CACHE_PATH"] = os.path.join(args.workdir, "market.pkl")
+    os.environ["TRACE_DIR"] = os.path.join(args.workdir, "traces")
+    # Virtual time cannot wait on worker processes or live sockets, and
+    # neither would be served from the recording
+    os.environ["SCAN_WORKERS"] = "0"
+    os.environ["ORDER_BOOK_ENABLED"] = "false"
+
+    from .config.settings import load_log_config
+    from .main import create_bot
+    from .utils.clock import run_virtual
+    from .utils.log import setup_logging
+
+    async def replay():
+        bot = create_bot()
+        _use_workdir_journals(bot, args.workdir)
+        replayer.attach(bot)
+        try:
+            return await replayer.run(bot)
+        finally:
+            bot.shutdown()
+
+    log_config = load_log_config()
+    listener = setup_logging(log_config.level, os.path.join(args.workdir, "replay.jsonl"), repeat_window=0)
+    try:
+        # Bot sleeps pass in virtual time, from where the recording started
+        summary = run_virtual(replay(), replayer.header.get("started"))
+    finally:
+        listener.stop()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+def _simulate(args: argparse.Namespace) -> int:
+    from .utils.clock import clock, run_virtual
+
+    shutil.rmtree(args.workdir, ignore_errors=True)
+    os.makedirs(args.workdir)
+    os.environ["BOT_MODE"] = "DEMO"
+    os.environ["STATE_DIR"] = os.path.join(args.workdir, "state")
+    os.environ["MARKET_CACHE_PATH"] = os.path.join(args.workdir, "market.pkl")
+    os.environ["TRACE_DIR"] = os.path.join(args.workdir, "traces")
+    # Virtual time cannot wait on worker processes or live sockets
+    os.environ["SCAN_WORKERS"] = "0"
+    os.environ["ORDER_BOOK_ENABLED"] = "false"
+
+    from .config.settings import load_log_config
+    from .main import create_bot
+    from .services.sim_market import SimulatedMarket
+    from .utils.log import setup_logging
+
+    start = time.mktime(time.strptime(args.start, "%Y-%m-%d"))
+
+    async def simulate():
+        market = SimulatedMarket(args.symbols, args.seed, clock.time())
+        bot = create_bot()
+        _use_workdir_journals(bot, args.workdir)
+        market.attach(bot)
+        try:
+            return await market.run(bot, args.days)
+        finally:
+            bot.shutdown()
+
+    log_config = load_log_config()
+    listener = setup_logging(log_config.level, os.path.join(args.workdir, "simulate.jsonl"), repeat_window=0)
+    try:
+        summary = run_virtual(simulate(), start)
+    finally:
+        listener.stop()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+def _analytics(args: argparse.Namespace) -> int:
+    from .services.analytics import DIMENSIONS, TradeAnalytics, format_table
+
+    by = [d.strip() for d in args.by.split(",") if d.strip()]
+    unknown = [d for d in by if d not in DIMENSIONS]
+    if not by or unknown:
+        print(f"--by takes a comma-separated list of: {', '.join(DIMENSIONS)}", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    analytics = TradeAnalytics(args.journal, args.cache)
+    if not args.rebuild:
+        analytics.load()
+    added = analytics.refresh()
+    if added:
+        analytics.save()
+    rows = analytics.query(by, args.min_trades)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(format_table(rows, by, args.sort))
+    print(f"\n{analytics.rows} trades ({added} new) in {elapsed_ms:.0f} ms")
+    return 0
+
+
+def _montecarlo(args: argparse.Namespace) -> int:
+    from .config.settings import load_config
+    from .services import monte_carlo
+
+    returns = monte_carlo.load_returns(args.journal, args.mode)
+    if len(returns) < args.min_trades:
+        print(f"{len(returns)} trades in {args.journal}; at least {args.min_trades} are needed", file=sys.stderr)
+        return 2
+
+    config = load_config()
+    started = time.perf_counter()
+    result = monte_carlo.simulate(
+        returns,
+        balance=float(config.fixed_usdt_balance) if args.balance is None else args.balance,
+        leverage=config.trading.leverage if args.leverage is None else args.leverage,
+        fraction=config.trading.usdt_percentage if args.fraction is None else args.fraction,
+        trades=args.trades,
+        paths=args.paths,
+        ruin=args.ruin,
+        seed=args.seed
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(monte_carlo.format_report(result))
+    print(f"\nSimulated in {elapsed_ms:.0f} ms")
+    if args.image:
+        from .utils.report import create_risk_report
+
+        create_risk_report(result, args.image, mode=f"Monte Carlo {args.mode or config.trading.mode}")
+        print(f"Report image written to {args.image}")
+    return 0
+
+
+def _indicators(args: argparse.Namespace) -> int:
+    from .services import indicators
+
+    report = indicators.parity(args.parity_symbols, args.bars)
+    print(f"Parity with the ta library ({args.parity_symbols} symbols x {args.bars} bars, max relative error):")
+    names = list(next(iter(report.values())))
+    print("backend  " + "  ".join(f"{n:>10}" for n in names))
+    failed = False
+    for backend, errors in report.items():
+        print(f"{backend:<7}  " + "  ".join(f"{errors[n]:>10.1e}" for n in names))
+        failed |= any(e > args.tolerance for e in errors.values())
+
+    universes = [int(u) for u in args.universe.split(",") if u.strip()]
+    rows = indicators.benchmark(universes, args.bars)
+    backends = indicators.available_backends()
+    print(f"\nIndicators for a whole universe, ms ({args.bars} bars; ta scaled from a sample):")
+    print("symbols  " + "  ".join(f"{n:>10}" for n in ["ta"] + backends) + "  " + "  ".join(f"{'x ' + n:>10}" for n in backends))
+    for row in rows:
+        print(
+            f"{row['symbols']:>7}  " + "  ".join(f"{row[n]:>10.1f}" for n in ["ta"] + backends)
+            + "  " + "  ".join(f"{row['ta'] / row[n]:>10.0f}" for n in backends)
+        )
+    if not indicators.HAVE_NUMBA:
+        print("\nnumba is not installed; pip install numba for the JIT backend")
+    if failed:
+        print(f"\nParity FAILED: error above {args.tolerance:g}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _rules(args: argparse.Namespace) -> int:
+    from .services import signal_rules
+
+    try:
+        rules = signal_rules.load_rules(args.file or "")
+    except (OSError, ValueError) as e:
+        print(f"Cannot load signal rules: {e}", file=sys.stderr)
+        return 2
+    for rule_set in rules.values():
+        print(signal_rules.describe(rule_set))
+
+    report = signal_rules.parity(args.symbols, args.bars)
+    print(f"\nBuilt-in rules against the signal kernels ({args.symbols} symbols x {args.bars} bars):")
+    print("backend  mode            long   short  mismatches   rules ms  kernel ms")
+    failed = False
+    for backend, modes in report.items():
+        for mode, row in modes.items():
+            print(
+                f"{backend:<7}  {mode:<12}  {row['long']:>6}  {row['short']:>6}  {row['mismatches']:>10}"
+                f"  {row['rules_ms']:>9.1f}  {row['kernel_ms']:>9.1f}"
+            )
+            failed |= row["mismatches"] > 0
+    if failed:
+        print("\nParity FAILED: rules and kernels disagree", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _orderbook(args: argparse.Namespace) -> int:
+    from .services.order_book import sync_check
+
+    report = asyncio.run(sync_check(args.events, args.gap_every, depth=args.depth, seed=args.seed))
+    print(json.dumps(report, indent=2))
+    if report["mismatches"] or not report["compared"]:
+        print("\nOrder book check FAILED: the local book diverged from the stream", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _dataset(args: argparse.Namespace) -> int:
+    from .services.dataset_export import HistoryStore, export
+
+    store = HistoryStore(args.history, args.interval)
+    if args.import_cache:
+        imported = store.import_market_cache(args.import_cache)
+        print(f"Imported {len(imported)} series from {args.import_cache}")
+    if args.simulate_days:
+        start = time.mktime(time.strptime(args.start, "%Y-%m-%d")) if args.start else None
+        imported = store.import_simulated(args.symbols, args.seed, start, args.simulate_days)
+        print(f"Wrote {sum(imported.values())} simulated bars for {len(imported)} symbols to {args.history}")
+    if not store.symbols():
+        print(f"No {args.interval} history in {args.history}; use --import-cache or --simulate-days", file=sys.stderr)
+        return 2
+
+    try:
+        manifest = export(
+            args.history,
+            args.out,
+            interval=args.interval,
+            symbols=[s.strip() for s in args.only.split(",") if s.strip()] if args.only else None,
+            journal=args.journal,
+            horizons=[int(h) for h in args.horizons.split(",") if h.strip()],
+            context=args.context,
+            chunk_bars=args.chunk_bars,
+            workers=args.workers,
+            fmt=args.format,
+            rules_file=args.rules_file
+        )
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    rate = manifest["rows"] / manifest["seconds"] if manifest["seconds"] else 0.0
+    print(
+        f"{manifest['rows']} rows from {manifest['symbols']} symbols in {len(manifest['shards'])} "
+        f"{manifest['format']} shards, {manifest['seconds']:.1f}s ({rate:,.0f} rows/s) -> {args.out}"
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="autrade", description="Automated crypto futures trading bot")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="start the trading bot")
+    run.add_argument("--record", metavar="PATH", help="also record all exchange and Telegram calls to PATH")
+    run.set_defaults(handler=_run)
+
+    replay = commands.add_parser(
+        "replay",
+        help="run the bot against a recorded session, without network",
+        description="Serve a recording made with 'autrade run --record' back to the bot."
+    )
+    replay.add_argument("recording", help="recording file (.jsonl.gz)")
+    replay.add_argument("--pace", choices=["fast", "recorded"], default="fast",
+                        help="return responses immediately or at their recorded times (default: fast)")
+    replay.add_argument("--speed", type=float, default=1.0, help="time compression for --pace recorded")
+    replay.add_argument("--max-seconds", type=float,
+                        help="stop after this many seconds of session time (default: recording length + 60)")
+    replay.add_argument("--workdir", default="data/replay", help="scratch directory for state, journal and logs")
+    replay.set_defaults(handler=_replay)
+
+    simulate = commands.add_parser(
+        "simulate",
+        help="run the bot for days of virtual time against a simulated market",
+        description="Drive the unmodified bot on a virtual clock against a seeded random-walk market in DEMO mode."
+    )
+    simulate.add_argument("--days", type=float, default=1.0, help="virtual days to simulate (default: 1)")
+    simulate.add_argument("--symbols", type=int, default=20, help="number of simulated symbols (default: 20)")
+    simulate.add_argument("--seed", type=int, default=7, help="market seed; equal seeds give equal runs")
+    simulate.add_argument("--start", default="2024-01-01", help="virtual start date, YYYY-MM-DD local time")
+    simulate.add_argument("--workdir", default="data/sim", help="scratch directory for state, journal and logs")
+    simulate.set_defaults(handler=_simulate)
+
+    indicators = commands.add_parser(
+        "indicators",
+        help="check indicator kernels against the ta library and benchmark them",
+        description="Compare every indicator backend with the ta library, then time them per universe size."
+    )
+    indicators.add_argument("--universe", default="10,50,200,1000", help="universe sizes to time, comma separated")
+    indicators.add_argument("--bars", type=int, default=1500, help="bars per symbol (default: 1500)")
+    indicators.add_argument("--parity-symbols", type=int, default=20, help="symbols in the parity check")
+    indicators.add_argument("--tolerance", type=float, default=1e-9, help="largest relative error accepted")
+    indicators.set_defaults(handler=_indicators)
+
+    rules = commands.add_parser(
+        "rules",
+        help="list the signal rule sets and check the built-in ones against the kernels",
+        description="Compile the built-in and SIGNAL_RULES_FILE rule sets, then evaluate the built-in ones on every bar."
+    )
+    rules.add_argument("--file", default=os.getenv("SIGNAL_RULES_FILE", ""), help="YAML or JSON rule file to validate")
+    rules.add_argument("--symbols", type=int, default=20, help="symbols in the parity check (default: 20)")
+    rules.add_argument("--bars", type=int, default=1500, help="bars per symbol (default: 1500)")
+    rules.set_defaults(handler=_rules)
+
+    orderbook = commands.add_parser(
+        "orderbook",
+        help="check local order book sync against a synthetic depth stream",
+        description="Sync a local order book from a synthetic diff-depth stream with stale snapshots and "
+                    "lost events, comparing it with the stream's book as it goes."
+    )
+    orderbook.add_argument("--events", type=int, default=20000, help="depth events to stream (default: 20000)")
+    orderbook.add_argument("--gap-every", type=int, default=1000, help="lose one event this often (default: 1000)")
+    orderbook.add_argument("--depth", type=int, default=50, help="price levels per side (default: 50)")
+    orderbook.add_argument("--seed", type=int, default=0)
+    orderbook.set_defaults(handler=_orderbook)
+
+    dataset = commands.add_parser(
+        "dataset",
+        help="export indicator features and future-return labels for model training",
+        description="Turn stored kline history into sharded feature/label files, for every bar or every journal trade."
+    )
+    dataset.add_argument("--history", default="data/history", help="directory of per-symbol .npy kline files")
+    dataset.add_argument("--interval", default="5m", help="bar interval of the history (default: 5m)")
+    dataset.add_argument("--import-cache", metavar="PATH", help="first add the bars of a market cache snapshot")
+    dataset.add_argument("--simulate-days", type=float, help="first add this many days of simulated market")
+    dataset.add_argument("--symbols", type=int, default=20, help="simulated symbols (default: 20)")
+    dataset.add_argument("--seed", type=int, default=7, help="simulated market seed")
+    dataset.add_argument("--start", help="simulated start date as given to simulate, YYYY-MM-DD (default: end now)")
+    dataset.add_argument("--journal", help="one row per trade of this journal instead of one per bar")
+    dataset.add_argument("--only", help="symbols to export, comma separated (default: all)")
+    dataset.add_argument("--out", default="data/dataset", help="output directory (default: data/dataset)")
+    dataset.add_argument("--format", choices=["auto", "parquet", "npz"], default="auto",
+                         help="shard format; auto is parquet when pyarrow is installed")
+    dataset.add_argument("--horizons", default="1,3,6,12", help="label horizons in bars, comma separated")
+    dataset.add_argument("--context", type=int, default=20, help="bars of normalised history per row")
+    dataset.add_argument("--chunk-bars", type=int, default=100_000, help="rows per shard and per computation step")
+    dataset.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (0 for none)")
+    dataset.add_argument("--rules-file", default=os.getenv("SIGNAL_RULES_FILE", ""),
+                         help="extra signal rule sets whose signals and distances become columns")
+    dataset.set_defaults(handler=_dataset)
+
+    analytics = commands.add_parser(
+        "analytics",
+        help="winrate and expectancy grouped by trade context",
+        description="Group the trade journal by pattern, confidence, hour, symbol, mode, reason or side."
+    )
+    analytics.add_argument("--by", default="pattern", help="dimension(s), comma separated (default: pattern)")
+    analytics.add_argument("--min-trades", type=int, default=1, help="hide groups with fewer trades")
+    analytics.add_argument(
+        "--sort", default="expectancy",
+        choices=["trades", "winrate", "expectancy", "total_pnl"],
+        help="sort column (default: expectancy)"
+    )
+    analytics.add_argument("--journal", default="data/trades.csv", help="trade journal CSV")
+    analytics.add_argument("--cache", default="data/cache/analytics.pkl", help="aggregate cache file")
+    analytics.add_argument("--rebuild", action="store_true", help="ignore the cache and re-read the journal")
+    analytics.set_defaults(handler=_analytics)
+
+    montecarlo = commands.add_parser(
+        "montecarlo",
+        help="drawdown, risk of ruin and winrate confidence by bootstrapping the journal",
+        description="Resample per-trade returns from a trade journal into many equity paths."
+    )
+    montecarlo.add_argument("--journal", default="data/trades.csv", help="trade journal CSV, live or from a simulation")
+    montecarlo.add_argument("--mode", help="only trades of this signal mode")
+    montecarlo.add_argument("--paths", type=int, default=20000, help="equity paths (default: 20000)")
+    montecarlo.add_argument("--trades", type=int, help="trades per path (default: as many as the journal has)")
+    montecarlo.add_argument("--balance", type=float, help="account balance in USDT (default: FIXED_USDT_BALANCE)")
+    montecarlo.add_argument("--leverage", type=float, help="leverage (default: the TRADING_MODE's)")
+    montecarlo.add_argument("--fraction", type=float, help="share of the balance used as margin per trade")
+    montecarlo.add_argument("--ruin", type=float, default=1.0, help="share of the balance lost that counts as ruin")
+    montecarlo.add_argument("--min-trades", type=int, default=20, help="refuse to run on fewer journal trades")
+    montecarlo.add_argument("--seed", type=int, help="random seed for repeatable results")
+    montecarlo.add_argument("--image", metavar="PATH", help="also render a summary image to PATH")
+    montecarlo.set_defaults(handler=_montecarlo)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,13 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
 from decimal import Decimal
 import os
 from dotenv import load_dotenv
 
+from ..utils.log import get_logger
+
+log = get_logger("config")
+
 @dataclass
 class TradingConfig:
     mode: str
@@ -19,6 +23,7 @@ class RiskConfig:
     max_daily_trades: int
     min_atr_ratio: float
     scan_interval: int
+    max_positions: int = 1
 
 @dataclass
 class TelegramConfig:
@@ -32,6 +37,98 @@ class BinanceConfig:
     base_url: str
     bot_mode: str
 
+@dataclass
+class StateConfig:
+    directory: str
+    snapshot_every: int  # WAL records between compact snapshots
+
+@dataclass
+class CacheConfig:
+    path: str
+    exchange_info_ttl: float  # seconds
+
+@dataclass
+class TimeframeConfig:
+    base_interval: str  # the only interval downloaded per symbol
+    higher_intervals: List[str]  # derived in memory from the base bars
+    require_confirmation: bool  # only trade in the direction of the higher timeframes
+
+@dataclass
+class IndicatorConfig:
+    backend: str  # auto, numba or numpy
+
+@dataclass
+class TracingConfig:
+    enabled: bool
+    capacity: int  # spans kept in the ring buffer
+    slow_scan_ms: float  # dump the trace of scans slower than this, 0 to disable
+    directory: str
+
+@dataclass
+class ScanConfig:
+    universe: int  # most liquid symbols scanned, 0 for all
+    workers: int  # worker processes sharing the scan, 0 to scan in-process
+    concurrency: int  # in-process kline fetches in flight at once
+    deadline: float  # seconds before a scan stops waiting for stragglers, 0 for none
+    dispatch_confidence: int  # entry confidence that is traded without waiting for the rest, 0 to disable
+    adaptive: bool  # per-symbol cadence by distance to a signal instead of every symbol each scan
+    budget: float  # adaptive: symbol refreshes (klines requests) per minute
+    min_interval: float  # adaptive: seconds between refreshes of symbols near a trigger, and between scans
+    max_interval: float  # adaptive: seconds between refreshes of quiet symbols
+
+@dataclass
+class PaperConfig:
+    taker_fee: float  # fraction of notional per fill
+    impact: float  # spreads of slippage per touch-size of quantity
+    depth_usdt: float  # assumed size at the touch when the book has none
+    min_spread_bps: float
+
+@dataclass
+class OrderBookConfig:
+    enabled: bool
+    depth: int  # price levels per side used for queries
+    max_slippage_pct: float  # entries are sized to stay within this of the touch
+    max_spread_pct: float
+
+@dataclass
+class ResilienceConfig:
+    timeout: float  # seconds per attempt
+    order_timeout: float  # seconds for order placement and cancellation
+    klines_timeout: float
+    retries: int  # extra attempts for GET requests
+    hedge: bool  # duplicate GETs still running at the endpoint's p95
+    breaker_failures: int  # consecutive failures that open an endpoint's circuit
+    breaker_reset: float  # seconds before a probe request is let through
+    metrics_interval: float  # seconds between request metrics records, 0 to disable
+    coalesce: bool  # merge identical in-flight GETs and cache them briefly
+
+@dataclass
+class CorrelationConfig:
+    halflife: float  # bars for a return's weight to halve
+    min_bars: int  # bars a pair needs before its correlation is used
+    max_correlation: float  # skip candidates this correlated with an open position, 0 to disable
+
+@dataclass
+class MemoryConfig:
+    interval: float  # seconds between memory samples, 0 to disable
+    tracemalloc: bool  # record allocation snapshots and diff them between samples
+    trace_frames: int  # stack depth kept per allocation
+    top: int  # allocation sites reported per snapshot diff
+    budget_mb: float  # resident size that triggers cache eviction, 0 to disable
+    cache_budget_mb: float  # combined size of tracked caches, 0 to disable
+    directory: str
+
+@dataclass
+class SignalConfig:
+    rules: str  # rule set name, empty for the one named after the trading mode
+    path: str  # YAML or JSON file with extra rule sets, empty for the built-in ones only
+
+@dataclass
+class LogConfig:
+    level: str
+    json_path: str
+    repeat_window: float  # seconds an identical message stays suppressed
+
 @dataclass
 class Config:
     trading: TradingConfig
@@ -39,21 +136,32 @@ class Config:
     telegram: TelegramConfig
     binance: BinanceConfig
     fixed_usdt_balance: Decimal
+    state: StateConfig
+    cache: CacheConfig
+    tracing: TracingConfig
+    timeframes: TimeframeConfig
+    indicators: IndicatorConfig
+    scan: ScanConfig
+    paper: PaperConfig
+    order_book: OrderBookConfig
+    resilience: ResilienceConfig
+    correlation: CorrelationConfig
+    memory: MemoryConfig
+    signals: SignalConfig
 
-def load_config() -> Config:
+def load_log_config() -> LogConfig:
+    """Logging settings, read before everything else so startup is logged too"""
     load_dotenv()
-    
-    # Bot mode configuration
-    bot_mode = os.getenv("BOT_MODE", "DEMO").upper()  # Default to DEMO if not set
-    if bot_mode not in ["DEMO", "REAL"]:
-        print(f"⚠️ Invalid BOT_MODE: {bot_mode}. Defaulting to DEMO mode.")
-        bot_mode = "DEMO"
-    print(f"🤖 Bot Mode: {bot_mode}")
-    
-    # Trading mode configuration
-    trading_mode = os.getenv("TRADING_MODE", "balanced")
+    return LogConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        json_path=os.getenv("LOG_FILE", "data/logs/autrade.jsonl"),
+        repeat_window=float(os.getenv("LOG_REPEAT_WINDOW", "60"))
+    )
+
+def mode_trading_config(trading_mode: str) -> TradingConfig:
+    """Leverage, sizing and TP/SL distances of a TRADING_MODE"""
     if trading_mode == "safe":
-        trading_config = TradingConfig(
+        return TradingConfig(
             mode="safe",
             leverage=1,
             usdt_percentage=1,
@@ -61,7 +169,7 @@ def load_config() -> Config:
             sl_atr_ratio=1.0   # SL at 1 ATR
         )
     elif trading_mode == "balanced":
-        trading_config = TradingConfig(
+        return TradingConfig(
             mode="balanced",
             leverage=1,
             usdt_percentage=1,
@@ -69,7 +177,7 @@ def load_config() -> Config:
             sl_atr_ratio=0.75  # SL at 0.75 ATR
         )
     elif trading_mode == "aggressive":
-        trading_config = TradingConfig(
+        return TradingConfig(
             mode="aggressive",
             leverage=1,
             usdt_percentage=1,
@@ -79,13 +187,27 @@ def load_config() -> Config:
     else:
         raise ValueError(f"Unknown TRADING_MODE: {trading_mode}")
 
+def load_config() -> Config:
+    load_dotenv()
+    
+    # Bot mode configuration
+    bot_mode = os.getenv("BOT_MODE", "DEMO").upper()  # Default to DEMO if not set
+    if bot_mode not in ["DEMO", "REAL"]:
+        log.warning("⚠️ Invalid BOT_MODE: %s. Defaulting to DEMO mode.", bot_mode)
+        bot_mode = "DEMO"
+    log.info("🤖 Bot Mode: %s", bot_mode)
+    
+    # Trading mode configuration
+    trading_config = mode_trading_config(os.getenv("TRADING_MODE", "balanced"))
+
     # Risk configuration
     risk_config = RiskConfig(
         max_spread_percent=0.15,
         max_consecutive_losses=3,
         max_daily_trades=None,
         min_atr_ratio=0.005,
-        scan_interval=30
+        scan_interval=30,
+        max_positions=int(os.getenv("MAX_OPEN_POSITIONS", "1"))
     )
 
     # Telegram configuration
@@ -102,6 +224,104 @@ def load_config() -> Config:
         bot_mode=bot_mode
     )
 
+    # Crash-safe state persistence
+    state_config = StateConfig(
+        directory=os.getenv("STATE_DIR", "data/state"),
+        snapshot_every=int(os.getenv("STATE_SNAPSHOT_EVERY", "200"))
+    )
+
+    # Market data cache snapshot for warm restarts
+    cache_config = CacheConfig(
+        path=os.getenv("MARKET_CACHE_PATH", "data/cache/market.pkl"),
+        exchange_info_ttl=float(os.getenv("EXCHANGE_INFO_TTL", "3600"))
+    )
+
+    # Multi-timeframe context derived from one base interval
+    timeframe_config = TimeframeConfig(
+        base_interval=os.getenv("BASE_INTERVAL", "5m"),
+        higher_intervals=[i.strip() for i in os.getenv("HIGHER_INTERVALS", "15m,1h").split(",") if i.strip()],
+        require_confirmation=os.getenv("HTF_CONFIRMATION", "false").lower() in ("1", "true", "yes")
+    )
+
+    # Indicator kernels: JIT-compiled with numba when installed, NumPy otherwise
+    indicator_config = IndicatorConfig(
+        backend=os.getenv("INDICATOR_BACKEND", "auto").lower()
+    )
+
+    # Stage-level tracing
+    tracing_config = TracingConfig(
+        enabled=os.getenv("TRACE_ENABLED", "false").lower() in ("1", "true", "yes"),
+        capacity=int(os.getenv("TRACE_BUFFER", "20000")),
+        slow_scan_ms=float(os.getenv("TRACE_SLOW_SCAN_MS", "0")),
+        directory=os.getenv("TRACE_DIR", "data/traces")
+    )
+
+    # Scan universe and sharding across worker processes
+    scan_config = ScanConfig(
+        universe=int(os.getenv("SCAN_UNIVERSE", "50")),
+        workers=int(os.getenv("SCAN_WORKERS", "0")),
+        concurrency=int(os.getenv("SCAN_CONCURRENCY", "16")),
+        deadline=float(os.getenv("SCAN_DEADLINE", "20")),
+        dispatch_confidence=int(os.getenv("SCAN_DISPATCH_CONFIDENCE", "0")),
+        adaptive=os.getenv("SCAN_ADAPTIVE", "false").lower() in ("1", "true", "yes"),
+        budget=float(os.getenv("SCAN_REQUEST_BUDGET", "60")),
+        min_interval=float(os.getenv("SCAN_MIN_INTERVAL", "10")),
+        max_interval=float(os.getenv("SCAN_MAX_INTERVAL", "300"))
+    )
+
+    # DEMO fill simulation
+    paper_config = PaperConfig(
+        taker_fee=float(os.getenv("PAPER_TAKER_FEE", "0.0004")),
+        impact=float(os.getenv("PAPER_IMPACT", "1.0")),
+        depth_usdt=float(os.getenv("PAPER_DEPTH_USDT", "50000")),
+        min_spread_bps=float(os.getenv("PAPER_MIN_SPREAD_BPS", "1"))
+    )
+
+    # Local order books from the diff-depth stream
+    order_book_config = OrderBookConfig(
+        enabled=os.getenv("ORDER_BOOK_ENABLED", "false").lower() in ("1", "true", "yes"),
+        depth=int(os.getenv("ORDER_BOOK_DEPTH", "50")),
+        max_slippage_pct=float(os.getenv("MAX_SLIPPAGE_PCT", "0.1")),
+        max_spread_pct=float(os.getenv("MAX_SPREAD_PCT", "0.15"))
+    )
+
+    # Request timeouts, retries, hedging and circuit breakers
+    resilience_config = ResilienceConfig(
+        timeout=float(os.getenv("REQUEST_TIMEOUT", "5")),
+        order_timeout=float(os.getenv("ORDER_TIMEOUT", "10")),
+        klines_timeout=float(os.getenv("KLINES_TIMEOUT", "10")),
+        retries=int(os.getenv("REQUEST_RETRIES", "2")),
+        hedge=os.getenv("REQUEST_HEDGING", "true").lower() in ("1", "true", "yes"),
+        breaker_failures=int(os.getenv("BREAKER_FAILURES", "5")),
+        breaker_reset=float(os.getenv("BREAKER_RESET", "30")),
+        metrics_interval=float(os.getenv("REQUEST_METRICS_INTERVAL", "300")),
+        coalesce=os.getenv("REQUEST_COALESCING", "true").lower() in ("1", "true", "yes")
+    )
+
+    # Cross-symbol return correlation for candidate filtering
+    correlation_config = CorrelationConfig(
+        halflife=float(os.getenv("CORRELATION_HALFLIFE", "288")),
+        min_bars=int(os.getenv("CORRELATION_MIN_BARS", "48")),
+        max_correlation=float(os.getenv("MAX_CORRELATION", "0.8"))
+    )
+
+    # Memory accounting and cache budgets
+    memory_config = MemoryConfig(
+        interval=float(os.getenv("MEMORY_INTERVAL", "300")),
+        tracemalloc=os.getenv("MEMORY_TRACEMALLOC", "false").lower() in ("1", "true", "yes"),
+        trace_frames=int(os.getenv("MEMORY_TRACE_FRAMES", "1")),
+        top=int(os.getenv("MEMORY_TOP", "10")),
+        budget_mb=float(os.getenv("MEMORY_BUDGET_MB", "0")),
+        cache_budget_mb=float(os.getenv("CACHE_BUDGET_MB", "0")),
+        directory=os.getenv("MEMORY_DIR", "data/memory")
+    )
+
+    # Declarative entry rules
+    signal_config = SignalConfig(
+        rules=os.getenv("SIGNAL_RULES", ""),
+        path=os.getenv("SIGNAL_RULES_FILE", "")
+    )
+
     # Get fixed USDT balance from environment variable
     fixed_usdt_balance = os.getenv("FIXED_USDT_BALANCE", "100")
     return Config(
@@ -109,5 +329,53 @@ def load_config() -> Config:
         risk=risk_config,
         telegram=telegram_config,
         binance=binance_config,
-        fixed_usdt_balance=Decimal(fixed_usdt_balance)
-    ) 
\ No newline at end of file
+        fixed_usdt_balance=Decimal(fixed_usdt_balance),
+        state=state_config,
+        cache=cache_config,
+        tracing=tracing_config,
+        timeframes=timeframe_config,
+        indicators=indicator_config,
+        scan=scan_config,
+        paper=paper_config,
+        order_book=order_book_config,
+        resilience=resilience_config,
+        correlation=correlation_config,
+        memory=memory_config,
+        signals=signal_config
+    )
+
+def load_strategy_configs(base: Config) -> Dict[str, Config]:
+    """One Config per STRATEGIES entry ("name=mode" or just "mode"), empty when unset.
+
+    Strategies share everything but their trading mode, risk limits and
+    balance; STRATEGY_<NAME>_MAX_OPEN_POSITIONS, _MAX_CONSECUTIVE_LOSSES,
+    _MAX_DAILY_TRADES, _FIXED_USDT_BALANCE and _SIGNAL_RULES override the
+    common values.
+    Each keeps its state in a subdirectory of STATE_DIR named after it.
+    """
+    strategies: Dict[str, Config] = {}
+    for spec in os.getenv("STRATEGIES", "").split(","):
+        if not spec.strip():
+            continue
+        name, _, mode = spec.partition("=")
+        name = name.strip()
+        mode = mode.strip() or name
+        if name in strategies:
+            raise ValueError(f"Duplicate strategy name: {name}")
+        prefix = f"STRATEGY_{name.upper()}_"
+        max_daily_trades = os.getenv(prefix + "MAX_DAILY_TRADES")
+        risk = replace(
+            base.risk,
+            max_positions=int(os.getenv(prefix + "MAX_OPEN_POSITIONS", base.risk.max_positions)),
+            max_consecutive_losses=int(os.getenv(prefix + "MAX_CONSECUTIVE_LOSSES", base.risk.max_consecutive_losses)),
+            max_daily_trades=int(max_daily_trades) if max_daily_trades else base.risk.max_daily_trades
+        )
+        strategies[name] = replace(
+            base,
+            trading=mode_trading_config(mode),
+            risk=risk,
+            fixed_usdt_balance=Decimal(os.getenv(prefix + "FIXED_USDT_BALANCE", str(base.fixed_usdt_balance))),
+            signals=replace(base.signals, rules=os.getenv(prefix + "SIGNAL_RULES", base.signals.rules)),
+            state=replace(base.state, directory=os.path.join(base.state.directory, name))
+        )
+    return strategies
@@ -1,24 +1,59 @@
+from __future__ import annotations
+
+import time
+
+# Taken before anything heavy is imported, for the cold-start measurement
+PROCESS_START = time.perf_counter()
+
 import asyncio
 import ssl
-import aiohttp
 from datetime import datetime, timedelta, timezone
 import os
 import csv
-import pandas as pd
-from typing import Dict
+import logging
+import signal
+from typing import Dict, Optional
 
-from .config.settings import load_config
-from .models.trade import TradeManager
+from .config.settings import Config, load_config, load_log_config, load_strategy_configs
+from .models.state_log import StateLog
+from .models.trade import Trade, TradeManager
 from .services.binance_service import BinanceService
+from .services.market_data import MarketDataCache
+from .services.order_book import OrderBooks
+from .services.scan_pipeline import ScanPipeline, strongest
+from .services.scan_pool import ScanPool
+from .services.strategy_host import StrategyHost
 from .services.telegram_service import TelegramService
 from .services.trading_service import TradingService
-from src.autrade.utils.report import create_trading_report, create_summary_report
+from .utils.clock import clock
+from .utils.lazy import lazy_import
+from .utils.log import get_logger, setup_logging
+from .utils.memory import MemoryMonitor
+from .utils.report import create_trading_report, create_summary_report
+from .utils.tracing import tracer
+
+aiohttp = lazy_import("aiohttp")
+pd = lazy_import("pandas")
+
+log = get_logger("bot")
 
 class TradingBot:
-    def __init__(self):
-        self.config = load_config()
-        self.trade_manager = TradeManager()
-        self.binance_service = BinanceService(self.config, self.trade_manager)
+    def __init__(self, config: Optional[Config] = None, name: Optional[str] = None,
+                 market_cache: Optional[MarketDataCache] = None):
+        """``name`` tags a strategy sharing ``market_cache`` with others in a StrategyHost"""
+        self.config = config or load_config()
+        self.name = name
+        self.trade_manager = TradeManager(
+            StateLog(self.config.state.directory, self.config.state.snapshot_every)
+        )
+        self._restore_state()
+        # A shared cache is loaded and saved by its owner
+        self.owns_market_cache = market_cache is None
+        if market_cache is None:
+            market_cache = MarketDataCache(self.config.cache.path, self.config.cache.exchange_info_ttl)
+            market_cache.load()
+        self.market_cache = market_cache
+        self.binance_service = BinanceService(self.config, self.trade_manager, self.market_cache)
         self.telegram_service = TelegramService(self.config.telegram)
         self.trading_service = TradingService(
             self.config,
@@ -26,10 +61,92 @@ class TradingBot:
             self.telegram_service,
             self.trade_manager
         )
-        self.position_messages = {}  # {symbol: message_id}
-        self.csv_file = "data/trades.csv"
+        self.order_books = None
+        if self.config.order_book.enabled:
+            self.order_books = OrderBooks(self.binance_service, self.config.order_book.depth)
+            self.binance_service.order_books = self.order_books
+        self.scan_pool = None
+        if self.config.scan.workers > 0:
+            self.scan_pool = ScanPool(self.config, self.config.scan.workers, self.trading_service.correlation)
+        if self.scan_pool is not None and self.trading_service.scan_scheduler is not None:
+            log.warning("⚠️ SCAN_ADAPTIVE needs an in-process scan, ignored with SCAN_WORKERS")
+            self.trading_service.scan_scheduler = None
+        self.scan_pipeline = ScanPipeline(
+            self.trading_service,
+            concurrency=self.config.scan.concurrency,
+            deadline=self.config.scan.deadline,
+            dispatch_confidence=self.config.scan.dispatch_confidence,
+            accept=self._accept_candidate
+        )
+        self.csv_file = "data/trades.csv" if name is None else f"data/trades_{name}.csv"
+        self.first_scan_reported = False
+        self.scan_count = 0
+        tracer.configure(self.config.tracing.enabled, self.config.tracing.capacity)
+        memory = self.config.memory
+        self.memory = MemoryMonitor(
+            budget_mb=memory.budget_mb,
+            cache_budget_mb=memory.cache_budget_mb,
+            tracemalloc_frames=memory.trace_frames if memory.tracemalloc else 0,
+            top=memory.top
+        )
+        self._register_memory_gauges()
         self._ensure_csv_exists()
 
+    def _register_memory_gauges(self):
+        """Sizes of everything that grows with uptime; kline caches can be evicted"""
+        cache = self.market_cache
+        self.memory.register("market_cache", lambda: len(cache.klines), cache.nbytes, cache.evict)
+        timeframes = self.trading_service.timeframes
+        self.memory.register("timeframes", lambda: len(timeframes), timeframes.nbytes, timeframes.evict)
+        correlation = self.trading_service.correlation
+        self.memory.register("correlation", lambda: len(correlation), correlation.nbytes)
+        coalescer = self.binance_service.coalescer
+        if coalescer is not None:
+            self.memory.register("request_cache", lambda: len(coalescer), evict=lambda _: coalescer.clear())
+        self.memory.register("trace_buffer", lambda: len(tracer))
+        manager = self.trade_manager
+        self.memory.register("positions", lambda: len(manager.positions))
+        self.memory.register("trades", lambda: len(manager.trades))
+        self.memory.register("position_messages", lambda: len(manager.position_messages))
+        if self.order_books is not None:
+            books = self.order_books
+            self.memory.register(
+                "order_books", lambda: sum(len(b.bids) + len(b.asks) for b in books.books.values())
+            )
+        paper = self.binance_service.paper
+        if paper is not None:
+            self.memory.register("paper_fills", lambda: sum(len(f) for f in paper.fills.values()))
+
+    def _restore_state(self):
+        """Rebuild TradeManager from the last snapshot plus the state log tail"""
+        started = time.perf_counter()
+        replayed = self.trade_manager.restore()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        log.info(
+            "♻️ State restored in %.1f ms: %s positions, %s trades, %s log records replayed",
+            elapsed_ms, len(self.trade_manager.positions), len(self.trade_manager.trades), replayed
+        )
+
+    async def reconcile_positions(self, session: aiohttp.ClientSession):
+        """Align restored positions with the exchange using one bulk call"""
+        live = await self.binance_service.get_positions(session)
+        if live is None:
+            return
+
+        for symbol, position in self.trade_manager.positions.items():
+            current = live.get(symbol)
+            if current is None:
+                # Closed while we were down; update_positions records the exit
+                log.info("🔍 %s no longer open on exchange, will be closed out", symbol)
+                continue
+            position.qty = float(current['positionAmt'])
+            position.entry = float(current['entryPrice'])
+            position.mark_price = float(current['markPrice'])
+
+        for symbol in live:
+            if symbol not in self.trade_manager.positions:
+                log.warning("⚠️ %s is open on exchange but unknown to the bot, leaving it untouched", symbol)
+
     def _ensure_csv_exists(self):
         """Ensure CSV file exists with headers"""
         os.makedirs("data", exist_ok=True)
@@ -71,7 +188,7 @@ class TradingBot:
         try:
             # Create DataFrame with trade data
             df = pd.DataFrame([{
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "timestamp": clock.now().strftime("%Y-%m-%d %H:%M:%S"),
                 "symbol": trade_data["symbol"],
                 "side": trade_data["side"],
                 "entry_price": trade_data["entry_price"],
@@ -113,538 +230,593 @@ class TradingBot:
             }])
 
             # Save to CSV with proper formatting
-            csv_path = "data/trades.csv"
-            df.to_csv(csv_path, mode='a', header=not os.path.exists(csv_path), index=False, line_terminator='\n', quoting=csv.QUOTE_ALL)
-            print(f"✅ Trade data saved to {csv_path}")
+            csv_path = self.csv_file
+            df.to_csv(csv_path, mode='a', header=not os.path.exists(csv_path), index=False, lineterminator='\n', quoting=csv.QUOTE_ALL)
+            log.debug("✅ Trade data saved to %s", csv_path)
 
         except Exception as e:
-            print(f"❌ Error saving trade data: {e}")
-            print(f"Available keys in trade_data: {list(trade_data.keys())}")  # Debug info
+            log.error("❌ Error saving trade data: %s", e)
+            log.debug("Available keys in trade_data: %s", list(trade_data.keys()))
+
+    async def _record_close(
+        self,
+        session: aiohttp.ClientSession,
+        symbol: str,
+        position,
+        exit_price: float,
+        pnl: float,
+        pnl_pct: float,
+        roi: float,
+        margin_used: float,
+        close_reason: str,
+        price_change_5m: float,
+        bb_width: float,
+        trend_strength: float
+    ):
+        """Journal a closed position, notify Telegram and drop it from the book"""
+        # Calculate duration
+        duration = clock.now() - position.timestamp
+        duration_str = str(duration).split('.')[0]  # Remove microseconds
+
+        # Get current balance
+        balance = await self.binance_service.get_account_balance(session)
+
+        # Record the trade and remove from active positions first, so a
+        # failing notification cannot leave the close to be journaled again.
+        # The released copy stays readable once the book row is gone
+        position = self.trade_manager.close_position(symbol, Trade(
+            symbol=symbol,
+            entry=position.entry,
+            exit=exit_price,
+            qty=abs(position.qty),
+            pnl=pnl,
+            timestamp=clock.now(),
+            duration=duration_str
+        )) or position
+
+        # Save trade data
+        self.save_trade_to_csv({
+            'symbol': symbol,
+            'side': position.side,
+            'entry_price': position.entry,
+            'exit_price': exit_price,
+            'quantity': abs(position.qty),
+            'leverage': position.leverage,
+            'pnl': pnl,
+            'pnl_percent': pnl_pct,
+            'roi': roi,
+            'duration': duration_str,
+            'close_reason': close_reason,
+            'balance': balance,
+            'margin_used': margin_used,
+            'margin_call_price': position.liquidation_price,
+            'take_profit': position.tp_price,
+            'stop_loss': position.sl_price,
+            'atr': position.atr,
+            'spread': position.spread,
+            'signal_mode': self.config.trading.mode,
+            'rsi': position.rsi,
+            'ema20': position.ema20,
+            'ema50': position.ema50,
+            'last_close': position.last_close,
+            'lower_band': position.lower_band,
+            'upper_band': position.upper_band,
+            'is_green': position.is_green,
+            'is_red': position.is_red,
+            'signal': position.signal,
+            'volume_now': position.volume_now,
+            'volume_avg10': position.volume_avg10,
+            'entry_time': position.timestamp,
+            'exit_time': clock.now(),
+            'reason': position.reason,
+            'price_change_5m': price_change_5m,
+            'bb_width': bb_width,
+            'trend_strength': trend_strength,
+            'candle_pattern': position.candle_pattern,
+            'entry_confidence_score': position.entry_confidence_score
+        })
+
+        # Send Telegram notification for closed position
+        result_emoji = "✅" if pnl > 0 else "❌"
+        try:
+            await self.telegram_service.send_message(
+                session,
+                f"{result_emoji} CLOSE {symbol}\n"
+                f"Side: {position.side}\n"
+                f"Entry: {position.entry:.8f}\n"
+                f"Exit: {exit_price:.8f}\n"
+                f"TP: {position.tp_price:.8f} | SL: {position.sl_price:.8f}\n"
+                f"PnL: {pnl:.4f} USDT\n"
+                f"📊 ROI: {roi:.2f}%\n"
+                f"Durasi: {duration_str}"
+            )
+        except Exception as e:
+            log.error("❌ Error sending close message for %s: %s", symbol, e)
+
+        # Create and send trade result image
+        image_path = f"/tmp/trade_result_{symbol}_{int(clock.now().timestamp())}.png"
+        try:
+            create_trading_report(
+                symbol=symbol,
+                pnl=pnl_pct,
+                trade_time=duration_str,
+                output_path=image_path
+            )
+            await self.telegram_service.send_photo(
+                session,
+                image_path,
+                caption=f"{symbol} closed with {close_reason.lower()}"
+            )
+        except Exception as e:
+            log.error("❌ Error sending trade result image for %s: %s", symbol, e)
+        finally:
+            if os.path.exists(image_path):
+                os.remove(image_path)
+
+    async def _handle_closed_position(self, session: aiohttp.ClientSession, symbol: str, position):
+        """Record a position that was closed on the exchange side"""
+        log.info("🔍 Checking closed position for %s...", symbol)
+
+        # Get last trade to determine exit price
+        trades = await self.binance_service.get_trades(session, symbol)
+        if not trades:
+            log.error("❌ No trade data found for %s", symbol)
+            return
+
+        last_trade = trades[0]  # Most recent trade
+        exit_price = float(last_trade['price'])
+
+        # Calculate PnL
+        qty = abs(float(position.qty))
+        move = (exit_price - position.entry) * position.direction
+        pnl = move * qty
+        pnl_pct = (move / position.entry) * 100
+        roi = (pnl / position.margin) * 100
+
+        # Determine close reason
+        close_reason = "TP" if pnl > 0 else "SL"
+
+        # Calculate price change after 5 minutes
+        klines = await self.binance_service.get_klines(
+            session,
+            symbol,
+            interval='5m',
+            limit=2
+        )
+        if len(klines):
+            price_5m = float(klines['close'][0])
+            price_change_5m = ((price_5m - position.entry) / position.entry) * 100
+        else:
+            price_change_5m = 0.0
+
+        # Calculate BB width
+        bb_width = position.upper_band - position.lower_band
+
+        # Calculate trend strength (using EMA ratio)
+        trend_strength = position.ema20 / position.ema50 if position.ema50 != 0 else 0
+
+        await self._record_close(
+            session, symbol, position, exit_price, pnl, pnl_pct, roi,
+            position.margin, close_reason, price_change_5m, bb_width, trend_strength
+        )
+
+    async def _refresh_positions(self, session: aiohttp.ClientSession) -> set:
+        """Refresh quantity, entry and mark price from the exchange.
+
+        Returns the symbols whose data could not be refreshed this round.
+        """
+        stale = set()
+        for symbol, position in self.trade_manager.positions.items():
+            try:
+                # Get current position from Binance
+                current_position = await self.binance_service.get_position(session, symbol)
+
+                if not current_position:
+                    # Position was closed
+                    await self._handle_closed_position(session, symbol, position)
+                    continue
+
+                # Update position with current data
+                position.qty = float(current_position['positionAmt'])
+                entry_price = float(current_position['entryPrice'])
+
+                # Get current mark price
+                current_price = await self.binance_service.get_mark_price(session, symbol)
+                if current_price > 0:
+                    position.mark_price = current_price
+
+                # Validate entry price
+                if entry_price <= 0:
+                    log.warning("⚠️ Warning: Invalid entry price (%s) for %s, skipping update", entry_price, symbol)
+                    stale.add(symbol)
+                    continue
+
+                position.entry = entry_price
+            except Exception as e:
+                log.error("❌ Error updating position %s: %s", symbol, e)
+                stale.add(symbol)
+        return stale
 
     async def update_positions(self, session: aiohttp.ClientSession):
         """Update active positions and check for closures"""
         while True:
-            for symbol, position in list(self.trade_manager.positions.items()):
+            book = self.trade_manager.positions
+
+            with tracer.span("positions.refresh", positions=len(book)):
+                stale = await self._refresh_positions(session)
+
+            # PnL, ROI, margin, liquidation and TP/SL hits for all positions in one step
+            with tracer.span("positions.evaluate", positions=len(book)):
+                metrics = book.evaluate()
+
+            for i, symbol in enumerate(metrics.symbols):
+                position = book.get(symbol)
+                if position is None or symbol in stale:
+                    continue
                 try:
-                    # Get current position from Binance
-                    current_position = await self.binance_service.get_position(session, symbol)
-                    
-                    if not current_position:
-                        # Position was closed
-                        print(f"\n🔍 Checking closed position for {symbol}...")
-                        
-                        # Get last trade to determine exit price
-                        trades = await self.binance_service.get_trades(session, symbol)
-                        if trades:
-                            last_trade = trades[0]  # Most recent trade
-                            exit_price = float(last_trade['price'])
-                            
-                            # Calculate PnL
-                            qty = abs(float(position.qty))
-                            if position.side == "BUY":
-                                pnl = (exit_price - position.entry) * qty
-                                pnl_pct = ((exit_price - position.entry) / position.entry) * 100
-                            else:
-                                pnl = (position.entry - exit_price) * qty
-                                pnl_pct = ((position.entry - exit_price) / position.entry) * 100
-                            
-                            roi = (pnl / position.margin) * 100
-                            
-                            # Calculate duration
-                            duration = datetime.now() - position.timestamp
-                            duration_str = str(duration).split('.')[0]  # Remove microseconds
-                            
-                            # Determine close reason
-                            close_reason = "TP" if pnl > 0 else "SL"
-                            
-                            # Get current balance
-                            balance = await self.binance_service.get_account_balance(session)
-                            
-                            # Calculate price change after 5 minutes
-                            entry_time = position.timestamp
-                            five_min_later = entry_time + timedelta(minutes=5)
-                            klines = await self.binance_service.get_klines(
-                                session, 
-                                symbol, 
-                                interval='5m',
-                                limit=2
-                            )
-                            if not klines.empty:
-                                price_5m = float(klines.iloc[0]['close'])
-                                price_change_5m = ((price_5m - position.entry) / position.entry) * 100
-                            else:
-                                price_change_5m = 0.0
-                            
-                            # Calculate BB width
-                            bb_width = position.upper_band - position.lower_band
-                            
-                            # Calculate trend strength (using EMA ratio)
-                            trend_strength = position.ema20 / position.ema50 if position.ema50 != 0 else 0
-                            
-                            # Save trade data
-                            self.save_trade_to_csv({
-                                'symbol': symbol,
-                                'side': position.side,
-                                'entry_price': position.entry,
-                                'exit_price': exit_price,
-                                'quantity': qty,
-                                'leverage': position.leverage,
-                                'pnl': pnl,
-                                'pnl_percent': pnl_pct,
-                                'roi': roi,
-                                'duration': duration_str,
-                                'close_reason': close_reason,
-                                'balance': balance,
-                                'margin_used': position.margin,
-                                'margin_call_price': position.liquidation_price,
-                                'take_profit': position.tp_price,
-                                'stop_loss': position.sl_price,
-                                'atr': position.atr,
-                                'spread': position.spread,
-                                'signal_mode': self.config.trading.mode,
-                                'rsi': position.rsi,
-                                'ema20': position.ema20,
-                                'ema50': position.ema50,
-                                'last_close': position.last_close,
-                                'lower_band': position.lower_band,
-                                'upper_band': position.upper_band,
-                                'is_green': position.is_green,
-                                'is_red': position.is_red,
-                                'signal': position.signal,
-                                'volume_now': position.volume_now,
-                                'volume_avg10': position.volume_avg10,
-                                'entry_time': position.timestamp,
-                                'exit_time': datetime.now(),
-                                'reason': position.reason,
-                                'price_change_5m': price_change_5m,
-                                'bb_width': bb_width,
-                                'trend_strength': trend_strength,
-                                'candle_pattern': position.candle_pattern,
-                                'entry_confidence_score': position.entry_confidence_score
-                            })
-                            
-                            # Send Telegram notification for closed position
-                            result_emoji = "✅" if pnl > 0 else "❌"
-                            await self.telegram_service.send_message(
-                                session,
-                                f"{result_emoji} CLOSE {symbol}\n"
-                                f"Side: {position.side}\n"
-                                f"Entry: {position.entry:.8f}\n"
-                                f"Exit: {exit_price:.8f}\n"
-                                f"TP: {position.tp_price:.8f} | SL: {position.sl_price:.8f}\n"
-                                f"PnL: {pnl:.4f} USDT\n"
-                                f"📊 ROI: {roi:.2f}%\n"
-                                f"Durasi: {duration_str}"
-                            )
-                            
-                            # Create and send trade result image
-                            image_path = f"/tmp/trade_result_{symbol}_{int(datetime.now().timestamp())}.png"
-                            create_trading_report(
-                                symbol=symbol,
-                                pnl=pnl_pct,
-                                trade_time=duration_str,
-                                output_path=image_path
-                            )
-                            
-                            try:
-                                await self.telegram_service.send_photo(
-                                    session,
-                                    image_path,
-                                    caption=f"{symbol} closed with {close_reason.lower()}"
-                                )
-                            finally:
-                                os.remove(image_path)
-                            
-                            # Remove from active positions
-                            self.trade_manager.remove_position(symbol)
-                            if symbol in self.position_messages:
-                                del self.position_messages[symbol]
-                        else:
-                            print(f"❌ No trade data found for {symbol}")
-                    else:
-                        # Update position with current data
-                        position.qty = float(current_position['positionAmt'])
-                        entry_price = float(current_position['entryPrice'])
-                        
-                        # Get current mark price
-                        current_price = await self.binance_service.get_mark_price(session, symbol)
-                        if current_price > 0:
-                            position.mark_price = current_price
-                            
-                        # Calculate liquidation price based on leverage and margin
-                        qty = abs(float(position.qty))
-                        margin_used = (qty * position.entry) / position.leverage
-                        
-                        # Check if TP or SL is hit
-                        if position.mark_price > 0:  # Ensure we have valid mark price
-                            # Add small tolerance (0.01%) to account for spread and price fluctuations
-                            tolerance = position.mark_price * 0.0001  # 0.01%
-                            close_reason = None
-                            
-                            if position.side == "BUY":
-                                # For long positions
-                                if position.mark_price >= (position.tp_price - tolerance):
-                                    print(f"🎯 TP hit for {symbol} at {position.mark_price} (TP: {position.tp_price}, Tolerance: {tolerance:.8f})")
-                                    close_reason = "TP"
-                                    # Close position
-                                    await self.binance_service.place_order(
-                                        session,
-                                        symbol,
-                                        "SELL",
-                                        abs(position.qty),
-                                        reduce_only=True
-                                    )
-                                elif position.mark_price <= (position.sl_price + tolerance):
-                                    print(f"🛑 SL hit for {symbol} at {position.mark_price} (SL: {position.sl_price}, Tolerance: {tolerance:.8f})")
-                                    close_reason = "SL"
-                                    # Close position
-                                    await self.binance_service.place_order(
-                                        session,
-                                        symbol,
-                                        "SELL",
-                                        abs(position.qty),
-                                        reduce_only=True
-                                    )
-                            else:
-                                # For short positions
-                                if position.mark_price <= (position.tp_price + tolerance):
-                                    print(f"🎯 TP hit for {symbol} at {position.mark_price} (TP: {position.tp_price}, Tolerance: {tolerance:.8f})")
-                                    close_reason = "TP"
-                                    # Close position
-                                    await self.binance_service.place_order(
-                                        session,
-                                        symbol,
-                                        "BUY",
-                                        abs(position.qty),
-                                        reduce_only=True
-                                    )
-                                elif position.mark_price >= (position.sl_price - tolerance):
-                                    print(f"🛑 SL hit for {symbol} at {position.mark_price} (SL: {position.sl_price}, Tolerance: {tolerance:.8f})")
-                                    close_reason = "SL"
-                                    # Close position
-                                    await self.binance_service.place_order(
-                                        session,
-                                        symbol,
-                                        "BUY",
-                                        abs(position.qty),
-                                        reduce_only=True
-                                    )
-                            
-                            if close_reason:
-                                # Calculate PnL
-                                qty = abs(float(position.qty))
-                                if position.side == "BUY":
-                                    pnl = (position.mark_price - position.entry) * qty
-                                    pnl_pct = ((position.mark_price - position.entry) / position.entry) * 100
-                                else:
-                                    pnl = (position.entry - position.mark_price) * qty
-                                    pnl_pct = ((position.entry - position.mark_price) / position.entry) * 100
-                                
-                                roi = (pnl / margin_used * 100) if margin_used != 0 else 0
-                                
-                                # Calculate duration
-                                duration = datetime.now() - position.timestamp
-                                duration_str = str(duration).split('.')[0]  # Remove microseconds
-                                
-                                # Get current balance
-                                balance = await self.binance_service.get_account_balance(session)
-                                
-                                # Save trade data
-                                self.save_trade_to_csv({
-                                    'symbol': symbol,
-                                    'side': position.side,
-                                    'entry_price': position.entry,
-                                    'exit_price': position.mark_price,
-                                    'quantity': qty,
-                                    'leverage': position.leverage,
-                                    'pnl': pnl,
-                                    'roi': roi,
-                                    'duration': duration_str,
-                                    'close_reason': close_reason,
-                                    'balance': balance,
-                                    'margin_used': margin_used,
-                                    'margin_call_price': position.liquidation_price,
-                                    'take_profit': position.tp_price,
-                                    'stop_loss': position.sl_price,
-                                    'atr': position.atr,
-                                    'spread': position.spread,
-                                    'signal_mode': self.config.trading.mode,
-                                    'rsi': position.rsi,
-                                    'ema20': position.ema20,
-                                    'ema50': position.ema50,
-                                    'last_close': position.last_close,
-                                    'lower_band': position.lower_band,
-                                    'upper_band': position.upper_band,
-                                    'is_green': position.is_green,
-                                    'is_red': position.is_red,
-                                    'signal': position.signal,
-                                    'volume_now': position.volume_now,
-                                    'volume_avg10': position.volume_avg10,
-                                    'entry_time': position.timestamp,
-                                    'exit_time': datetime.now(),
-                                    'reason': position.reason,
-                                    'price_change_5m': position.price_change_5m,
-                                    'bb_width': position.upper_band - position.lower_band if position.upper_band and position.lower_band else 0.0,
-                                    'trend_strength': position.ema20 / position.ema50 if position.ema20 and position.ema50 else 0.0,
-                                    'candle_pattern': position.candle_pattern,
-                                    'entry_confidence_score': position.entry_confidence_score
-                                })
-                                
-                                # Send Telegram notification for closed position
-                                result_emoji = "✅" if pnl > 0 else "❌"
-                                await self.telegram_service.send_message(
-                                    session,
-                                    f"{result_emoji} CLOSE {symbol}\n"
-                                    f"Side: {position.side}\n"
-                                    f"Entry: {position.entry:.8f}\n"
-                                    f"Exit: {position.mark_price:.8f}\n"
-                                    f"TP: {position.tp_price:.8f} | SL: {position.sl_price:.8f}\n"
-                                    f"PnL: {pnl:.4f} USDT\n"
-                                    f"📊 ROI: {roi:.2f}%\n"
-                                    f"Durasi: {duration_str}"
-                                )
-                                
-                                # Create and send trade result image
-                                image_path = f"/tmp/trade_result_{symbol}_{int(datetime.now().timestamp())}.png"
-                                create_trading_report(
-                                    symbol=symbol,
-                                    pnl=pnl_pct,
-                                    trade_time=duration_str,
-                                    output_path=image_path
-                                )
-                                
-                                try:
-                                    await self.telegram_service.send_photo(
-                                        session,
-                                        image_path,
-                                        caption=f"{symbol} closed with {close_reason.lower()}"
-                                    )
-                                finally:
-                                    os.remove(image_path)
-                                
-                                # Remove from active positions
-                                self.trade_manager.remove_position(symbol)
-                                if symbol in self.position_messages:
-                                    del self.position_messages[symbol]
-                                
-                                continue
-                        
-                        # Calculate liquidation price with buffer
-                        buffer = 0.05  # 5% buffer
-                        if position.side == "BUY":
-                            # For long positions, liquidation price is lower
-                            # Add buffer to make it more realistic
-                            liquidation_price = position.entry * (1 - (1 / position.leverage) + buffer)
+                    margin_used = float(metrics.margin_used[i])
+                    pnl = float(metrics.pnl[i])
+                    pnl_pct = float(metrics.pnl_pct[i])
+                    roi = float(metrics.roi[i])
+
+                    # Check if TP or SL is hit
+                    if metrics.tp_hit[i] or metrics.sl_hit[i]:
+                        if metrics.tp_hit[i]:
+                            log.info("🎯 TP hit for %s at %s (TP: %s)", symbol, position.mark_price, position.tp_price)
+                            close_reason = "TP"
                         else:
-                            # For short positions, liquidation price is higher
-                            # Subtract buffer to make it more realistic
-                            liquidation_price = position.entry * (1 + (1 / position.leverage) - buffer)
-                            
-                        # Ensure liquidation price is not zero or negative
-                        if liquidation_price <= 0:
-                            liquidation_price = position.entry * 0.5  # Set to 50% of entry price as fallback
-                            
-                        position.liquidation_price = liquidation_price
-                        
-                        # Validate entry price
-                        if entry_price <= 0:
-                            print(f"⚠️ Warning: Invalid entry price ({entry_price}) for {symbol}, skipping update")
-                            continue
-                            
-                        position.entry = entry_price
-                        
-                        # Calculate PnL
-                        qty = abs(position.qty)
-                        if position.side == "BUY":
-                            pnl = (position.mark_price - position.entry) * qty
-                            pnl_pct = ((position.mark_price - position.entry) / position.entry * 100)
-                        else:
-                            pnl = (position.entry - position.mark_price) * qty
-                            pnl_pct = ((position.entry - position.mark_price) / position.entry * 100)
-                        
-                        # Calculate ROI based on margin used
-                        roi = (pnl / margin_used * 100) if margin_used != 0 else 0
-                        
-                        # Calculate duration
-                        duration = datetime.now() - position.timestamp
-                        duration_str = str(duration).split('.')[0]  # Remove microseconds
-                        
-                        # Calculate price changes for TP/SL/Margin Call
-                        tp_change = ((position.tp_price - position.entry) / position.entry * 100)
-                        sl_change = ((position.sl_price - position.entry) / position.entry * 100)
-                        mc_change = ((position.liquidation_price - position.entry) / position.entry * 100)
-                        
-                        # Send Telegram notification for position update
-                        mode_prefix = "🤖 DEMO" if self.config.binance.bot_mode == "DEMO" else "💰 REAL"
-                        direction = "Long 🚀" if position.side == "BUY" else "Short 🔻"
-                        message = (
-                            f"<pre>\n"
-                            f"{mode_prefix} Posisi Aktif : {symbol} ({direction})\n"
-                            f"🎯 Entry        : {position.entry:.6f}\n"
-                            f"📦 Size         : {qty:.1f} {symbol.replace('USDT', '')}\n"
-                            f"🪙 Margin       : {margin_used:.2f} USDT\n"
-                            f"📈 Leverage     : {position.leverage}x ({margin_used:.2f} USDT)\n\n"
-                            f"💰 Mark Price   : {position.mark_price:.6f}\n"
-                            f"📊 Spread       : {position.spread:.6f}\n\n"
-                            f"📊 PNL:\n"
-                            f"   • Realized   : {pnl:+.4f} USDT\n"
-                            f"   • Percentage : {pnl_pct:+.2f}%\n"
-                            f"   • ROI        : {roi:+.2f}%\n\n"
-                            f"🎯 TP           : {position.tp_price:.6f} ({tp_change:+.2f}%)\n"
-                            f"🛑 SL           : {position.sl_price:.6f} ({sl_change:+.2f}%)\n"
-                            f"⚠️ Margin Call  : {position.liquidation_price:.6f} ({mc_change:+.2f}%)\n"
-                            f"⏰ Last Update  : {datetime.now().strftime('%H:%M:%S')}\n"
-                            f"</pre>"
+                            log.info("🛑 SL hit for %s at %s (SL: %s)", symbol, position.mark_price, position.sl_price)
+                            close_reason = "SL"
+
+                        # Close position
+                        order = await self.binance_service.place_order(
+                            session,
+                            symbol,
+                            "SELL" if position.direction > 0 else "BUY",
+                            abs(position.qty),
+                            reduce_only=True
                         )
-                        
-                        # Check if we already have a message for this position
-                        if symbol in self.position_messages:
-                            # Update existing message
-                            await self.telegram_service.edit_message(
-                                session,
-                                self.position_messages[symbol],
-                                message
-                            )
+
+                        # Book the actual fill (slippage included) when the exchange reports one
+                        exit_price = float(order.get('avgPrice') or 0) if order else 0.0
+                        if exit_price > 0:
+                            pnl = (exit_price - position.entry) * position.direction * abs(position.qty)
+                            pnl_pct = (exit_price - position.entry) * position.direction / position.entry * 100
+                            roi = pnl / margin_used * 100 if margin_used else 0.0
                         else:
-                            # Send new message and store its ID
-                            response = await self.telegram_service.send_message(
-                                session,
-                                message
-                            )
-                            if response and 'result' in response and 'message_id' in response['result']:
-                                self.position_messages[symbol] = response['result']['message_id']
-                        
-                        print(f"\n📊 Active Position Update:")
-                        print(f"Symbol: {symbol}")
-                        print(f"Side: {position.side}")
-                        print(f"Entry: {position.entry:.8f}")
-                        print(f"Size: {qty:.8f}")
-                        print(f"Margin: {margin_used:.2f} USDT")
-                        print(f"Leverage: {position.leverage}x")
-                        print(f"Mark Price: {position.mark_price:.8f}")
-                        print(f"Spread: {position.spread:.4f}%")
-                        print(f"PnL: {pnl:.2f} USDT ({pnl_pct:.2f}%)")
-                        print(f"ROI: {roi:.2f}%")
-                        print(f"TP: {position.tp_price:.8f}")
-                        print(f"SL: {position.sl_price:.8f}")
-                        print(f"Margin Call: {position.liquidation_price:.8f}")
-                        print(f"Duration: {duration_str}")
-                        
+                            exit_price = position.mark_price
+
+                        await self._record_close(
+                            session, symbol, position, exit_price, pnl, pnl_pct, roi,
+                            margin_used, close_reason, position.price_change_5m,
+                            position.upper_band - position.lower_band if position.upper_band and position.lower_band else 0.0,
+                            position.ema20 / position.ema50 if position.ema20 and position.ema50 else 0.0
+                        )
+                        continue
+
+                    qty = abs(position.qty)
+
+                    # Calculate duration
+                    duration = clock.now() - position.timestamp
+                    duration_str = str(duration).split('.')[0]  # Remove microseconds
+
+                    # Price changes for TP/SL/Margin Call
+                    tp_change = float(metrics.tp_change[i])
+                    sl_change = float(metrics.sl_change[i])
+                    mc_change = float(metrics.mc_change[i])
+
+                    # Send Telegram notification for position update
+                    mode_prefix = "🤖 DEMO" if self.config.binance.bot_mode == "DEMO" else "💰 REAL"
+                    direction = "Long 🚀" if position.direction > 0 else "Short 🔻"
+                    message = (
+                        f"<pre>\n"
+                        f"{mode_prefix} Posisi Aktif : {symbol} ({direction})\n"
+                        f"🎯 Entry        : {position.entry:.6f}\n"
+                        f"📦 Size         : {qty:.1f} {symbol.replace('USDT', '')}\n"
+                        f"🪙 Margin       : {margin_used:.2f} USDT\n"
+                        f"📈 Leverage     : {position.leverage}x ({margin_used:.2f} USDT)\n\n"
+                        f"💰 Mark Price   : {position.mark_price:.6f}\n"
+                        f"📊 Spread       : {position.spread:.6f}\n\n"
+                        f"📊 PNL:\n"
+                        f"   • Realized   : {pnl:+.4f} USDT\n"
+                        f"   • Percentage : {pnl_pct:+.2f}%\n"
+                        f"   • ROI        : {roi:+.2f}%\n\n"
+                        f"🎯 TP           : {position.tp_price:.6f} ({tp_change:+.2f}%)\n"
+                        f"🛑 SL           : {position.sl_price:.6f} ({sl_change:+.2f}%)\n"
+                        f"⚠️ Margin Call  : {position.liquidation_price:.6f} ({mc_change:+.2f}%)\n"
+                        f"⏰ Last Update  : {clock.now().strftime('%H:%M:%S')}\n"
+                        f"</pre>"
+                    )
+
+                    # Check if we already have a message for this position
+                    if symbol in self.trade_manager.position_messages:
+                        # Update existing message
+                        await self.telegram_service.edit_message(
+                            session,
+                            self.trade_manager.position_messages[symbol],
+                            message
+                        )
+                    else:
+                        # Send new message and store its ID
+                        response = await self.telegram_service.send_message(
+                            session,
+                            message
+                        )
+                        if response and 'result' in response and 'message_id' in response['result']:
+                            self.trade_manager.set_position_message(symbol, response['result']['message_id'])
+
+                    # One structured record per position, only built when DEBUG is on
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug(
+                            "📊 %s %s entry=%.8f mark=%.8f pnl=%.2f USDT (%.2f%%) roi=%.2f%% duration=%s",
+                            symbol, position.side, position.entry, position.mark_price,
+                            pnl, pnl_pct, roi, duration_str,
+                            extra={"fields": {
+                                "event": "position_update", "symbol": symbol, "side": position.side,
+                                "entry": position.entry, "qty": qty, "margin": margin_used,
+                                "leverage": position.leverage, "mark_price": position.mark_price,
+                                "spread": position.spread, "pnl": pnl, "pnl_pct": pnl_pct, "roi": roi,
+                                "tp_price": position.tp_price, "sl_price": position.sl_price,
+                                "liquidation_price": position.liquidation_price, "duration": duration_str
+                            }}
+                        )
+
                 except Exception as e:
-                    print(f"❌ Error updating position {symbol}: {e}")
+                    log.error("❌ Error updating position %s: %s", symbol, e)
                     continue
-            
+
             # Wait for 5 seconds before next update
-            await asyncio.sleep(5)
+            await clock.sleep(5)
+
+    def scan_wait(self) -> float:
+        """Seconds to hold off scanning for entries, 0 when a new trade is allowed"""
+        if len(self.trade_manager.positions) >= self.config.risk.max_positions:
+            return 10
+
+        self.trade_manager.reset_daily_counters()
+
+        if (
+            self.config.risk.max_daily_trades is not None and 
+            self.trade_manager.daily_trade_count >= self.config.risk.max_daily_trades
+        ):
+            log.warning("⚠️ Daily trade limit reached (%s trades)", self.config.risk.max_daily_trades)
+            return self.config.risk.scan_interval
+        if (
+            self.config.risk.max_consecutive_losses is not None and 
+            self.trade_manager.consecutive_losses >= self.config.risk.max_consecutive_losses
+        ):
+            log.warning("⚠️ Trading paused due to %s consecutive losses", self.trade_manager.consecutive_losses)
+            return self.config.risk.scan_interval
+        return 0
 
     async def bot_loop(self, session: aiohttp.ClientSession):
         while True:
-            if self.trade_manager.positions:
-                await asyncio.sleep(10)
+            wait = self.scan_wait()
+            if wait:
+                await clock.sleep(wait)
                 continue
 
-            self.trade_manager.reset_daily_counters()
-
-            if (
-                self.config.risk.max_daily_trades is not None and 
-                self.trade_manager.daily_trade_count >= self.config.risk.max_daily_trades
-            ):
-                print(f"⚠️ Daily trade limit reached ({self.config.risk.max_daily_trades} trades)")
-                await asyncio.sleep(self.config.risk.scan_interval)
-                continue
-            if (
-                self.config.risk.max_consecutive_losses is not None and 
-                self.trade_manager.consecutive_losses >= self.config.risk.max_consecutive_losses
-            ):
-                print(f"⚠️ Trading paused due to {self.trade_manager.consecutive_losses} consecutive losses")
-                await asyncio.sleep(self.config.risk.scan_interval)
+            self.scan_count += 1
+            scan_started = time.perf_counter()
+            with tracer.span("scan", scan=self.scan_count):
+                with tracer.span("scan.get_symbols", scan=self.scan_count):
+                    symbols = await self.binance_service.get_symbols(session)
+                if self.order_books is not None:
+                    self.order_books.track(symbols)
+                scheduler = self.trading_service.scan_scheduler
+                if scheduler is not None:
+                    listed = len(symbols)
+                    symbols = scheduler.due(symbols)
+                    log.debug(
+                        "🗓️ %s of %s symbols due", len(symbols), listed,
+                        extra={"fields": {"event": "scan_schedule", "due": len(symbols), **scheduler.metrics()}}
+                    )
+                log.info("🔍 Scanning market for opportunities...")
+                with tracer.span("scan.analyze", scan=self.scan_count, symbols=len(symbols)):
+                    if self.scan_pool is not None:
+                        results = await self.scan_pool.scan(symbols)
+                        best = strongest([
+                            r for r in results
+                            if r and r["signal"] != "WAIT" and self._accept_candidate(r)
+                        ])
+                        found_at = time.perf_counter()
+                    else:
+                        outcome = await self.scan_pipeline.scan(session, symbols)
+                        best, found_at = outcome.best, outcome.found_at
+                        if outcome.early:
+                            log.info(
+                                "⚡ %s reached confidence %s, dispatched after %s of %s symbols",
+                                best["symbol"], best["entry_confidence_score"], outcome.analyzed, len(symbols)
+                            )
+            self._check_slow_scan(scan_started)
+
+            if not self.first_scan_reported and symbols:
+                self.first_scan_reported = True
+                log.info(
+                    "🚀 First scan of %s symbols ready %.2fs after start",
+                    len(symbols), time.perf_counter() - PROCESS_START
+                )
+
+            if best is None:
+                log.info("💤 No trading opportunities found, waiting for next scan...")
+                await clock.sleep(self.scan_pause())
                 continue
 
-            symbols = await self.binance_service.get_symbols(session)
-            print("🔍 Scanning market for opportunities...")
-            results = await asyncio.gather(*[
-                self.trading_service.analyze(session, symbol)
-                for symbol in symbols
-            ])
-
-            candidates = [r for r in results if r and r["signal"] != "WAIT"]
-            if not candidates:
-                print("💤 No trading opportunities found, waiting for next scan...")
-                await asyncio.sleep(self.config.risk.scan_interval)
-                continue
+            await self.dispatch(session, best, found_at)
 
-            def signal_strength(item):
-                _, _, _, rsi, _ = item
-                return abs(rsi - 50)
+            await clock.sleep(self.scan_pause())
 
-            # Find the candidate with the strongest signal based on RSI deviation from 50
-            strongest_candidate = max(candidates, key=lambda x: abs(x["rsi"] - 50))
-            
-            # Extract all data from the strongest candidate
-            trade_data = strongest_candidate
+    def scan_pause(self) -> float:
+        """Seconds between scans; adaptive scans run often and refresh only the symbols due"""
+        if self.trading_service.scan_scheduler is not None:
+            return self.config.scan.min_interval
+        return self.config.risk.scan_interval
 
-            # Store RSI and ATR in the position object
-            position = await self.trading_service.process_trade(
-                session,
-                trade_data
-            )
+    async def dispatch(self, session: aiohttp.ClientSession, best: Dict, found_at: float):
+        """Open a trade for the chosen candidate"""
+        # Extract all data from the strongest candidate
+        trade_data = best
 
-            await asyncio.sleep(self.config.risk.scan_interval)
+        # Store RSI and ATR in the position object
+        position = await self.trading_service.process_trade(
+            session,
+            trade_data
+        )
+        latency_ms = (time.perf_counter() - found_at) * 1000
+        log.debug(
+            "⏱️ %s signal to order in %.0f ms", best["symbol"], latency_ms,
+            extra={"fields": {"event": "signal_to_order", "symbol": best["symbol"], "ms": latency_ms}}
+        )
+        return position
+
+    def _accept_candidate(self, candidate: Dict) -> bool:
+        """Skip symbols already held and ones moving with an open position"""
+        symbol = candidate["symbol"]
+        open_symbols = list(self.trade_manager.positions)
+        if not open_symbols:
+            return True
+        if symbol in self.trade_manager.positions:
+            return False
+        limit = self.config.correlation.max_correlation
+        if limit <= 0:
+            return True
+        match = self.trading_service.correlation.most_correlated(symbol, open_symbols)
+        if match is not None and abs(match[1]) >= limit:
+            log.info("🔗 Skipping %s: correlation %.2f with open %s", symbol, match[1], match[0])
+            return False
+        return True
+
+    def _check_slow_scan(self, scan_started: float):
+        """Dump the spans of a scan that took longer than TRACE_SLOW_SCAN_MS"""
+        threshold_ms = self.config.tracing.slow_scan_ms
+        if not tracer.enabled or threshold_ms <= 0:
+            return
+        elapsed_ms = (time.perf_counter() - scan_started) * 1000
+        if elapsed_ms > threshold_ms:
+            path = self.dump_trace(since=scan_started, label=f"slow_scan_{self.scan_count}")
+            log.warning("🐢 Scan #%s took %.0f ms (> %s ms), trace written to %s",
+                        self.scan_count, elapsed_ms, threshold_ms, path)
+
+    def dump_trace(self, since: float = 0.0, label: str = "on_demand") -> str:
+        """Write the trace ring buffer in Chrome trace-event format"""
+        path = os.path.join(
+            self.config.tracing.directory,
+            f"trace_{label}_{clock.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        tracer.dump(path, since=since)
+        log.info("🧵 Trace written to %s", path)
+        return path
 
-    async def print_summary(self, session: aiohttp.ClientSession, mode: str = "hourly"):
-        total = len(self.trade_manager.trades)
+    def _install_trace_dump_handler(self):
+        """``kill -USR1 <pid>`` dumps the trace buffer while the bot keeps running"""
+        if not tracer.enabled:
+            return
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.dump_trace)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            log.debug("SIGUSR1 trace dump not available on this platform")
+
+    def dump_memory(self) -> str:
+        """Write memory metrics and top allocation sites as JSON"""
+        path = os.path.join(
+            self.config.memory.directory,
+            f"memory_{clock.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        self.memory.export(path)
+        log.info("🧠 Memory report written to %s", path)
+        return path
+
+    def _install_memory_dump_handler(self):
+        """``kill -USR2 <pid>`` writes a memory report while the bot keeps running"""
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR2, self.dump_memory)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            log.debug("SIGUSR2 memory dump not available on this platform")
+
+    async def print_summary(self, session: aiohttp.ClientSession, mode: str = "hourly",
+                            end: Optional[datetime] = None):
+        """Summarize the hour or day before ``end`` (default: the trailing one, rounded out to whole hours)"""
+        window = 3600 if mode == "hourly" else 86400
+        if end is None:
+            stats = self.trade_manager.stats.last(window)
+        else:
+            stats = self.trade_manager.stats.window(end - timedelta(seconds=window), end)
+        total = stats.trades
         if total == 0:
-            print("📊 Belum ada trade untuk disummarize.")
+            log.info("📊 Belum ada trade untuk disummarize.")
             return
 
-        win = sum(1 for t in self.trade_manager.trades if t['pnl'] > 0)
-        loss = total - win
-        net_pnl = sum(t['pnl'] for t in self.trade_manager.trades)
+        win = stats.wins
+        loss = stats.losses
+        net_pnl = stats.net_pnl
         net_pct = (net_pnl / float(self.config.fixed_usdt_balance)) * 100
-        winrate = (win / total) * 100
+        winrate = stats.winrate
+        exposure = str(timedelta(seconds=int(stats.exposure_seconds)))
         caption = "Hourly Summary" if mode == "hourly" else "Daily Summary"
 
+        label = f"{mode} [{self.name}]" if self.name else mode
         summary_text = (
-            f"📊 SUMMARY PER {mode}\n"
+            f"📊 SUMMARY PER {label}\n"
             f"🧾 Total Trades : {total}\n"
             f"✅ Win          : {win}\n"
             f"❌ Loss         : {loss}\n"
             f"📈 Winrate      : {winrate:.2f}%\n"
             f"💰 Net PnL      : {net_pnl:.4f} USDT\n"
             f"📊 Net PnL %    : {net_pct:.2f}%\n"
+            f"📉 Max Drawdown : {stats.max_drawdown:.4f} USDT\n"
+            f"⏱️ Exposure     : {exposure}\n"
         )
 
-        print(summary_text)
+        log.info(summary_text)
         await self.telegram_service.send_message(session, summary_text)
 
-        image_path = f"/tmp/{mode.lower()}_summary_{int(datetime.now().timestamp())}.png"
-        create_summary_report(total, win, loss, winrate, net_pnl, net_pct, image_path, mode=caption)
-
+        image_path = f"/tmp/{mode.lower()}_summary_{int(clock.now().timestamp())}.png"
         try:
+            create_summary_report(total, win, loss, winrate, net_pnl, net_pct, image_path, mode=caption)
             await self.telegram_service.send_photo(session, image_path, caption=caption)
+        except Exception as e:
+            log.error("❌ Error sending %s summary image: %s", mode, e)
         finally:
-            os.remove(image_path)
+            if os.path.exists(image_path):
+                os.remove(image_path)
 
-        if mode.lower().startswith("daily"):
-            self.trade_manager.clear_trades()
-
-    async def wait_until(self, hour: int = 7, minute: int = 0):
-        now = datetime.now()
+    async def wait_until(self, hour: int = 7, minute: int = 0) -> datetime:
+        now = clock.now()
         target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
         if target <= now:
             target += timedelta(days=1)
         wait_seconds = (target - now).total_seconds()
-        await asyncio.sleep(wait_seconds)
+        await clock.sleep(wait_seconds)
+        return target
 
     async def hourly_summary_loop(self, session: aiohttp.ClientSession):
+        """Summarize every clock hour right after it ends, one whole stats bucket each"""
         while True:
-            await asyncio.sleep(1800)  # 1 hour
-            await self.print_summary(session, mode="hourly")
+            end = (clock.time() // 3600 + 1) * 3600
+            await clock.sleep(end - clock.time())
+            await self.print_summary(session, mode="hourly", end=datetime.fromtimestamp(end))
 
     async def daily_summary_loop(self, session: aiohttp.ClientSession):
         while True:
-            await self.wait_until(7, 0)
-            await self.print_summary(session, mode="daily")
+            end = await self.wait_until(7, 0)
+            await self.print_summary(session, mode="daily", end=end)
+
+    async def request_metrics_loop(self):
+        """Publish breaker states, retries, hedges, latencies and request cache ratios"""
+        while True:
+            await clock.sleep(self.config.resilience.metrics_interval)
+            self.binance_service.resilience.log_metrics()
+            if self.binance_service.coalescer is not None:
+                self.binance_service.coalescer.log_metrics()
+
+    async def memory_loop(self):
+        """Sample memory, log gauges and allocation growth, enforce the budgets"""
+        while True:
+            await clock.sleep(self.config.memory.interval)
+            pruned = self.trade_manager.prune_position_messages()
+            if pruned:
+                log.info("🧹 Dropped %s message ids of closed positions", pruned)
+            self.memory.log_metrics()
 
     async def start_summary_loops(self, session: aiohttp.ClientSession):
         await asyncio.gather(
@@ -653,7 +825,7 @@ class TradingBot:
         )
         
     async def is_active_hour(self, start_hour=22, end_hour=7):
-        now = datetime.now(timezone(timedelta(hours=7)))
+        now = clock.now(timezone(timedelta(hours=7)))
 
         start_time = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
         end_time = now.replace(hour=end_hour, minute=0, second=0, microsecond=0)
@@ -674,32 +846,83 @@ class TradingBot:
         ssl_context = ssl.create_default_context()
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
+        self._install_trace_dump_handler()
+        self._install_memory_dump_handler()
+        self.memory.start()
 
         while True:
             # if await self.is_active_hour(22, 7):
-                print("⏰ Aktif! Menjalankan bot...")
+                log.info("⏰ Aktif! Menjalankan bot...")
                 async with aiohttp.ClientSession(
                     connector=aiohttp.TCPConnector(ssl=ssl_context)
                 ) as session:
                     # Test API connection first
                     if self.config.binance.bot_mode == "REAL":
                         if not await self.binance_service.test_connection(session):
-                            print("❌ API connection test failed. Please check your API key permissions.")
-                            await asyncio.sleep(300)
+                            log.error("❌ API connection test failed. Please check your API key permissions.")
+                            await clock.sleep(300)
                             continue
-                    
-                    await asyncio.gather(
+
+                    await self.reconcile_positions(session)
+
+                    loops = [
                         self.bot_loop(session),
                         self.update_positions(session),
                         self.start_summary_loops(session)
-                    )
+                    ]
+                    if self.order_books is not None:
+                        loops.append(self.order_books.run(session))
+                    if self.config.resilience.metrics_interval > 0:
+                        loops.append(self.request_metrics_loop())
+                    if self.config.memory.interval > 0:
+                        loops.append(self.memory_loop())
+                    await asyncio.gather(*loops)
             # else:
             #     print("🛑 Diluar jam aktif (22:00 - 07:00). Tidur 5 menit...")
-            #     await asyncio.sleep(300)  # 5 menit
-
-def main():
-    bot = TradingBot()
-    asyncio.run(bot.run())
+            #     await clock.sleep(300)  # 5 menit
+
+    def shutdown(self):
+        """Persist state so the next start resumes where this one stopped"""
+        self.trade_manager.checkpoint()
+        self.trade_manager.state_log.close()
+        log.info("💾 State snapshot written")
+        if self.owns_market_cache:
+            self.market_cache.save()
+        if self.scan_pool is not None:
+            self.scan_pool.close()
+        self.memory.stop()
+
+def create_bot():
+    """A TradingBot, or a StrategyHost when STRATEGIES lists configurations to run side by side"""
+    config = load_config()
+    strategies = load_strategy_configs(config)
+    if not strategies:
+        return TradingBot(config)
+    market_cache = MarketDataCache(config.cache.path, config.cache.exchange_info_ttl)
+    market_cache.load()
+    bots = [TradingBot(strategy, name=name, market_cache=market_cache) for name, strategy in strategies.items()]
+    return StrategyHost(bots, market_cache)
+
+def main(prepare=None):
+    """Run the bot; ``prepare(bot)`` may adjust it before it starts (e.g. to record)"""
+    log_config = load_log_config()
+    listener = setup_logging(
+        log_config.level,
+        log_config.json_path,
+        repeat_window=log_config.repeat_window
+    )
+    try:
+        bot = create_bot()
+        if prepare is not None:
+            prepare(bot)
+        try:
+            asyncio.run(bot.run())
+        except KeyboardInterrupt:
+            log.info("🛑 Stopping bot...")
+        finally:
+            bot.shutdown()
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,290 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Numeric position fields, stored column-wise as float64 arrays
+FLOAT_FIELDS = (
+    "entry", "qty", "tp_price", "sl_price", "timestamp", "margin", "leverage",
+    "mark_price", "liquidation_price", "spread", "rsi", "atr", "ema20", "ema50",
+    "last_close", "lower_band", "upper_band", "volume_now", "volume_avg10",
+    "entry_confidence_score", "price_change_5m"
+)
+BOOL_FIELDS = ("is_green", "is_red")
+TEXT_FIELDS = ("side", "signal", "reason", "candle_pattern")
+
+# Both order sides and signal names map to a direction (+1 long, -1 short)
+DIRECTIONS = {"BUY": 1, "LONG": 1, "SELL": -1, "SHORT": -1}
+
+
+class PositionMetrics(NamedTuple):
+    """Risk figures for every open position, one array element per row"""
+    symbols: List[str]
+    margin_used: np.ndarray
+    pnl: np.ndarray
+    pnl_pct: np.ndarray
+    roi: np.ndarray
+    liquidation_price: np.ndarray
+    tp_change: np.ndarray
+    sl_change: np.ndarray
+    mc_change: np.ndarray
+    tp_hit: np.ndarray
+    sl_hit: np.ndarray
+
+
+class PositionView:
+    """Row view over a PositionBook that reads and writes like a Position"""
+    __slots__ = ("_book", "_row", "symbol")
+
+    def __init__(self, book: "PositionBook", row: int, symbol: str):
+        self._book = book
+        self._row = row
+        self.symbol = symbol
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self._book._floats["timestamp"][self._row])
+
+    @timestamp.setter
+    def timestamp(self, value: datetime) -> None:
+        self._book._floats["timestamp"][self._row] = value.timestamp()
+
+    @property
+    def side(self) -> str:
+        return self._book._texts["side"][self._row]
+
+    @side.setter
+    def side(self, value: str) -> None:
+        self._book._texts["side"][self._row] = value
+        self._book._direction[self._row] = DIRECTIONS.get(value, 1)
+
+    @property
+    def direction(self) -> int:
+        return int(self._book._direction[self._row])
+
+    def __repr__(self) -> str:
+        return f"PositionView({self.symbol}, side={self.side}, entry={self.entry}, qty={self.qty})"
+
+
+def _float_property(name: str) -> property:
+    def getter(self):
+        return float(self._book._floats[name][self._row])
+
+    def setter(self, value):
+        self._book._floats[name][self._row] = value
+
+    return property(getter, setter)
+
+
+def _bool_property(name: str) -> property:
+    def getter(self):
+        return bool(self._book._bools[name][self._row])
+
+    def setter(self, value):
+        self._book._bools[name][self._row] = bool(value)
+
+    return property(getter, setter)
+
+
+def _text_property(name: str) -> property:
+    def getter(self):
+        return self._book._texts[name][self._row]
+
+    def setter(self, value):
+        self._book._texts[name][self._row] = value
+
+    return property(getter, setter)
+
+
+for _name in FLOAT_FIELDS:
+    if _name != "timestamp":
+        setattr(PositionView, _name, _float_property(_name))
+for _name in BOOL_FIELDS:
+    setattr(PositionView, _name, _bool_property(_name))
+for _name in TEXT_FIELDS:
+    if _name != "side":
+        setattr(PositionView, _name, _text_property(_name))
+
+
+class PositionBook:
+    """Open positions stored as parallel arrays (struct-of-arrays).
+
+    Behaves like the ``Dict[str, Position]`` it replaces: lookups return
+    ``PositionView`` rows, and ``evaluate`` computes PnL, ROI, margin,
+    liquidation and TP/SL hits for all rows in one vectorized step.
+    """
+
+    def __init__(self, capacity: int = 16):
+        self._capacity = capacity
+        self._size = 0
+        self._floats = {name: np.zeros(capacity) for name in FLOAT_FIELDS}
+        self._bools = {name: np.zeros(capacity, dtype=bool) for name in BOOL_FIELDS}
+        self._direction = np.zeros(capacity, dtype=np.int8)
+        self._texts: Dict[str, List[str]] = {name: [] for name in TEXT_FIELDS}
+        self._symbols: List[str] = []
+        self._views: List[PositionView] = []
+        self._rows: Dict[str, int] = {}
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for name, column in self._floats.items():
+            self._floats[name] = np.resize(column, self._capacity)
+        for name, column in self._bools.items():
+            self._bools[name] = np.resize(column, self._capacity)
+        self._direction = np.resize(self._direction, self._capacity)
+
+    def add(self, symbol: str, position) -> PositionView:
+        """Copy a Position (or any object with the same attributes) into the book"""
+        if symbol in self._rows:
+            self.remove(symbol)
+        if self._size == self._capacity:
+            self._grow()
+
+        row = self._size
+        for name in FLOAT_FIELDS:
+            if name == "timestamp":
+                self._floats[name][row] = position.timestamp.timestamp()
+            else:
+                self._floats[name][row] = float(getattr(position, name) or 0.0)
+        for name in BOOL_FIELDS:
+            self._bools[name][row] = bool(getattr(position, name))
+        for name in TEXT_FIELDS:
+            self._texts[name].append(getattr(position, name) or "")
+        self._direction[row] = DIRECTIONS.get(position.side, 1)
+
+        view = PositionView(self, row, symbol)
+        self._symbols.append(symbol)
+        self._views.append(view)
+        self._rows[symbol] = row
+        self._size += 1
+        return view
+
+    def remove(self, symbol: str) -> None:
+        """Remove a row by moving the last row into its slot"""
+        row = self._rows.pop(symbol, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            for column in self._floats.values():
+                column[row] = column[last]
+            for column in self._bools.values():
+                column[row] = column[last]
+            self._direction[row] = self._direction[last]
+            for column in self._texts.values():
+                column[row] = column[last]
+            moved = self._symbols[last]
+            self._symbols[row] = moved
+            self._views[row] = self._views[last]
+            self._views[row]._row = row
+            self._rows[moved] = row
+        for column in self._texts.values():
+            column.pop()
+        self._symbols.pop()
+        self._views.pop()
+        self._size -= 1
+
+    def column(self, name: str) -> np.ndarray:
+        """Live array of one field for the occupied rows"""
+        if name in self._floats:
+            return self._floats[name][:self._size]
+        if name in self._bools:
+            return self._bools[name][:self._size]
+        if name == "direction":
+            return self._direction[:self._size]
+        raise KeyError(name)
+
+    def to_dict(self, symbol: str) -> Dict:
+        """Plain field dict for one row, e.g. for persistence"""
+        row = self._rows[symbol]
+        data = {name: float(self._floats[name][row]) for name in FLOAT_FIELDS}
+        data.update({name: bool(self._bools[name][row]) for name in BOOL_FIELDS})
+        data.update({name: self._texts[name][row] for name in TEXT_FIELDS})
+        return data
+
+    def evaluate(self, tolerance: float = 0.0001, liquidation_buffer: float = 0.05) -> PositionMetrics:
+        """Compute risk figures for every open position at once.
+
+        ``tolerance`` is the fraction of mark price allowed around TP/SL to
+        absorb spread; ``liquidation_buffer`` pulls the estimated liquidation
+        price towards entry. The estimated liquidation price is written back
+        to the book.
+        """
+        n = self._size
+        entry = self._floats["entry"][:n]
+        qty = np.abs(self._floats["qty"][:n])
+        mark = self._floats["mark_price"][:n]
+        leverage = self._floats["leverage"][:n]
+        tp = self._floats["tp_price"][:n]
+        sl = self._floats["sl_price"][:n]
+        direction = self._direction[:n].astype(np.float64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            margin_used = np.where(leverage > 0, qty * entry / leverage, 0.0)
+            move = (mark - entry) * direction
+            pnl = move * qty
+            pnl_pct = np.where(entry > 0, move / entry * 100, 0.0)
+            roi = np.where(margin_used != 0, pnl / margin_used * 100, 0.0)
+
+            inverse_leverage = np.where(leverage > 0, 1 / leverage, 1.0)
+            liquidation = entry * (1 - direction * (inverse_leverage - liquidation_buffer))
+            liquidation = np.where(liquidation <= 0, entry * 0.5, liquidation)
+            self._floats["liquidation_price"][:n] = liquidation
+
+            tp_change = np.where(entry > 0, (tp - entry) / entry * 100, 0.0)
+            sl_change = np.where(entry > 0, (sl - entry) / entry * 100, 0.0)
+            mc_change = np.where(entry > 0, (liquidation - entry) / entry * 100, 0.0)
+
+        # Hits are signed so that one comparison covers both longs and shorts
+        slack = mark * tolerance
+        priced = mark > 0
+        tp_hit = priced & (direction * (mark - tp) >= -slack)
+        sl_hit = priced & ~tp_hit & (direction * (sl - mark) >= -slack)
+
+        return PositionMetrics(
+            symbols=list(self._symbols),
+            margin_used=margin_used,
+            pnl=pnl,
+            pnl_pct=pnl_pct,
+            roi=roi,
+            liquidation_price=liquidation.copy(),
+            tp_change=tp_change,
+            sl_change=sl_change,
+            mc_change=mc_change,
+            tp_hit=tp_hit,
+            sl_hit=sl_hit
+        )
+
+    # Mapping interface kept compatible with the former Dict[str, Position]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._symbols))
+
+    def __getitem__(self, symbol: str) -> PositionView:
+        return self._views[self._rows[symbol]]
+
+    def __delitem__(self, symbol: str) -> None:
+        if symbol not in self._rows:
+            raise KeyError(symbol)
+        self.remove(symbol)
+
+    def get(self, symbol: str, default=None) -> Optional[PositionView]:
+        row = self._rows.get(symbol)
+        return default if row is None else self._views[row]
+
+    def keys(self) -> List[str]:
+        return list(self._symbols)
+
+    def values(self) -> List[PositionView]:
+        return list(self._views)
+
+    def items(self) -> List[Tuple[str, PositionView]]:
+        return list(zip(self._symbols, self._views))
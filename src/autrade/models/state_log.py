@@ -0,0 +1,151 @@
+import json
+import os
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.log import get_logger
+
+log = get_logger("state")
+
+# Writer thread jobs
+_APPEND, _SNAPSHOT, _CLOSE = "append", "snapshot", "close"
+
+
+class StateLog:
+    """Append-only write-ahead log of TradeManager transitions with compact snapshots.
+
+    Every transition is serialized to one JSON line for ``state.wal`` before
+    the caller applies it. Like logging, the file I/O happens on a
+    background writer thread: it takes whatever has queued up, writes it in
+    order and fsyncs once per batch, so the event loop never blocks on disk.
+    After ``snapshot_every`` records the full state is written to
+    ``state.snapshot.json`` (atomically, via rename) and the log is
+    truncated, so a restart only replays a short tail no matter how long the
+    bot has been running. ``close`` waits until everything queued is on disk.
+    """
+
+    def __init__(self, directory: str = "data/state", snapshot_every: int = 200, fsync: bool = True):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.wal_path = os.path.join(directory, "state.wal")
+        self.snapshot_path = os.path.join(directory, "state.snapshot.json")
+        self.seq = 0
+        self.records_since_snapshot = 0
+        os.makedirs(directory, exist_ok=True)
+        self._wal = None
+        self._jobs: "queue.SimpleQueue[Tuple[str, Optional[str]]]" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="state-log", daemon=True)
+        self._writer.start()
+
+    def _open(self):
+        if self._wal is None:
+            self._wal = open(self.wal_path, "a", encoding="utf-8")
+        return self._wal
+
+    def _sync(self, f) -> None:
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def append(self, op: str, data: Dict) -> int:
+        """Queue one transition for the writer and return its sequence number"""
+        self.seq += 1
+        line = json.dumps({"seq": self.seq, "op": op, "data": data}, separators=(",", ":")) + "\n"
+        self._jobs.put((_APPEND, line))
+        self.records_since_snapshot += 1
+        return self.seq
+
+    def snapshot_due(self) -> bool:
+        return self.records_since_snapshot >= self.snapshot_every
+
+    def write_snapshot(self, state: Dict) -> None:
+        """Queue the full state; the writer replaces the snapshot and truncates the log it supersedes"""
+        self._jobs.put((_SNAPSHOT, json.dumps({"seq": self.seq, "state": state}, separators=(",", ":"))))
+        self.records_since_snapshot = 0
+
+    def _write_loop(self) -> None:
+        while True:
+            jobs = [self._jobs.get()]
+            while True:
+                try:
+                    jobs.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            lines: List[str] = []
+            try:
+                for kind, payload in jobs:
+                    if kind == _APPEND:
+                        lines.append(payload)
+                        continue
+                    # Records queued before a snapshot belong in the log it truncates
+                    self._write_lines(lines)
+                    lines = []
+                    if kind == _SNAPSHOT:
+                        self._replace_snapshot(payload)
+                    else:
+                        if self._wal is not None:
+                            self._wal.close()
+                            self._wal = None
+                        return
+                self._write_lines(lines)
+            except Exception as e:
+                log.error("❌ Error writing state log: %s", e)
+
+    def _write_lines(self, lines: List[str]) -> None:
+        if lines:
+            f = self._open()
+            f.write("".join(lines))
+            self._sync(f)
+
+    def _replace_snapshot(self, text: str) -> None:
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+            self._sync(f)
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Records up to the snapshot's seq are now in the snapshot
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        with open(self.wal_path, "w", encoding="utf-8") as f:
+            self._sync(f)
+
+    def load(self) -> Tuple[Optional[Dict], List[Dict]]:
+        """Return the last snapshot state and the log records written after it"""
+        state = None
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                state = snapshot["state"]
+                snapshot_seq = snapshot["seq"]
+            except (ValueError, KeyError) as e:
+                log.warning("⚠️ Ignoring unreadable state snapshot: %s", e)
+
+        records = []
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn write can only be the last line; stop there
+                        log.warning("⚠️ Truncated record at end of state log, ignoring")
+                        break
+                    # A crash between snapshot and truncation leaves old records behind
+                    if record["seq"] > snapshot_seq:
+                        records.append(record)
+
+        self.seq = records[-1]["seq"] if records else snapshot_seq
+        self.records_since_snapshot = len(records)
+        return state, records
+
+    def close(self) -> None:
+        """Write out everything queued and stop the writer"""
+        if self._writer.is_alive():
+            self._jobs.put((_CLOSE, None))
+            self._writer.join()
@@ -0,0 +1,128 @@
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from ..utils.clock import clock
+
+_COUNTERS = ("trades", "wins", "gross_pnl", "fees", "exposure")
+_EQUITY = ("cum", "peak", "trough", "drawdown")
+
+
+class WindowStats(NamedTuple):
+    trades: int
+    wins: int
+    losses: int
+    winrate: float
+    gross_pnl: float
+    fees: float
+    net_pnl: float
+    max_drawdown: float
+    exposure_seconds: float
+
+
+class RollingStats:
+    """Closed-trade statistics in fixed time buckets, kept in a ring.
+
+    ``record`` touches one bucket: counters are added and the bucket's
+    running equity, peak, trough and drawdown are advanced, all in constant
+    time. A window query folds its buckets in order; drawdown composes
+    across buckets from each bucket's net, peak and trough, so the result
+    equals the drawdown of the trade sequence inside the window.
+
+    Memory is fixed at ``capacity`` buckets (hourly buckets for 35 days by
+    default); older buckets are overwritten as time moves on.
+    """
+
+    def __init__(self, bucket_seconds: int = 3600, capacity: int = 24 * 35):
+        self.bucket_seconds = bucket_seconds
+        self.capacity = capacity
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.counters = {name: np.zeros(capacity) for name in _COUNTERS}
+        self.equity = {name: np.zeros(capacity) for name in _EQUITY}
+
+    def _slot(self, ts: float) -> int:
+        bucket = int(ts // self.bucket_seconds)
+        slot = bucket % self.capacity
+        if self.ids[slot] != bucket:
+            # Slot still holds an expired bucket
+            self.ids[slot] = bucket
+            for arrays in (self.counters, self.equity):
+                for array in arrays.values():
+                    array[slot] = 0.0
+        return slot
+
+    def record(self, closed_at: datetime, pnl: float, exposure_seconds: float = 0.0, fees: float = 0.0) -> None:
+        slot = self._slot(closed_at.timestamp())
+        counters = self.counters
+        counters["trades"][slot] += 1
+        counters["wins"][slot] += pnl > 0
+        counters["gross_pnl"][slot] += pnl
+        counters["fees"][slot] += fees
+        counters["exposure"][slot] += exposure_seconds
+
+        equity = self.equity
+        cum = equity["cum"][slot] + pnl - fees
+        equity["cum"][slot] = cum
+        if cum > equity["peak"][slot]:
+            equity["peak"][slot] = cum
+        if cum < equity["trough"][slot]:
+            equity["trough"][slot] = cum
+        drawdown = equity["peak"][slot] - cum
+        if drawdown > equity["drawdown"][slot]:
+            equity["drawdown"][slot] = drawdown
+
+    def window(self, start: datetime, end: datetime) -> WindowStats:
+        """Statistics of trades closed in the buckets overlapping [start, end)"""
+        first = int(start.timestamp() // self.bucket_seconds)
+        last = int((end.timestamp() - 1e-6) // self.bucket_seconds)
+        first = max(first, last - self.capacity + 1)
+        buckets = np.arange(first, last + 1)
+        slots = buckets % self.capacity
+        slots = slots[self.ids[slots] == buckets]
+
+        totals = {name: float(array[slots].sum()) for name, array in self.counters.items()}
+
+        # Fold (net, peak, trough, drawdown) segments in time order
+        net = peak = trough = drawdown = 0.0
+        for slot in slots:
+            b_net = self.equity["cum"][slot]
+            drawdown = max(drawdown, self.equity["drawdown"][slot], peak - (net + self.equity["trough"][slot]))
+            peak = max(peak, net + self.equity["peak"][slot])
+            trough = min(trough, net + self.equity["trough"][slot])
+            net += b_net
+
+        trades = int(totals["trades"])
+        wins = int(totals["wins"])
+        return WindowStats(
+            trades=trades,
+            wins=wins,
+            losses=trades - wins,
+            winrate=wins / trades * 100 if trades else 0.0,
+            gross_pnl=totals["gross_pnl"],
+            fees=totals["fees"],
+            net_pnl=totals["gross_pnl"] - totals["fees"],
+            max_drawdown=float(drawdown),
+            exposure_seconds=totals["exposure"]
+        )
+
+    def last(self, seconds: float, now: Optional[datetime] = None) -> WindowStats:
+        """Statistics of the trailing ``seconds``, rounded out to whole buckets"""
+        now = now or clock.now()
+        return self.window(datetime.fromtimestamp(now.timestamp() - seconds + 1e-6), now)
+
+    def to_state(self) -> Dict:
+        used = np.flatnonzero(self.ids >= 0)
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "ids": self.ids[used].tolist(),
+            **{name: array[used].tolist() for name, array in {**self.counters, **self.equity}.items()}
+        }
+
+    def load_state(self, state: Dict) -> None:
+        if state.get("bucket_seconds") != self.bucket_seconds:
+            return
+        for i, bucket in enumerate(state["ids"]):
+            slot = self._slot(bucket * self.bucket_seconds)
+            for name, array in {**self.counters, **self.equity}.items():
+                array[slot] = state[name][i]
@@ -1,95 +1,44 @@
-from dataclasses import dataclass
-from datetime import datetime
-from decimal import Decimal
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
 from typing import Dict, List, Optional
 
+from .position_book import BOOL_FIELDS, FLOAT_FIELDS, TEXT_FIELDS, PositionBook, PositionView
+from .state_log import StateLog
+from .stats import RollingStats
+from ..utils.clock import clock
+from ..utils.log import get_logger
+
+log = get_logger("state")
+
 @dataclass
 class Position:
     entry: float
     qty: float
     side: str
-    tp_price: Decimal
+    tp_price: float
     sl_price: float
     timestamp: datetime
-    rsi: Optional[float] = None
-    atr: Optional[float] = None
-    margin: float = 0.0
-    leverage: float = 1.0
+    margin: float
+    leverage: float
     mark_price: float = 0.0
     liquidation_price: float = 0.0
     spread: float = 0.0
-    ema20: Optional[float] = None
-    ema50: Optional[float] = None
-    last_close: Optional[float] = None
-    lower_band: Optional[float] = None
-    upper_band: Optional[float] = None
-    is_green: Optional[bool] = None
-    is_red: Optional[bool] = None
-    signal: Optional[str] = None
-    volume_now: Optional[float] = None
-    volume_avg10: Optional[float] = None
-    reason: Optional[str] = None
-    candle_pattern: Optional[str] = None
-    entry_confidence_score: Optional[int] = None
+    rsi: float = 0.0
+    atr: float = 0.0
+    ema20: float = 0.0
+    ema50: float = 0.0
+    last_close: float = 0.0
+    lower_band: float = 0.0
+    upper_band: float = 0.0
+    is_green: bool = False
+    is_red: bool = False
+    volume_now: float = 0.0
+    volume_avg10: float = 0.0
+    candle_pattern: str = ""
+    entry_confidence_score: float = 0.0
+    reason: str = ""
     price_change_5m: float = 0.0
-
-    def __init__(
-        self,
-        entry: float,
-        qty: float,
-        side: str,
-        tp_price: float,
-        sl_price: float,
-        timestamp: datetime,
-        margin: float,
-        leverage: float,
-        mark_price: float = 0.0,
-        liquidation_price: float = 0.0,
-        spread: float = 0.0,
-        rsi: float = 0.0,
-        atr: float = 0.0,
-        ema20: float = 0.0,
-        ema50: float = 0.0,
-        last_close: float = 0.0,
-        lower_band: float = 0.0,
-        upper_band: float = 0.0,
-        is_green: bool = False,
-        is_red: bool = False,
-        volume_now: float = 0.0,
-        volume_avg10: float = 0.0,
-        candle_pattern: str = "",
-        entry_confidence_score: float = 0.0,
-        reason: str = "",
-        price_change_5m: float = 0.0,
-        signal: str = ""
-    ):
-        self.entry = entry
-        self.qty = qty
-        self.side = side
-        self.tp_price = tp_price
-        self.sl_price = sl_price
-        self.timestamp = timestamp
-        self.margin = margin
-        self.leverage = leverage
-        self.mark_price = mark_price
-        self.liquidation_price = liquidation_price
-        self.spread = spread
-        self.rsi = rsi
-        self.atr = atr
-        self.ema20 = ema20
-        self.ema50 = ema50
-        self.last_close = last_close
-        self.lower_band = lower_band
-        self.upper_band = upper_band
-        self.is_green = is_green
-        self.is_red = is_red
-        self.volume_now = volume_now
-        self.volume_avg10 = volume_avg10
-        self.candle_pattern = candle_pattern
-        self.entry_confidence_score = entry_confidence_score
-        self.reason = reason
-        self.price_change_5m = price_change_5m
-        self.signal = signal
+    signal: str = ""
 
 @dataclass
 class Trade:
@@ -100,39 +49,183 @@ class Trade:
     pnl: float
     timestamp: datetime
     duration: str
+    exposure: float = 0.0  # seconds the position was open
 
 class TradeManager:
-    def __init__(self):
-        self.positions: Dict[str, Position] = {}
-        self.trades: List[Trade] = []
+    def __init__(self, state_log: Optional[StateLog] = None, max_trades: int = 1000):
+        self.positions: PositionBook = PositionBook()
+        self.trades: List[Trade] = []  # most recent max_trades closes
+        self.max_trades = max_trades
+        self.stats = RollingStats()
         self.consecutive_losses: int = 0
         self.daily_trade_count: int = 0
-        self.last_trade_reset: datetime = datetime.now().date()
+        self.last_trade_reset: date = clock.now().date()
+        self.position_messages: Dict[str, int] = {}  # {symbol: message_id}
+        self.state_log = state_log
+        self._replaying = False
+
+    def _commit(self, op: str, **data) -> None:
+        """Write a transition ahead to the state log, if one is attached, then apply it.
 
-    def add_position(self, symbol: str, position: Position) -> None:
-        self.positions[symbol] = position
+        Live changes go through ``_apply`` like replayed ones, so a restart
+        rebuilds exactly the state the log describes.
+        """
+        logged = self.state_log is not None and not self._replaying
+        if logged:
+            self.state_log.append(op, data)
+        self._apply(op, data)
+        if logged and self.state_log.snapshot_due():
+            self.state_log.write_snapshot(self.to_state())
+
+    def add_position(self, symbol: str, position: Position) -> PositionView:
+        self._commit("open", symbol=symbol, position=_position_to_dict(position))
+        return self.positions[symbol]
 
     def remove_position(self, symbol: str) -> None:
         if symbol in self.positions:
-            del self.positions[symbol]
+            self._commit("remove", symbol=symbol)
+        self.drop_position_message(symbol)
+
+    def close_position(self, symbol: str, trade: Trade) -> Optional[Position]:
+        """Record a finished trade and release its position.
+
+        Returns a detached copy of the released position, since views into
+        the book are invalid once its row is gone.
+        """
+        position = None
+        if symbol in self.positions:
+            position = _position_from_dict(self.positions.to_dict(symbol))
+            if not trade.exposure:
+                trade.exposure = max(0.0, (trade.timestamp - position.timestamp).total_seconds())
+        self.add_trade(trade)
+        self.remove_position(symbol)
+        return position
 
     def add_trade(self, trade: Trade) -> None:
+        self._commit("trade", trade=_trade_to_dict(trade))
+
+    def _keep_trade(self, trade: Trade) -> None:
         self.trades.append(trade)
+        if len(self.trades) > self.max_trades:
+            del self.trades[:len(self.trades) - self.max_trades]
+        self.stats.record(trade.timestamp, trade.pnl, trade.exposure)
+
+    def set_position_message(self, symbol: str, message_id: int) -> None:
+        self._commit("message", symbol=symbol, message_id=message_id)
+
+    def drop_position_message(self, symbol: str) -> None:
+        if symbol in self.position_messages:
+            self._commit("message_drop", symbol=symbol)
+
+    def prune_position_messages(self) -> int:
+        """Drop message ids of positions that are no longer open"""
+        stale = [symbol for symbol in self.position_messages if symbol not in self.positions]
+        for symbol in stale:
+            self.drop_position_message(symbol)
+        return len(stale)
 
     def reset_daily_counters(self) -> None:
-        current_date = datetime.now().date()
+        current_date = clock.now().date()
         if current_date > self.last_trade_reset:
-            self.daily_trade_count = 0
-            self.last_trade_reset = current_date
+            self._commit("daily_reset", date=current_date.isoformat())
 
     def increment_consecutive_losses(self) -> None:
-        self.consecutive_losses += 1
+        self._commit("losses", value=self.consecutive_losses + 1)
 
     def reset_consecutive_losses(self) -> None:
-        self.consecutive_losses = 0
+        self._commit("losses", value=0)
 
     def increment_daily_trade_count(self) -> None:
-        self.daily_trade_count += 1
+        self._commit("daily_count", value=self.daily_trade_count + 1)
 
     def clear_trades(self) -> None:
-        self.trades.clear() 
\ No newline at end of file
+        self._commit("clear_trades")
+
+    def to_state(self) -> Dict:
+        """Compact, JSON-serializable copy of the whole manager state"""
+        return {
+            "positions": {symbol: self.positions.to_dict(symbol) for symbol in self.positions},
+            "trades": [_trade_to_dict(t) for t in self.trades],
+            "consecutive_losses": self.consecutive_losses,
+            "daily_trade_count": self.daily_trade_count,
+            "last_trade_reset": self.last_trade_reset.isoformat(),
+            "position_messages": dict(self.position_messages),
+            "stats": self.stats.to_state()
+        }
+
+    def restore(self) -> int:
+        """Rebuild state from the snapshot plus log tail; returns records replayed"""
+        if self.state_log is None:
+            return 0
+        state, records = self.state_log.load()
+        self._replaying = True
+        try:
+            if state:
+                for symbol, fields in state["positions"].items():
+                    self.positions.add(symbol, _position_from_dict(fields))
+                self.trades = [_trade_from_dict(t) for t in state["trades"]]
+                if "stats" in state:
+                    self.stats.load_state(state["stats"])
+                else:
+                    for trade in self.trades:
+                        self.stats.record(trade.timestamp, trade.pnl, trade.exposure)
+                self.consecutive_losses = state["consecutive_losses"]
+                self.daily_trade_count = state["daily_trade_count"]
+                self.last_trade_reset = date.fromisoformat(state["last_trade_reset"])
+                self.position_messages = dict(state["position_messages"])
+            for record in records:
+                self._apply(record["op"], record["data"])
+        finally:
+            self._replaying = False
+        return len(records)
+
+    def _apply(self, op: str, data: Dict) -> None:
+        if op == "open":
+            self.positions.add(data["symbol"], _position_from_dict(data["position"]))
+        elif op == "remove":
+            self.positions.remove(data["symbol"])
+        elif op == "trade":
+            self._keep_trade(_trade_from_dict(data["trade"]))
+        elif op == "message":
+            self.position_messages[data["symbol"]] = data["message_id"]
+        elif op == "message_drop":
+            self.position_messages.pop(data["symbol"], None)
+        elif op == "daily_reset":
+            self.daily_trade_count = 0
+            self.last_trade_reset = date.fromisoformat(data["date"])
+        elif op == "losses":
+            self.consecutive_losses = data["value"]
+        elif op == "daily_count":
+            self.daily_trade_count = data["value"]
+        elif op == "clear_trades":
+            self.trades.clear()
+        else:
+            log.warning("⚠️ Unknown state log operation: %s", op)
+
+    def checkpoint(self) -> None:
+        """Snapshot the current state, e.g. on clean shutdown"""
+        if self.state_log is not None:
+            self.state_log.write_snapshot(self.to_state())
+
+
+def _trade_to_dict(trade: Trade) -> Dict:
+    data = asdict(trade)
+    data["timestamp"] = trade.timestamp.isoformat()
+    return data
+
+
+def _trade_from_dict(data: Dict) -> Trade:
+    return Trade(**{**data, "timestamp": datetime.fromisoformat(data["timestamp"])})
+
+
+def _position_to_dict(position: Position) -> Dict:
+    """The fields PositionBook.to_dict gives once ``position`` is in the book"""
+    data = {name: float(getattr(position, name) or 0.0) for name in FLOAT_FIELDS if name != "timestamp"}
+    data["timestamp"] = position.timestamp.timestamp()
+    data.update({name: bool(getattr(position, name)) for name in BOOL_FIELDS})
+    data.update({name: getattr(position, name) or "" for name in TEXT_FIELDS})
+    return data
+
+
+def _position_from_dict(data: Dict) -> Position:
+    return Position(**{**data, "timestamp": datetime.fromtimestamp(data["timestamp"])})
@@ -0,0 +1,274 @@
+import io
+import os
+import pickle
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..utils.lazy import lazy_import
+from ..utils.log import get_logger
+
+pd = lazy_import("pandas")
+
+log = get_logger("analytics")
+
+# Group-by dimensions: name -> journal column (derived ones are computed on load)
+DIMENSIONS = {
+    "pattern": "candle_pattern",
+    "confidence": "entry_confidence_score",
+    "hour": "entry_time",
+    "symbol": "symbol",
+    "mode": "signal_mode",
+    "reason": "close_reason",
+    "side": "side",
+}
+_AGGREGATES = ("count", "wins", "pnl", "win_pnl", "loss_pnl")
+
+
+def _confidence_bucket(score: str) -> str:
+    try:
+        low = int(float(score) // 10 * 10)
+    except ValueError:
+        return "n/a"
+    return f"{low:02d}-{low + 9:02d}"
+
+
+def _hour(entry_time: str) -> str:
+    # "YYYY-MM-DD HH:MM:SS[.ffffff]", the hour the trade was opened
+    return entry_time[11:13] if len(entry_time) >= 13 else "n/a"
+
+
+class TradeAnalytics:
+    """Columnar view of the trade journal with incrementally maintained aggregates.
+
+    Every dimension is dictionary-encoded into an int32 code column next to a
+    float64 PnL column. For each dimension, per-group sums (trades, wins,
+    PnL, winning PnL, losing PnL) are kept materialized and only the rows
+    appended to ``trades.csv`` since the last refresh are folded in, by byte
+    offset. Single-dimension queries read those sums directly; combined
+    dimensions are one ``bincount`` over the code columns.
+
+    The whole state is pickled to ``cache_path`` so a later run only parses
+    the journal's new tail.
+    """
+
+    def __init__(self, csv_path: str = "data/trades.csv", cache_path: str = "data/cache/analytics.pkl"):
+        self.csv_path = csv_path
+        self.cache_path = cache_path
+        self._reset()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.header: Optional[List[str]] = None
+        self.rows = 0
+        self.pnl = np.empty(0, dtype=np.float64)
+        self.codes: Dict[str, np.ndarray] = {d: np.empty(0, dtype=np.int32) for d in DIMENSIONS}
+        self.labels: Dict[str, List[str]] = {d: [] for d in DIMENSIONS}
+        self._index: Dict[str, Dict[str, int]] = {d: {} for d in DIMENSIONS}
+        self.aggregates: Dict[str, Dict[str, np.ndarray]] = {
+            d: {a: np.zeros(0) for a in _AGGREGATES} for d in DIMENSIONS
+        }
+
+    def load(self) -> bool:
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("csv_path") != self.csv_path or state.get("dimensions") != DIMENSIONS:
+                return False
+            for key in ("offset", "header", "rows", "pnl", "codes", "labels", "aggregates"):
+                setattr(self, key, state[key])
+            self._index = {d: {label: i for i, label in enumerate(labels)} for d, labels in self.labels.items()}
+            return True
+        except Exception as e:
+            log.warning("⚠️ Ignoring unreadable analytics cache: %s", e)
+            self._reset()
+            return False
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({
+                    "csv_path": self.csv_path,
+                    "dimensions": DIMENSIONS,
+                    "offset": self.offset,
+                    "header": self.header,
+                    "rows": self.rows,
+                    "pnl": self.pnl[:self.rows],
+                    "codes": {d: c[:self.rows] for d, c in self.codes.items()},
+                    "labels": self.labels,
+                    "aggregates": self.aggregates
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            log.error("❌ Error saving analytics cache: %s", e)
+
+    def refresh(self) -> int:
+        """Fold trades appended since the last refresh into the columns; returns how many"""
+        if not os.path.exists(self.csv_path):
+            return 0
+        with open(self.csv_path, "rb") as f:
+            first_line = f.readline()
+            header = [h.strip().strip('"') for h in first_line.decode("utf-8").strip().split(",")]
+            size = os.fstat(f.fileno()).st_size
+            if header != self.header or size < self.offset:
+                # New or rewritten journal
+                self._reset()
+                self.header = header
+                self.offset = len(first_line)
+            f.seek(self.offset)
+            tail = f.read()
+
+        # Leave a partially written last line for the next refresh
+        end = tail.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        frame = pd.read_csv(
+            io.BytesIO(tail[:end]),
+            header=None,
+            names=self.header,
+            usecols=["pnl"] + sorted(set(DIMENSIONS.values())),
+            dtype=str,
+            keep_default_na=False
+        )
+        self.offset += end
+        self._append(frame)
+        return len(frame)
+
+    def _encode(self, dimension: str, values) -> np.ndarray:
+        index = self._index[dimension]
+        labels = self.labels[dimension]
+        local_codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, label in enumerate(uniques):
+            code = index.get(label)
+            if code is None:
+                code = index[label] = len(labels)
+                labels.append(label)
+            mapping[i] = code
+        return mapping[local_codes]
+
+    def _append(self, frame) -> None:
+        n = len(frame)
+        if n == 0:
+            return
+        pnl = pd.to_numeric(frame["pnl"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+        wins = pnl > 0
+        weights = {
+            "count": None,
+            "wins": wins.astype(np.float64),
+            "pnl": pnl,
+            "win_pnl": np.where(wins, pnl, 0.0),
+            "loss_pnl": np.where(wins, 0.0, pnl),
+        }
+
+        start = self.rows
+        self.rows += n
+        self.pnl = self._grow(self.pnl, self.rows)
+        self.pnl[start:self.rows] = pnl
+
+        for dimension, column in DIMENSIONS.items():
+            values = frame[column]
+            if dimension == "confidence":
+                values = values.map(_confidence_bucket)
+            elif dimension == "hour":
+                values = values.map(_hour)
+            codes = self._encode(dimension, values)
+            self.codes[dimension] = self._grow(self.codes[dimension], self.rows)
+            self.codes[dimension][start:self.rows] = codes
+
+            groups = len(self.labels[dimension])
+            sums = self.aggregates[dimension]
+            for name, weight in weights.items():
+                delta = np.bincount(codes, weights=weight, minlength=groups)
+                current = sums[name]
+                if len(current) < groups:
+                    current = np.concatenate([current, np.zeros(groups - len(current))])
+                current += delta
+                sums[name] = current
+
+    @staticmethod
+    def _grow(array: np.ndarray, size: int) -> np.ndarray:
+        if len(array) >= size:
+            return array
+        grown = np.empty(max(size, len(array) * 2, 1024), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def query(self, by: List[str], min_trades: int = 1) -> List[Dict]:
+        """Trades, winrate, expectancy and PnL per group of ``by`` dimensions"""
+        for dimension in by:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension {dimension!r}, choose from {', '.join(DIMENSIONS)}")
+
+        if len(by) == 1:
+            sums = self.aggregates[by[0]]
+            cells = np.flatnonzero(sums["count"] >= max(min_trades, 1))
+            keys = [np.asarray(self.labels[by[0]], dtype=object)[cells].tolist()]
+        else:
+            shape = tuple(len(self.labels[d]) for d in by)
+            if not self.rows or 0 in shape:
+                return []
+            flat = np.ravel_multi_index([self.codes[d][:self.rows] for d in by], shape)
+            pnl = self.pnl[:self.rows]
+            wins = pnl > 0
+            size = int(np.prod(shape))
+            sums = {
+                "count": np.bincount(flat, minlength=size),
+                "wins": np.bincount(flat, weights=wins, minlength=size),
+                "pnl": np.bincount(flat, weights=pnl, minlength=size),
+                "win_pnl": np.bincount(flat, weights=np.where(wins, pnl, 0.0), minlength=size),
+                "loss_pnl": np.bincount(flat, weights=np.where(wins, 0.0, pnl), minlength=size),
+            }
+            # Only the occupied cells of the grid, unravelled in one call
+            cells = np.flatnonzero(sums["count"] >= max(min_trades, 1))
+            keys = [
+                np.asarray(self.labels[d], dtype=object)[codes].tolist()
+                for d, codes in zip(by, np.unravel_index(cells, shape))
+            ]
+
+        count = sums["count"][cells].astype(np.int64)
+        wins = sums["wins"][cells].astype(np.int64)
+        losses = count - wins
+        pnl = sums["pnl"][cells]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            winrate = (wins / count * 100).tolist()
+            expectancy = (pnl / count).tolist()
+            avg_win = np.where(wins > 0, sums["win_pnl"][cells] / wins, 0.0).tolist()
+            avg_loss = np.where(losses > 0, sums["loss_pnl"][cells] / losses, 0.0).tolist()
+        results = [
+            {"trades": t, "winrate": w, "expectancy": e, "avg_win": aw, "avg_loss": al, "total_pnl": p}
+            for t, w, e, aw, al, p in zip(count.tolist(), winrate, expectancy, avg_win, avg_loss, pnl.tolist())
+        ]
+        for dimension, labels in zip(by, keys):
+            for row, label in zip(results, labels):
+                row[dimension] = label
+        return results
+
+
+def format_table(rows: List[Dict], by: List[str], sort: str = "expectancy") -> str:
+    if not rows:
+        return "No trades in the journal yet."
+    rows = sorted(rows, key=lambda r: r[sort], reverse=True)
+    columns = by + ["trades", "winrate", "expectancy", "avg_win", "avg_loss", "total_pnl"]
+    formats = {
+        "trades": "{:d}",
+        "winrate": "{:.1f}%",
+        "expectancy": "{:+.4f}",
+        "avg_win": "{:+.4f}",
+        "avg_loss": "{:+.4f}",
+        "total_pnl": "{:+.4f}",
+    }
+    cells = [[formats.get(c, "{}").format(r[c]) for c in columns] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(columns, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    for row in cells:
+        lines.append("  ".join(
+            cell.ljust(w) if i < len(by) else cell.rjust(w)
+            for i, (cell, w) in enumerate(zip(row, widths))
+        ))
+    return "\n".join(line.rstrip() for line in lines)
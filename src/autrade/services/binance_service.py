@@ -1,21 +1,62 @@
+from __future__ import annotations
+
 import hmac
 import hashlib
 import urllib.parse
 import time
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
-import aiohttp
-import pandas as pd
 from decimal import Decimal, ROUND_DOWN
 import ssl
 import asyncio
+import uuid
+import numpy as np
 
 from ..config.settings import Config
+from ..utils.clock import clock
+from ..utils.lazy import lazy_import
+from ..utils.log import get_logger
+from ..utils.tracing import tracer
+from .klines import decode_klines, empty_klines
+from .market_data import MarketDataCache
+from .paper_exchange import PaperExchange
+from .request_cache import RequestCoalescer
+from .resilience import Outcome, Resilience
+
+aiohttp = lazy_import("aiohttp")
+
+log = get_logger("binance")
 
 class BinanceService:
-    def __init__(self, config: Config, trade_manager=None):
+    def __init__(self, config: Config, trade_manager=None, market_cache: Optional[MarketDataCache] = None):
         self.config = config
         self.trade_manager = trade_manager
+        self.market_cache = market_cache or MarketDataCache()
+        self.paper = None
+        # Local order books, attached by the bot when ORDER_BOOK_ENABLED
+        self.order_books = None
+        if config.binance.bot_mode == "DEMO":
+            self.paper = PaperExchange(
+                balance=float(config.fixed_usdt_balance),
+                taker_fee=config.paper.taker_fee,
+                impact=config.paper.impact,
+                default_depth=config.paper.depth_usdt,
+                min_spread=config.paper.min_spread_bps / 10000
+            )
+        settings = config.resilience
+        self.resilience = Resilience(
+            timeout=settings.timeout,
+            timeouts={
+                'POST': settings.order_timeout,
+                'DELETE': settings.order_timeout,
+                '/fapi/v1/klines': settings.klines_timeout
+            },
+            retries=settings.retries,
+            hedge=settings.hedge,
+            failure_threshold=settings.breaker_failures,
+            reset_timeout=settings.breaker_reset
+        )
+        self.coalescer = RequestCoalescer() if settings.coalesce else None
         # Create SSL context
         self.ssl_context = ssl.create_default_context()
         self.ssl_context.check_hostname = False
@@ -37,8 +78,42 @@ class BinanceService:
     ) -> Dict:
         if params is None:
             params = {}
-        
-        params['timestamp'] = int(time.time() * 1000)
+        method = method.upper()
+
+        async def attempt() -> Outcome:
+            return await self._send(session, method, endpoint, params)
+
+        # Orders that close or protect a position get their own breaker, so a
+        # run of failed entries never blocks a stop-loss
+        key = None
+        if method == 'POST' and (params.get('reduceOnly') is True or params.get('closePosition') is True):
+            key = f"{method} {endpoint} close"
+
+        async def call() -> Dict:
+            with tracer.span("binance.request", endpoint=endpoint, symbol=params.get('symbol')):
+                return await self.resilience.call(method, endpoint, attempt, key)
+
+        if self.coalescer is None:
+            return await call()
+        if method == 'GET':
+            return await self.coalescer.get(endpoint, params, call)
+
+        # Orders change balances, positions and open orders
+        try:
+            return await call()
+        finally:
+            for stale in ('/fapi/v2/account', '/fapi/v2/positionRisk', '/fapi/v1/openOrders'):
+                self.coalescer.invalidate(stale)
+
+    async def _send(
+        self,
+        session: aiohttp.ClientSession,
+        method: str,
+        endpoint: str,
+        params: Dict
+    ) -> Outcome:
+        """One signed attempt; re-signed every time so retries carry a fresh timestamp"""
+        params = {**params, 'timestamp': int(clock.time() * 1000)}
         query = urllib.parse.urlencode(params)
         signature = self._sign(query)
         url = f"{self.config.binance.base_url}{endpoint}?{query}&signature={signature}"
@@ -48,40 +123,55 @@ class BinanceService:
         }
 
         try:
-            async with session.request(method.upper(), url, headers=headers) as resp:
+            async with session.request(method, url, headers=headers) as resp:
                 text = await resp.text()
 
                 if resp.status != 200:
-                    return {"error": f"HTTP {resp.status}: {text}"}
+                    # Rate limits, bans and server errors are worth another try
+                    retryable = resp.status in (418, 429) or resp.status >= 500
+                    return False, retryable, {"error": f"HTTP {resp.status}: {text}"}
 
                 try:
-                    return await resp.json()
+                    return True, False, await resp.json()
                 except Exception as e:
-                    return {"error": f"JSON error: {str(e)}, Body: {text}"}
+                    return False, False, {"error": f"JSON error: {str(e)}, Body: {text}"}
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            return {"error": str(e)}
+            return False, True, {"error": str(e)}
 
-    async def get_klines(self, session: aiohttp.ClientSession, symbol: str, interval: str = '5m', limit: int = 1500) -> pd.DataFrame:
+    async def get_klines(self, session: aiohttp.ClientSession, symbol: str, interval: str = '5m', limit: int = 1500) -> np.ndarray:
+        """Latest ``limit`` bars as a KLINE_DTYPE structured array (see services.klines)"""
         try:
+            # Only fetch the bars that closed since the cached series was last updated
+            fetch_limit = self.market_cache.missing_bars(symbol, interval, limit)
             data = await self.request(session, 'GET', '/fapi/v1/klines', {
-                'symbol': symbol, 'interval': interval, 'limit': limit
+                'symbol': symbol, 'interval': interval, 'limit': fetch_limit
             })
 
-            df = pd.DataFrame(data, columns=[
-                "timestamp", "open", "high", "low", "close", "volume",
-                "close_time", "quote_volume", "num_trades",
-                "taker_base_vol", "taker_quote_vol", "ignore"
-            ])
-            for col in ["open", "high", "low", "close"]:
-                df[col] = df[col].astype(float)
-            return df
+            if isinstance(data, dict) and 'error' in data:
+                log.error("Error getting klines: %s", data['error'])
+                return self.market_cache.merge_klines(symbol, interval, empty_klines(), limit)
+
+            with tracer.span("klines.decode", symbol=symbol, rows=fetch_limit):
+                fresh = decode_klines(data)
+                return self.market_cache.merge_klines(symbol, interval, fresh, limit)
         except Exception as e:
-            print(f"Error getting klines: {e}")
-            return pd.DataFrame()
+            log.error("Error getting klines: %s", e)
+            return empty_klines()
+
+    async def get_exchange_info(self, session: aiohttp.ClientSession) -> Dict:
+        """exchangeInfo, served from the market cache while it is fresh"""
+        info = self.market_cache.get_exchange_info()
+        if info is None:
+            info = await self.request(session, 'GET', '/fapi/v1/exchangeInfo')
+            if 'symbols' in info:
+                self.market_cache.set_exchange_info(info)
+        return info
 
     async def get_symbols(self, session: aiohttp.ClientSession) -> List[str]:
         try:
-            info = await self.request(session, 'GET', '/fapi/v1/exchangeInfo')
+            info = await self.get_exchange_info(session)
             all_symbols = [
                 s['symbol'] for s in info['symbols']
                 if s['contractType'] == 'PERPETUAL' and s['status'] == 'TRADING' and s['quoteAsset'] == 'USDT'
@@ -92,20 +182,27 @@ class BinanceService:
                 t['symbol']: float(t['quoteVolume'])
                 for t in ticker_data if t['symbol'] in all_symbols
             }
-            return sorted(ticker_map, key=ticker_map.get, reverse=True)[:50]
+            ranked = sorted(ticker_map, key=ticker_map.get, reverse=True)
+            universe = self.config.scan.universe
+            return ranked[:universe] if universe > 0 else ranked
         except Exception as e:
-            print(f"Error getting symbols: {e}")
+            log.error("Error getting symbols: %s", e)
             return []
 
     async def check_spread(self, session: aiohttp.ClientSession, symbol: str) -> Tuple[bool, float]:
+        max_spread = self.config.order_book.max_spread_pct
+        book = self.order_books.get(symbol) if self.order_books is not None else None
+        if book is not None:
+            spread = book.spread_pct()
+            return spread < max_spread, spread
         try:
             ticker = await self.request(session, 'GET', '/fapi/v1/ticker/bookTicker', {'symbol': symbol})
             bid = float(ticker['bidPrice'])
             ask = float(ticker['askPrice'])
             spread = ((ask - bid) / bid) * 100
-            return spread < 0.15, spread
+            return spread < max_spread, spread
         except Exception as e:
-            print(f"Error checking spread: {e}")
+            log.error("Error checking spread: %s", e)
             return False, 0
 
     async def get_mark_price(self, session: aiohttp.ClientSession, symbol: str) -> float:
@@ -113,25 +210,25 @@ class BinanceService:
             response = await self.request(session, 'GET', '/fapi/v1/ticker/price', {'symbol': symbol})
             return float(response['price'])
         except Exception as e:
-            print(f"Error getting mark price: {e}")
+            log.error("Error getting mark price: %s", e)
             return 0.0
 
     async def test_connection(self, session: aiohttp.ClientSession) -> bool:
         try:
-            print("\n🔍 Testing Binance API connection...")
+            log.info("🔍 Testing Binance API connection...")
             response = await self.request(session, 'GET', '/fapi/v2/account')  # Changed to v2
             if "error" in response:
-                print(f"❌ API Error: {response['error']}")
+                log.error("❌ API Error: %s", response['error'])
                 return False
 
             if response.get('canTrade'):
-                print("✅ API Key valid with trading permissions")
+                log.info("✅ API Key valid with trading permissions")
                 return True
             else:
-                print("❌ No trading permission")
+                log.error("❌ No trading permission")
                 return False
         except Exception as e:
-            print(f"❌ Connection error: {e}")
+            log.error("❌ Connection error: %s", e)
             return False
 
     async def set_leverage(self, session: aiohttp.ClientSession, symbol: str, leverage: int) -> bool:
@@ -141,12 +238,12 @@ class BinanceService:
             })
             return 'leverage' in response
         except Exception as e:
-            print(f"Error setting leverage: {e}")
+            log.error("Error setting leverage: %s", e)
             return False
 
     async def get_symbol_precision(self, session: aiohttp.ClientSession, symbol: str) -> int:
         try:
-            info = await self.request(session, 'GET', '/fapi/v1/exchangeInfo')
+            info = await self.get_exchange_info(session)
             for s in info['symbols']:
                 if s['symbol'] == symbol:
                     for f in s['filters']:
@@ -159,14 +256,17 @@ class BinanceService:
                             return precision
             return 3  # Default precision if not found
         except Exception as e:
-            print(f"Error getting symbol precision: {e}")
+            log.error("Error getting symbol precision: %s", e)
             return 3  # Default precision on error
 
     async def get_account_balance(self, session: aiohttp.ClientSession) -> float:
         try:
+            if self.paper is not None:
+                return self.paper.wallet
+
             response = await self.request(session, 'GET', '/fapi/v2/account')
             if "error" in response:
-                print(f"❌ Error getting balance: {response['error']}")
+                log.error("❌ Error getting balance: %s", response['error'])
                 return 0.0
 
             for asset in response.get('assets', []):
@@ -174,12 +274,12 @@ class BinanceService:
                     return float(asset['walletBalance'])
             return 0.0
         except Exception as e:
-            print(f"❌ Error getting balance: {e}")
+            log.error("❌ Error getting balance: %s", e)
             return 0.0
 
     async def get_price_precision(self, session: aiohttp.ClientSession, symbol: str) -> int:
         try:
-            info = await self.request(session, 'GET', '/fapi/v1/exchangeInfo')
+            info = await self.get_exchange_info(session)
             for s in info['symbols']:
                 if s['symbol'] == symbol:
                     for f in s['filters']:
@@ -192,58 +292,43 @@ class BinanceService:
                             return precision
             return 8  # Default precision if not found
         except Exception as e:
-            print(f"Error getting price precision: {e}")
+            log.error("Error getting price precision: %s", e)
             return 8  # Default precision on error
 
     async def cancel_all_orders(self, session: aiohttp.ClientSession, symbol: str) -> bool:
         try:
-            print(f"\n🔄 Canceling all orders for {symbol}...")
+            log.info("🔄 Canceling all orders for %s...", symbol)
+            if self.paper is not None:
+                self.paper.cancel_all(symbol)
+                return True
+
             response = await self.request(session, 'DELETE', '/fapi/v1/allOpenOrders', {'symbol': symbol})
             if 'error' in response:
-                print(f"❌ Error canceling orders: {response['error']}")
+                log.error("❌ Error canceling orders: %s", response['error'])
                 return False
             
             # Check if orders were actually canceled
             open_orders = await self.request(session, 'GET', '/fapi/v1/openOrders', {'symbol': symbol})
             if isinstance(open_orders, list) and len(open_orders) == 0:
-                print(f"✅ Successfully canceled all orders for {symbol}")
+                log.info("✅ Successfully canceled all orders for %s", symbol)
                 return True
             else:
-                print(f"⚠️ Some orders might still be open for {symbol}")
+                log.warning("⚠️ Some orders might still be open for %s", symbol)
                 return False
         except Exception as e:
-            print(f"❌ Error canceling orders: {e}")
+            log.error("❌ Error canceling orders: %s", e)
             return False
 
     async def get_position(self, session: aiohttp.ClientSession, symbol: str) -> Optional[Dict]:
         try:
             if self.config.binance.bot_mode == "DEMO":
-                # For demo mode, we'll simulate an open position
-                # Get the actual position data from trade manager
-                position = self.trade_manager.positions.get(symbol)
-                if not position:
-                    return None
-                    
-                return {
-                    'symbol': symbol,
-                    'positionAmt': str(position.qty),
-                    'entryPrice': str(position.entry),
-                    'markPrice': str(position.mark_price),
-                    'unRealizedProfit': '0.0',
-                    'liquidationPrice': str(position.liquidation_price),
-                    'leverage': str(position.leverage),
-                    'isolated': False,
-                    'isAutoAddMargin': False,
-                    'positionSide': 'BOTH',
-                    'notional': str(abs(float(position.qty) * float(position.entry))),
-                    'isolatedWallet': '0.0',
-                    'updateTime': int(datetime.now().timestamp() * 1000)
-                }
-            
+                await self._paper_quote(session, symbol)
+                return self.paper.position_risk(symbol)
+
             # Only make API call if not in demo mode
             response = await self.request(session, 'GET', '/fapi/v2/positionRisk', {'symbol': symbol})
             if 'error' in response:
-                print(f"❌ Error getting position: {response['error']}")
+                log.error("❌ Error getting position: %s", response['error'])
                 return None
             
             for position in response:
@@ -251,24 +336,142 @@ class BinanceService:
                     return position
             return None
         except Exception as e:
-            print(f"❌ Error getting position: {e}")
+            log.error("❌ Error getting position: %s", e)
+            return None
+
+    async def get_positions(self, session: aiohttp.ClientSession) -> Optional[Dict[str, Dict]]:
+        """Get all open positions in one call, keyed by symbol"""
+        try:
+            if self.config.binance.bot_mode == "DEMO":
+                await self._adopt_paper_positions(session)
+                positions = {symbol: self.paper.position_risk(symbol) for symbol in self.paper.positions}
+                return {symbol: p for symbol, p in positions.items() if p is not None}
+
+            response = await self.request(session, 'GET', '/fapi/v2/positionRisk')
+            if 'error' in response:
+                log.error("❌ Error getting positions: %s", response['error'])
+                return None
+
+            return {
+                position['symbol']: position
+                for position in response
+                if float(position['positionAmt']) != 0
+            }
+        except Exception as e:
+            log.error("❌ Error getting positions: %s", e)
             return None
 
     async def get_trades(self, session: aiohttp.ClientSession, symbol: str) -> List[Dict]:
         """Get recent trades for a symbol"""
         try:
+            if self.paper is not None:
+                return self.paper.user_trades(symbol)[::-1]
+
             response = await self.request(session, 'GET', '/fapi/v1/userTrades', {'symbol': symbol})
             if 'error' in response:
-                print(f"❌ Error getting trades: {response['error']}")
+                log.error("❌ Error getting trades: %s", response['error'])
                 return []
             
             # Sort trades by time in descending order (newest first)
             trades = sorted(response, key=lambda x: int(x['time']), reverse=True)
             return trades
         except Exception as e:
-            print(f"❌ Error getting trades: {e}")
+            log.error("❌ Error getting trades: %s", e)
             return []
 
+    async def _paper_quote(self, session: aiohttp.ClientSession, symbol: str) -> None:
+        """Feed the paper exchange the live book top, mark price and funding"""
+        book, premium = await asyncio.gather(
+            self.request(session, 'GET', '/fapi/v1/ticker/bookTicker', {'symbol': symbol}),
+            self.request(session, 'GET', '/fapi/v1/premiumIndex', {'symbol': symbol})
+        )
+        if 'error' in book or 'error' in premium:
+            log.warning("⚠️ No paper quote for %s: %s", symbol, book.get('error') or premium.get('error'))
+            return
+        fills = self.paper.update_quote(
+            symbol,
+            float(book['bidPrice']),
+            float(book['askPrice']),
+            float(book['bidQty']),
+            float(book['askQty']),
+            mark=float(premium['markPrice']),
+            funding_rate=float(premium['lastFundingRate']),
+            next_funding=int(premium['nextFundingTime'])
+        )
+        self._log_paper_fills(symbol, fills)
+
+    def paper_price(self, symbol: str, price: float) -> None:
+        """Check resting DEMO stops of ``symbol`` against a scanned price"""
+        if self.paper is None or symbol not in self.paper.stops:
+            return
+        self._log_paper_fills(symbol, self.paper.update_price(symbol, price))
+
+    def _log_paper_fills(self, symbol: str, fills: List[Dict]) -> None:
+        for fill in fills:
+            log.info(
+                "🎯 DEMO %s %s triggered at %s, filled at %s",
+                fill['type'], symbol, fill['stopPrice'], fill['avgPrice']
+            )
+
+    async def _adopt_paper_positions(self, session: aiohttp.ClientSession) -> None:
+        """Recreate restored positions on the paper exchange, which starts empty"""
+        if self.trade_manager is None:
+            return
+        for symbol, position in self.trade_manager.positions.items():
+            if self.paper.position_risk(symbol) is not None:
+                continue
+            await self._paper_quote(session, symbol)
+            self.paper.adopt_position(
+                symbol, position.direction * abs(position.qty), position.entry, int(position.leverage)
+            )
+
+    async def _place_paper_order(
+        self,
+        session: aiohttp.ClientSession,
+        symbol: str,
+        side: str,
+        qty: Optional[float],
+        reduce_only: bool,
+        tp_price: Optional[float],
+        sl_price: Optional[float]
+    ) -> Dict:
+        if qty is None:
+            log.error("❌ Error: Quantity is required")
+            return {"error": "Quantity is required"}
+
+        await self._paper_quote(session, symbol)
+        if reduce_only:
+            self.paper.cancel_all(symbol)
+        order = self.paper.market_order(symbol, side, qty, reduce_only, self.config.trading.leverage)
+        if 'error' in order:
+            log.error("❌ DEMO order failed: %s", order['error'])
+            return order
+        log.info(
+            "✅ DEMO order filled: %s %s %s @ %s (fee %s)",
+            side, order['executedQty'], symbol, order['avgPrice'], order['commission']
+        )
+
+        if not reduce_only:
+            close_side = "SELL" if side == "BUY" else "BUY"
+            if tp_price:
+                self.paper.place_stop(symbol, close_side, 'TAKE_PROFIT_MARKET', tp_price)
+            if sl_price:
+                self.paper.place_stop(symbol, close_side, 'STOP_MARKET', sl_price)
+        return order
+
+    async def find_order(self, session: aiohttp.ClientSession, symbol: str, client_order_id: str) -> Optional[Dict]:
+        """The order placed with ``client_order_id``, None if the exchange never got it"""
+        try:
+            response = await self.request(session, 'GET', '/fapi/v1/order', {
+                'symbol': symbol, 'origClientOrderId': client_order_id
+            })
+            if 'orderId' in response:
+                return response
+            log.debug("No order %s for %s: %s", client_order_id, symbol, response.get('error', response))
+        except Exception as e:
+            log.error("❌ Error looking up order %s: %s", client_order_id, e)
+        return None
+
     async def place_order(
         self,
         session: aiohttp.ClientSession,
@@ -279,37 +482,35 @@ class BinanceService:
         tp_price: Optional[float] = None,
         sl_price: Optional[float] = None
     ) -> Dict:
-        print(f"\n📊 Placing {self.config.binance.bot_mode} order:")
-        print(f"Symbol: {symbol}")
-        print(f"Side: {side}")
-        print(f"Quantity: {qty}")
-        print(f"Reduce Only: {reduce_only}")
-        if tp_price:
-            print(f"Take Profit: {tp_price}")
-        if sl_price:
-            print(f"Stop Loss: {sl_price}")
+        with tracer.span("place_order", symbol=symbol, side=side, reduce_only=reduce_only):
+            return await self._place_order(session, symbol, side, qty, reduce_only, tp_price, sl_price)
+
+    async def _place_order(
+        self,
+        session: aiohttp.ClientSession,
+        symbol: str,
+        side: str,
+        qty: Optional[float] = None,
+        reduce_only: bool = False,
+        tp_price: Optional[float] = None,
+        sl_price: Optional[float] = None
+    ) -> Dict:
+        log.info(
+            "📊 Placing %s order: %s %s qty=%s reduce_only=%s tp=%s sl=%s",
+            self.config.binance.bot_mode, side, symbol, qty, reduce_only, tp_price, sl_price,
+            extra={"fields": {
+                "event": "order", "symbol": symbol, "side": side, "qty": qty,
+                "reduce_only": reduce_only, "tp_price": tp_price, "sl_price": sl_price
+            }}
+        )
 
         if self.config.binance.bot_mode == "DEMO":
-            # In demo mode, just return a mock response without making any API calls
-            order_response = {
-                "orderId": f"DEMO-{int(datetime.now().timestamp())}",
-                "symbol": symbol,
-                "side": side,
-                "type": "MARKET",
-                "quantity": qty,
-                "reduceOnly": reduce_only,
-                "status": "FILLED",
-                "price": "0.0",  # Mock price
-                "executedQty": str(qty),
-                "time": int(datetime.now().timestamp() * 1000)
-            }
-            print(f"✅ DEMO Order placed successfully: {order_response}")
-            return order_response
+            return await self._place_paper_order(session, symbol, side, qty, reduce_only, tp_price, sl_price)
 
         try:
             # Cancel all existing orders only if reduce_only = True
             if reduce_only:
-                print(f"🔄 Canceling all open orders for {symbol} before reduce-only order...")
+                log.info("🔄 Canceling all open orders for %s before reduce-only order...", symbol)
                 await self.cancel_all_orders(session, symbol)
 
             # Get symbol precision and round quantity
@@ -318,19 +519,19 @@ class BinanceService:
             
             if qty is not None:
                 qty = round(qty, qty_precision)
-                print(f"Adjusted quantity to {qty_precision} decimals: {qty}")
+                log.debug("Adjusted quantity to %s decimals: %s", qty_precision, qty)
             else:
-                print("❌ Error: Quantity is required")
+                log.error("❌ Error: Quantity is required")
                 return {"error": "Quantity is required"}
 
             # Get balance
             balance = await self.get_account_balance(session)
-            print(f"💰 Current Balance: {balance:.2f} USDT")
+            log.debug("💰 Current Balance: %.2f USDT", balance)
 
             # Set leverage
             leverage_set = await self.set_leverage(session, symbol, self.config.trading.leverage)
             if not leverage_set:
-                print("❌ Failed to set leverage")
+                log.error("❌ Failed to set leverage")
                 return {"error": "Failed to set leverage"}
 
             # Place entry/reduce-only order
@@ -339,26 +540,35 @@ class BinanceService:
                 'side': side,
                 'type': 'MARKET',
                 'quantity': str(qty),
-                'reduceOnly': reduce_only
+                'reduceOnly': reduce_only,
+                'newClientOrderId': f"autrade-{uuid.uuid4().hex[:24]}"
             }
 
             entry_response = await self.request(session, 'POST', '/fapi/v1/order', entry_params)
             if 'orderId' not in entry_response:
-                print(f"❌ Entry order failed: {entry_response}")
-                return entry_response
-
-            print(f"✅ Entry order placed successfully: {entry_response}")
+                # A timed out or dropped request may still have been filled;
+                # give one still in flight at the exchange a moment to land
+                await clock.sleep(1)
+                placed = await self.find_order(session, symbol, entry_params['newClientOrderId'])
+                if placed is None:
+                    log.error("❌ Entry order failed: %s", entry_response)
+                    return entry_response
+                log.warning("⚠️ Order request failed (%s) but the order exists on the exchange",
+                            entry_response.get('error'))
+                entry_response = placed
+
+            log.info("✅ Entry order placed successfully: %s", entry_response)
 
             # If reduce-only, no TP/SL needed
             if reduce_only:
                 return entry_response
 
             # Add delay
-            await asyncio.sleep(1)
+            await clock.sleep(1)
 
             # Get current price
             current_price = await self.get_mark_price(session, symbol)
-            print(f"Current price before placing TP/SL: {current_price}")
+            log.debug("Current price before placing TP/SL: %s", current_price)
 
             buffer = 0.0001
 
@@ -367,7 +577,7 @@ class BinanceService:
                 tp_side = "SELL" if side == "BUY" else "BUY"
                 tp_price_rounded = round(tp_price, price_precision)
                 if (side == "BUY" and current_price >= tp_price - buffer) or (side == "SELL" and current_price <= tp_price + buffer):
-                    print(f"⚠️ TP price {tp_price_rounded} too close to current price {current_price}, skipping TP order")
+                    log.warning("⚠️ TP price %s too close to current price %s, skipping TP order", tp_price_rounded, current_price)
                 else:
                     tp_params = {
                         'symbol': symbol,
@@ -379,16 +589,16 @@ class BinanceService:
                     }
                     tp_response = await self.request(session, 'POST', '/fapi/v1/order', tp_params)
                     if 'orderId' in tp_response:
-                        print(f"✅ TP order placed successfully: {tp_response}")
+                        log.info("✅ TP order placed successfully: %s", tp_response)
                     else:
-                        print(f"❌ TP order failed: {tp_response}")
+                        log.error("❌ TP order failed: %s", tp_response)
 
             # SL Order
             if sl_price:
                 sl_side = "SELL" if side == "BUY" else "BUY"
                 sl_price_rounded = round(sl_price, price_precision)
                 if (side == "BUY" and current_price <= sl_price + buffer) or (side == "SELL" and current_price >= sl_price - buffer):
-                    print(f"⚠️ SL price {sl_price_rounded} too close to current price {current_price}, skipping SL order")
+                    log.warning("⚠️ SL price %s too close to current price %s, skipping SL order", sl_price_rounded, current_price)
                 else:
                     sl_params = {
                         'symbol': symbol,
@@ -400,12 +610,12 @@ class BinanceService:
                     }
                     sl_response = await self.request(session, 'POST', '/fapi/v1/order', sl_params)
                     if 'orderId' in sl_response:
-                        print(f"✅ SL order placed successfully: {sl_response}")
+                        log.info("✅ SL order placed successfully: %s", sl_response)
                     else:
-                        print(f"❌ SL order failed: {sl_response}")
+                        log.error("❌ SL order failed: %s", sl_response)
 
             return entry_response
 
         except Exception as e:
-            print(f"❌ Error placing order: {str(e)}")
+            log.error("❌ Error placing order: %s", e)
             return {"error": str(e)}
\ No newline at end of file
@@ -0,0 +1,148 @@
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from ..utils.log import get_logger
+from .klines import column
+
+log = get_logger("correlation")
+
+# Bars a symbol may skip before its next return is dropped instead of attributed to one bar
+_MAX_GAP_BARS = 3
+
+
+class ReturnCorrelation:
+    """Exponentially weighted covariance of per-bar log returns across symbols.
+
+    ``observe`` is fed each symbol's bars as the scan fetches them and
+    queues the returns of newly closed bars. Once a later bar has closed,
+    an earlier bar is complete and folded into the mean vector and the
+    covariance matrix with one O(N^2) update; history is never revisited.
+    Pairs only update on bars where both symbols have a return, and
+    ``corr`` stays NaN until a pair has ``min_bars`` of them.
+
+    With SCAN_WORKERS the workers send each symbol's newest bars back and
+    the ScanPool observes them here.
+    """
+
+    def __init__(self, halflife: float = 288, min_bars: int = 48, capacity: int = 64):
+        self.alpha = 1 - math.exp(math.log(0.5) / halflife)
+        self.min_bars = min_bars
+        self.index: Dict[str, int] = {}
+        self.mean = np.zeros(capacity)
+        self.cov = np.zeros((capacity, capacity))
+        self.pairs = np.zeros((capacity, capacity), dtype=np.int32)  # bars each pair updated on
+        self._last_time = np.zeros(capacity, dtype=np.int64)
+        self._last_close = np.zeros(capacity)
+        self._pending: Dict[int, Dict[int, float]] = {}  # bar open time -> {symbol index: return}
+        self.bars = 0
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def nbytes(self) -> int:
+        return self.mean.nbytes + self.cov.nbytes + self.pairs.nbytes + self._last_time.nbytes + self._last_close.nbytes
+
+    def _slot(self, symbol: str) -> int:
+        slot = self.index.get(symbol)
+        if slot is not None:
+            return slot
+        slot = len(self.index)
+        if slot == len(self.mean):
+            size = 2 * slot
+            self.mean = np.resize(self.mean, size)
+            self.mean[slot:] = 0.0
+            self._last_time = np.resize(self._last_time, size)
+            self._last_time[slot:] = 0
+            self._last_close = np.resize(self._last_close, size)
+            self._last_close[slot:] = 0.0
+            cov = np.zeros((size, size))
+            cov[:slot, :slot] = self.cov
+            self.cov = cov
+            pairs = np.zeros((size, size), dtype=np.int32)
+            pairs[:slot, :slot] = self.pairs
+            self.pairs = pairs
+        self.index[symbol] = slot
+        return slot
+
+    def observe(self, symbol: str, klines: np.ndarray, step_ms: int) -> None:
+        """Queue the returns of bars that closed since this symbol was last seen.
+
+        The newest row is the still forming bar and is ignored.
+        """
+        if len(klines) < 2:
+            return
+        slot = self._slot(symbol)
+        times = klines["timestamp"][:-1]
+        last = self._last_time[slot]
+        if last and times[-1] <= last:
+            return
+
+        closes = column(klines, "close")[:-1]
+        if last and times[-1] - last <= _MAX_GAP_BARS * step_ms:
+            new = times > last
+            previous = np.concatenate(([self._last_close[slot]], closes[new][:-1]))
+            for time, ret in zip(times[new].tolist(), np.log(closes[new] / previous).tolist()):
+                self._pending.setdefault(time, {})[slot] = ret
+        self._last_time[slot] = times[-1]
+        self._last_close[slot] = closes[-1]
+        self._flush()
+
+    def _flush(self) -> None:
+        """Fold every queued bar older than the newest one into the matrix"""
+        if len(self._pending) < 2:
+            return
+        newest = max(self._pending)
+        for time in sorted(t for t in self._pending if t < newest):
+            returns = self._pending.pop(time)
+            if len(returns) > 1:
+                self._update(returns)
+
+    def _update(self, returns: Dict[int, float]) -> None:
+        n = len(self.index)
+        slots = np.fromiter(returns.keys(), dtype=np.int64, count=len(returns))
+        observed = np.zeros(n, dtype=bool)
+        observed[slots] = True
+        diff = np.zeros(n)
+        diff[slots] = np.fromiter(returns.values(), dtype=np.float64, count=len(returns)) - self.mean[slots]
+
+        alpha = self.alpha
+        both = observed[:, None] & observed[None, :]
+        cov = self.cov[:n, :n]
+        cov[both] = (1 - alpha) * (cov + alpha * np.outer(diff, diff))[both]
+        self.pairs[:n, :n] += both
+        self.mean[:n] += alpha * diff
+        self.bars += 1
+
+    def matrix(self) -> np.ndarray:
+        """Correlation matrix over the symbols in ``index`` order, NaN where too few bars"""
+        n = len(self.index)
+        cov = self.cov[:n, :n]
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+        corr[self.pairs[:n, :n] < self.min_bars] = np.nan
+        return corr
+
+    def corr(self, a: str, b: str) -> float:
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None or self.pairs[i, j] < self.min_bars:
+            return math.nan
+        denominator = math.sqrt(self.cov[i, i] * self.cov[j, j])
+        if denominator <= 0:
+            return math.nan
+        # Pairs and variances update on different bars, so keep it in range
+        return max(-1.0, min(1.0, float(self.cov[i, j]) / denominator))
+
+    def most_correlated(self, symbol: str, others: Iterable[str]) -> Optional[Tuple[str, float]]:
+        """(other, correlation) with the largest absolute correlation, ignoring unknown pairs"""
+        best = None
+        for other in others:
+            if other == symbol:
+                continue
+            value = self.corr(symbol, other)
+            if not math.isnan(value) and (best is None or abs(value) > abs(best[1])):
+                best = (other, value)
+        return best
@@ -0,0 +1,376 @@
+import csv
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..utils.log import get_logger
+from . import indicators, signal_rules
+from .klines import KLINE_DTYPE, concat_klines
+from .market_data import INTERVAL_MS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional: pip install pyarrow for parquet shards
+    pyarrow = None
+
+log = get_logger("dataset_export")
+
+# Bars computed before a chunk so the recursive indicators (EMA, Wilder RSI
+# and ATR) have converged to the full-history values, within ~1e-9
+WARMUP_BARS = 500
+FORMATS = ("parquet", "npz")
+
+
+class HistoryStore:
+    """Per-symbol kline history as .npy files that are read memory-mapped.
+
+    One ``<SYMBOL>_<interval>.npy`` structured array (KLINE_DTYPE) per
+    series, sorted by open time. Readers map the file instead of loading
+    it, so exports touch only the pages of the chunk being processed.
+    """
+
+    def __init__(self, directory: str = "data/history", interval: str = "5m"):
+        self.directory = directory
+        self.interval = interval
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.directory, f"{symbol}_{self.interval}.npy")
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        suffix = f"_{self.interval}.npy"
+        return sorted(name[:-len(suffix)] for name in os.listdir(self.directory) if name.endswith(suffix))
+
+    def load(self, symbol: str) -> np.ndarray:
+        return np.load(self._path(symbol), mmap_mode="r")
+
+    def merge(self, symbol: str, klines: np.ndarray) -> int:
+        """Add bars to a series, newer copies of a bar replacing older ones; returns its length"""
+        path = self._path(symbol)
+        parts = [np.asarray(klines, dtype=KLINE_DTYPE)]
+        if os.path.exists(path):
+            parts.insert(0, np.load(path))
+        merged = concat_klines(parts)
+        # Last occurrence of every open time wins
+        _, last = np.unique(merged["timestamp"][::-1], return_index=True)
+        merged = merged[len(merged) - 1 - last]
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, merged)
+        os.replace(tmp_path, path)
+        return len(merged)
+
+    def import_market_cache(self, cache_path: str = "data/cache/market.pkl") -> Dict[str, int]:
+        """Append the bars a bot's market cache snapshot holds for this interval.
+
+        The cache only keeps the recent bars the scan needs; importing after
+        every run accumulates a longer history.
+        """
+        with open(cache_path, "rb") as f:
+            data = pickle.load(f)
+        return {
+            symbol: self.merge(symbol, klines)
+            for (symbol, interval), klines in data["klines"].items()
+            if interval == self.interval and len(klines)
+        }
+
+    def import_simulated(self, symbols: int = 20, seed: int = 7, start: Optional[float] = None,
+                         days: float = 30.0, history_days: float = 6.0) -> Dict[str, int]:
+        """Write the closed bars of the seeded simulated market.
+
+        Covers what ``autrade simulate`` with the same symbols, seed, start
+        and days sees, including the ``history_days`` before ``start``, so a
+        simulation's journal can be joined with its market. Without
+        ``start`` the history ends now.
+        """
+        from .sim_market import SimulatedMarket
+
+        if start is None:
+            start = time.time() - days * 86400
+        market = SimulatedMarket(symbols, seed, start=start, history_days=history_days)
+        minutes = int((history_days + days) * 1440)
+        return {
+            symbol: self.merge(symbol, market.bars(symbol, self.interval, minutes, closed=True))
+            for symbol in market.symbols
+        }
+
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the last ``window`` values (fewer at the start)"""
+    total = np.cumsum(x)
+    total[window:] = total[window:] - total[:-window]
+    return total / np.minimum(np.arange(1, len(x) + 1), window)
+
+
+def _forward(x: np.ndarray, horizon: int, reduce) -> np.ndarray:
+    """``reduce`` over the next ``horizon`` values of every element, NaN where they run out"""
+    out = np.full(len(x), np.nan)
+    if len(x) > horizon:
+        windows = np.lib.stride_tricks.sliding_window_view(x[1:], horizon)
+        out[:len(windows)] = reduce(windows, axis=1)
+    return out
+
+
+def _lagged(x: np.ndarray, lag: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    out[lag:] = x[:-lag]
+    return out
+
+
+def bar_columns(
+    bars: np.ndarray,
+    rules: Dict[str, "signal_rules.RuleSet"],
+    horizons: Sequence[int] = (1, 3, 6, 12),
+    context: int = 20,
+    min_atr_ratio: float = 0.005
+) -> Dict[str, np.ndarray]:
+    """Feature and label columns for every bar of one series.
+
+    Features are what ``analyze`` computes for a bar once it has closed,
+    ``context`` bars of normalised history and, per rule set, its signal and
+    distance to a signal. Labels look ``horizons`` bars ahead: the return to
+    that close and the highest high and lowest low on the way, relative to
+    the close; NaN where the series ends first.
+    """
+    open_, high, low, close, volume = (np.ascontiguousarray(bars[f], dtype=np.float64)
+                                       for f in ("open", "high", "low", "close", "volume"))
+    values = signal_rules.bar_features(open_, high, low, close, volume)
+    values = {name: x[0] for name, x in values.items()}
+    values["atr"] = np.maximum(values["atr"], close * min_atr_ratio)
+    atr = values["atr"]
+    log_return = np.diff(np.log(close), prepend=np.nan)
+
+    columns = {
+        "timestamp": np.asarray(bars["timestamp"], dtype=np.int64),
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+        "rsi": values["rsi"],
+        "ema20": values["ema20"],
+        "ema50": values["ema50"],
+        "upper_band": values["upper"],
+        "lower_band": values["lower"],
+        "atr": atr,
+        "bb_width": values["upper"] - values["lower"],
+        "volume_avg10": values["volume_avg10"],
+        "price_change_5m": values["price_change"],
+        "candle_pattern": indicators.candle_patterns(open_, high, low, close),
+        "is_green": values["is_green"].astype(np.int8),
+        "is_red": values["is_red"].astype(np.int8),
+        # Scale-free views of the same state
+        "close_ema20_atr": (close - values["ema20"]) / atr,
+        "ema_spread_atr": (values["ema20"] - values["ema50"]) / atr,
+        "band_position": (close - values["lower"]) / (values["upper"] - values["lower"]),
+        "volume_ratio": volume / values["volume_avg10"],
+        "volatility_20": np.sqrt(np.maximum(_rolling_mean(np.nan_to_num(log_return) ** 2, 20), 0.0)),
+    }
+    for lag in range(1, context + 1):
+        columns[f"ctx_return_{lag}"] = _lagged(close, lag) / close - 1
+        columns[f"ctx_volume_{lag}"] = _lagged(volume, lag) / values["volume_avg10"]
+
+    for name, rule_set in rules.items():
+        columns[f"signal_{name}"] = rule_set.evaluate(values)
+        columns[f"distance_{name}"] = np.broadcast_to(rule_set.distance(values), close.shape)
+
+    for horizon in horizons:
+        columns[f"fwd_return_{horizon}"] = _forward(close, horizon, lambda w, axis: w[:, -1]) / close - 1
+        columns[f"fwd_high_{horizon}"] = _forward(high, horizon, np.max) / close - 1
+        columns[f"fwd_low_{horizon}"] = _forward(low, horizon, np.min) / close - 1
+
+    # Prices and timestamps keep full precision, the rest is float32
+    for name, column in columns.items():
+        if column.dtype == np.float64 and name not in ("open", "high", "low", "close"):
+            columns[name] = column.astype(np.float32)
+    return columns
+
+
+def load_entries(journal: str) -> Dict[str, List[Dict]]:
+    """Journal trades per symbol, each with its entry as epoch ms and the outcome columns"""
+    entries: Dict[str, List[Dict]] = {}
+    with open(journal, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                entry_ms = int(datetime.fromisoformat(row["entry_time"]).timestamp() * 1000)
+                trade = {
+                    "entry_time": entry_ms,
+                    "trade_side": 1 if row["side"] in ("LONG", "BUY") else -1,
+                    "trade_pnl": float(row["pnl"]),
+                    "trade_roi": float(row["roi"]),
+                    "trade_is_win": int(row["is_win"] in ("True", "true", "1")),
+                    "trade_close_reason": row.get("close_reason", ""),
+                    "trade_signal_mode": row.get("signal_mode", ""),
+                    "trade_confidence": float(row.get("entry_confidence_score") or 0),
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+            entries.setdefault(row["symbol"], []).append(trade)
+    return entries
+
+
+def _write_shard(columns: Dict[str, np.ndarray], path: str, fmt: str) -> None:
+    """Write one shard atomically"""
+    tmp_path = path + ".tmp"
+    if fmt == "parquet":
+        table = pyarrow.table({name: pyarrow.array(column) for name, column in columns.items()})
+        pyarrow.parquet.write_table(table, tmp_path, compression="zstd")
+    else:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **columns)
+    os.replace(tmp_path, path)
+
+
+def export_symbol(task: Dict) -> List[Dict]:
+    """Export one symbol in chunks of ``chunk_bars`` rows; returns the shards written.
+
+    Each chunk is computed from its bars plus WARMUP_BARS before and the
+    largest horizon after, copied out of the memory map, so memory stays
+    bounded however long the history is. With ``entries`` only the last bar
+    closed before each trade entry is kept, joined with the trade outcome.
+    """
+    symbol = task["symbol"]
+    store = HistoryStore(task["history"], task["interval"])
+    history = store.load(symbol)
+    # Bars carry no higher-timeframe context, so rule sets using it are left out
+    rules = signal_rules.load_rules(task["rules_file"])
+    rules = {name: rule_set for name, rule_set in rules.items() if "htf_trend" not in rule_set.fields}
+    horizons = task["horizons"]
+    lookahead = max(horizons) if horizons else 0
+    lookback = WARMUP_BARS + task["context"]
+    step_ms = INTERVAL_MS[task["interval"]]
+    fmt = task["format"]
+
+    selected = None
+    trades = task.get("entries")
+    if trades is not None:
+        # Last bar whose close time is at or before the entry: what the bot had seen
+        closes = np.asarray(history["timestamp"]) + step_ms
+        selected = np.searchsorted(closes, [t["entry_time"] for t in trades], side="right") - 1
+        keep = selected >= 0
+        selected, trades = selected[keep], [t for t, k in zip(trades, keep) if k]
+
+    shards = []
+    for part, start in enumerate(range(0, len(history), task["chunk_bars"])):
+        stop = min(len(history), start + task["chunk_bars"])
+        rows = None
+        if selected is not None:
+            in_chunk = (selected >= start) & (selected < stop)
+            if not in_chunk.any():
+                continue
+            rows = selected[in_chunk]
+        first = max(0, start - lookback)
+        bars = np.array(history[first:min(len(history), stop + lookahead)])
+        columns = bar_columns(bars, rules, horizons, task["context"], task["min_atr_ratio"])
+        index = np.arange(start, stop) if rows is None else rows
+        columns = {name: column[index - first] for name, column in columns.items()}
+        if rows is not None:
+            chunk_trades = [t for t, k in zip(trades, in_chunk) if k]
+            for name in chunk_trades[0]:
+                columns[name] = np.array([t[name] for t in chunk_trades])
+        columns = {"symbol": np.full(len(index), symbol), **columns}
+
+        path = os.path.join(task["out"], f"{symbol}-{part:04d}.{fmt}")
+        _write_shard(columns, path, fmt)
+        shards.append({"file": os.path.basename(path), "symbol": symbol, "rows": len(index)})
+    return shards
+
+
+def export(
+    history: str,
+    out: str,
+    interval: str = "5m",
+    symbols: Optional[Sequence[str]] = None,
+    journal: Optional[str] = None,
+    horizons: Sequence[int] = (1, 3, 6, 12),
+    context: int = 20,
+    chunk_bars: int = 100_000,
+    workers: int = 0,
+    fmt: str = "auto",
+    rules_file: str = "",
+    min_atr_ratio: float = 0.005
+) -> Dict:
+    """Export every bar (or every journal trade) of a history store as sharded columnar files.
+
+    Symbols are spread across ``workers`` processes (0 exports in this
+    process). Shards are parquet when pyarrow is installed and ``fmt`` is
+    auto, npz otherwise; ``manifest.json`` lists them with the parameters.
+    Shards of a previous export listed in its manifest are removed first.
+    """
+    if fmt == "auto":
+        fmt = "parquet" if pyarrow is not None else "npz"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown dataset format: {fmt}")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("pyarrow is needed for parquet shards; pip install pyarrow or use npz")
+
+    store = HistoryStore(history, interval)
+    symbols = list(symbols or store.symbols())
+    entries = load_entries(journal) if journal else None
+    if entries is not None:
+        symbols = [s for s in symbols if s in entries]
+
+    os.makedirs(out, exist_ok=True)
+    manifest_path = os.path.join(out, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            for shard in json.load(f).get("shards", []):
+                try:
+                    os.remove(os.path.join(out, shard["file"]))
+                except FileNotFoundError:
+                    pass
+
+    tasks = [{
+        "symbol": symbol,
+        "history": history,
+        "interval": interval,
+        "out": out,
+        "entries": entries[symbol] if entries is not None else None,
+        "horizons": list(horizons),
+        "context": context,
+        "chunk_bars": chunk_bars,
+        "format": fmt,
+        "rules_file": rules_file,
+        "min_atr_ratio": min_atr_ratio,
+    } for symbol in symbols]
+
+    started = time.perf_counter()
+    shards: List[Dict] = []
+    if workers > 0 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            for result in pool.map(export_symbol, tasks):
+                shards.extend(result)
+    else:
+        for task in tasks:
+            shards.extend(export_symbol(task))
+    elapsed = time.perf_counter() - started
+
+    manifest = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "source": "journal" if journal else "bars",
+        "history": history,
+        "journal": journal,
+        "interval": interval,
+        "horizons": list(horizons),
+        "context": context,
+        "format": fmt,
+        "symbols": len(symbols),
+        "rows": sum(s["rows"] for s in shards),
+        "seconds": round(elapsed, 2),
+        "shards": shards,
+    }
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    log.info("📦 Exported %s rows in %s shards to %s (%.1fs)", manifest["rows"], len(shards), out, elapsed)
+    return manifest
@@ -0,0 +1,535 @@
+import importlib.util
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.lazy import lazy_import
+from ..utils.log import get_logger
+
+# Optional accelerator (pip install numba), imported by _compiled on first use
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+numba = None
+
+pd = lazy_import("pandas")
+ta_momentum = lazy_import("ta.momentum")
+ta_trend = lazy_import("ta.trend")
+ta_volatility = lazy_import("ta.volatility")
+
+log = get_logger("indicators")
+
+# Candle pattern codes; index into this tuple for the name ("" = none)
+PATTERNS = (
+    "",
+    "Bullish Marubozu",
+    "Strong Bullish",
+    "Hammer",
+    "Inverted Hammer",
+    "Doji",
+    "Bullish Engulfing",
+    "Bearish Marubozu",
+    "Strong Bearish",
+    "Shooting Star",
+    "Hanging Man",
+    "Bearish Engulfing",
+)
+# Band signal thresholds per mode, the one source for the kernels below and
+# signal_rules.BUILTIN_RULES; any other mode never signals. LONG needs
+# rsi < rsi_long, ema20 > ema50 * trend_long, close below lower * band_long
+# (or touching it with touch) and a green candle; SHORT mirrors it
+BAND_FIELDS = ("rsi_long", "rsi_short", "trend_long", "trend_short", "band_long", "band_short", "touch")
+BAND_RULES = {
+    "conservative": (30.0, 70.0, 1.01, 0.99, 0.99, 1.01, 0.0),
+    "moderate": (45.0, 55.0, 1.0, 1.0, 1.0, 1.0, 0.0),
+    "aggressive": (50.0, 50.0, 1.0, 1.0, 1.02, 0.98, 1.0),
+}
+SIGNALS = {1: "LONG", -1: "SHORT", 0: "WAIT"}
+
+BACKENDS = ("numpy", "numba")
+_backend = "numba" if HAVE_NUMBA else "numpy"
+_kernels = None
+
+
+def use_backend(name: str = "auto") -> str:
+    """Select "numba", "numpy" or "auto" (numba when installed); returns the active backend"""
+    global _backend
+    if name == "auto":
+        name = "numba" if HAVE_NUMBA else "numpy"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown indicator backend: {name}")
+    if name == "numba" and not HAVE_NUMBA:
+        log.warning("⚠️ numba is not installed, using the NumPy indicator backend")
+        name = "numpy"
+    _backend = name
+    return name
+
+
+def backend() -> str:
+    return _backend
+
+
+def _as_2d(x) -> Tuple[np.ndarray, bool]:
+    """(symbols, bars) float64 view of ``x`` and whether it was a single series"""
+    arr = np.ascontiguousarray(x, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[None, :], True
+    return arr, False
+
+
+def _shape(out: np.ndarray, single: bool) -> np.ndarray:
+    return out[0] if single else out
+
+
+# NumPy backend --------------------------------------------------------------
+
+def _ewm(x: np.ndarray, alpha: float, seed: np.ndarray, start: int) -> np.ndarray:
+    """y[start] = seed, y[t] = (1 - alpha) * y[t-1] + alpha * x[t] along axis 1.
+
+    The recursion is evaluated in closed form block by block: within a block
+    y[t+j] = d^(j+1) * y[t-1] + alpha * d^(j+1) * cumsum(x[t+k] / d^(k+1)),
+    with d = 1 - alpha. Blocks are short enough that d^-n stays below 1e8,
+    so the rescaling costs no meaningful precision.
+    """
+    symbols, bars = x.shape
+    y = np.full((symbols, bars), np.nan)
+    if start >= bars:
+        return y
+    y[:, start] = seed
+    decay = 1.0 - alpha
+    block = 256 if decay <= 0 else max(1, min(256, int(8 * math.log(10) / -math.log(decay))))
+    prev = y[:, start]
+    t = start + 1
+    while t < bars:
+        end = min(bars, t + block)
+        powers = decay ** np.arange(1, end - t + 1)
+        scaled = np.cumsum(x[:, t:end] / powers, axis=1)
+        y[:, t:end] = powers * (prev[:, None] + alpha * scaled)
+        prev = y[:, end - 1]
+        t = end
+    return y
+
+
+def _ema_np(x: np.ndarray, window: int) -> np.ndarray:
+    out = _ewm(x, 2.0 / (window + 1), x[:, 0], 0)
+    out[:, :window - 1] = np.nan
+    return out
+
+
+def _rsi_np(close: np.ndarray, window: int) -> np.ndarray:
+    diff = np.diff(close, axis=1)
+    zero = np.zeros((close.shape[0], 1))
+    up = np.concatenate((zero, np.where(diff > 0, diff, 0.0)), axis=1)
+    down = np.concatenate((zero, np.where(diff < 0, -diff, 0.0)), axis=1)
+    alpha = 1.0 / window
+    up = _ewm(up, alpha, up[:, 0], 0)
+    down = _ewm(down, alpha, down[:, 0], 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(down == 0, 100.0, 100.0 - 100.0 / (1.0 + up / down))
+    out[:, :window - 1] = np.nan
+    return out
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    tr = high - low
+    prev = close[:, :-1]
+    tr[:, 1:] = np.maximum(tr[:, 1:], np.maximum(np.abs(high[:, 1:] - prev), np.abs(low[:, 1:] - prev)))
+    return tr
+
+
+def _atr_np(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int) -> np.ndarray:
+    symbols, bars = close.shape
+    if bars < window:
+        return np.zeros((symbols, bars))
+    tr = _true_range(high, low, close)
+    out = _ewm(tr, 1.0 / window, tr[:, :window].mean(axis=1), window - 1)
+    out[:, :window - 1] = 0.0
+    return out
+
+
+def _bollinger_np(close: np.ndarray, window: int, dev: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    symbols, bars = close.shape
+    mavg = np.full((symbols, bars), np.nan)
+    std = np.full((symbols, bars), np.nan)
+    if bars >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(close, window, axis=1)
+        mavg[:, window - 1:] = windows.mean(axis=2)
+        std[:, window - 1:] = windows.std(axis=2)
+    return mavg, mavg + dev * std, mavg - dev * std
+
+
+def _candles_np(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    total = high - low
+    valid = total > 0
+    size = np.where(valid, total, 1.0)
+    body = np.abs(close - open_) / size
+    upper = (high - np.maximum(open_, close)) / size
+    lower = (np.minimum(open_, close) - low) / size
+    bull, bear = close > open_, close <= open_
+    strong, small = body > 0.6, body < 0.3
+    medium = ~strong & ~small
+    shaved = (upper < 0.1) & (lower < 0.1)
+    codes = np.select(
+        [
+            bull & strong & shaved,
+            bull & strong,
+            bull & small & (lower > 0.6),
+            bull & small & (upper > 0.6),
+            bull & medium & (upper < 0.1) & (lower > 0.4),
+            bear & strong & shaved,
+            bear & strong,
+            bear & small & (upper > 0.6),
+            bear & small & (lower > 0.6),
+            bear & medium & (lower < 0.1) & (upper > 0.4),
+            small,
+        ],
+        [1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 5],
+        0,
+    )
+    return np.where(valid, codes, 0).astype(np.int8)
+
+
+def _signals_np(rules, rsi, ema20, ema50, close, lower, upper, is_green, is_red) -> np.ndarray:
+    rsi_long, rsi_short, trend_long, trend_short, band_long, band_short, touch = rules
+    if touch:
+        below, above = close <= lower * band_long, close >= upper * band_short
+    else:
+        below, above = close < lower * band_long, close > upper * band_short
+    long = (rsi < rsi_long) & (ema20 > ema50 * trend_long) & below & is_green
+    short = (rsi > rsi_short) & (ema20 < ema50 * trend_short) & above & is_red
+    return np.where(long, 1, np.where(short, -1, 0)).astype(np.int8)
+
+
+# Numba backend --------------------------------------------------------------
+
+def _ema_loop(x, window, out):
+    alpha = 2.0 / (window + 1)
+    for s in numba.prange(x.shape[0]):
+        y = x[s, 0]
+        for t in range(x.shape[1]):
+            if t > 0:
+                y = (1.0 - alpha) * y + alpha * x[s, t]
+            out[s, t] = y if t >= window - 1 else np.nan
+
+
+def _rsi_loop(close, window, out):
+    alpha = 1.0 / window
+    for s in numba.prange(close.shape[0]):
+        up = 0.0
+        down = 0.0
+        for t in range(close.shape[1]):
+            if t > 0:
+                diff = close[s, t] - close[s, t - 1]
+                up = (1.0 - alpha) * up + alpha * (diff if diff > 0 else 0.0)
+                down = (1.0 - alpha) * down + alpha * (-diff if diff < 0 else 0.0)
+            if t < window - 1:
+                out[s, t] = np.nan
+            elif down == 0:
+                out[s, t] = 100.0
+            else:
+                out[s, t] = 100.0 - 100.0 / (1.0 + up / down)
+
+
+def _atr_loop(high, low, close, window, out):
+    bars = close.shape[1]
+    for s in numba.prange(close.shape[0]):
+        atr = 0.0
+        for t in range(bars):
+            tr = high[s, t] - low[s, t]
+            if t > 0:
+                tr = max(tr, abs(high[s, t] - close[s, t - 1]), abs(low[s, t] - close[s, t - 1]))
+            if t < window - 1:
+                atr += tr
+                out[s, t] = 0.0
+            elif t == window - 1:
+                atr = (atr + tr) / window
+                out[s, t] = atr
+            else:
+                atr = (atr * (window - 1) + tr) / window
+                out[s, t] = atr
+
+
+def _bollinger_loop(close, window, dev, mavg, upper, lower):
+    for s in numba.prange(close.shape[0]):
+        for t in range(close.shape[1]):
+            if t < window - 1:
+                mavg[s, t] = np.nan
+                upper[s, t] = np.nan
+                lower[s, t] = np.nan
+                continue
+            mean = 0.0
+            for k in range(t - window + 1, t + 1):
+                mean += close[s, k]
+            mean /= window
+            var = 0.0
+            for k in range(t - window + 1, t + 1):
+                var += (close[s, k] - mean) ** 2
+            std = math.sqrt(var / window)
+            mavg[s, t] = mean
+            upper[s, t] = mean + dev * std
+            lower[s, t] = mean - dev * std
+
+
+def _candle_code(o, h, l, c):
+    total = h - l
+    if not total > 0:
+        return 0
+    body = abs(c - o) / total
+    upper = (h - max(o, c)) / total
+    lower = (min(o, c) - l) / total
+    if c > o:
+        if body > 0.6:
+            return 1 if upper < 0.1 and lower < 0.1 else 2
+        if body < 0.3:
+            return 3 if lower > 0.6 else 4 if upper > 0.6 else 5
+        return 6 if upper < 0.1 and lower > 0.4 else 0
+    if body > 0.6:
+        return 7 if upper < 0.1 and lower < 0.1 else 8
+    if body < 0.3:
+        return 9 if upper > 0.6 else 10 if lower > 0.6 else 5
+    return 11 if lower < 0.1 and upper > 0.4 else 0
+
+
+def _candles_loop(open_, high, low, close, out):
+    for i in numba.prange(out.size):
+        out[i] = _jit_candle_code(open_[i], high[i], low[i], close[i])
+
+
+def _signal_code(rules, rsi, ema20, ema50, close, lower, upper, is_green, is_red):
+    touch = rules[6] != 0
+    if rsi < rules[0] and ema20 > ema50 * rules[2] and is_green:
+        band = lower * rules[4]
+        if close <= band if touch else close < band:
+            return 1
+    if rsi > rules[1] and ema20 < ema50 * rules[3] and is_red:
+        band = upper * rules[5]
+        if close >= band if touch else close > band:
+            return -1
+    return 0
+
+
+def _signals_loop(rules, rsi, ema20, ema50, close, lower, upper, is_green, is_red, out):
+    for i in numba.prange(out.size):
+        out[i] = _jit_signal_code(rules, rsi[i], ema20[i], ema50[i], close[i], lower[i], upper[i], is_green[i], is_red[i])
+
+
+_jit_candle_code = None
+_jit_signal_code = None
+
+
+def _compiled() -> Dict:
+    """Compile the loop kernels on first use (cached on disk by numba)"""
+    global _kernels, _jit_candle_code, _jit_signal_code, numba
+    if _kernels is None:
+        import numba
+        scalar = numba.njit(cache=True, nogil=True)
+        parallel = numba.njit(cache=True, nogil=True, parallel=True)
+        # The elementwise loops resolve these globals when they are compiled
+        _jit_candle_code = scalar(_candle_code)
+        _jit_signal_code = scalar(_signal_code)
+        _kernels = {
+            "ema": parallel(_ema_loop),
+            "rsi": parallel(_rsi_loop),
+            "atr": parallel(_atr_loop),
+            "bollinger": parallel(_bollinger_loop),
+            "candles": parallel(_candles_loop),
+            "signals": parallel(_signals_loop),
+        }
+    return _kernels
+
+
+# Public API -------------------------------------------------------------------
+# Every function takes one series (bars,) or a batch (symbols, bars) and
+# matches the ``ta`` library's output for the same parameters.
+
+def ema(x, window: int) -> np.ndarray:
+    """Exponential moving average like ta.trend.EMAIndicator (NaN before ``window`` bars)"""
+    x, single = _as_2d(x)
+    if _backend == "numba":
+        out = np.empty_like(x)
+        _compiled()["ema"](x, window, out)
+    else:
+        out = _ema_np(x, window)
+    return _shape(out, single)
+
+
+def rsi(close, window: int = 14) -> np.ndarray:
+    """Wilder RSI like ta.momentum.RSIIndicator"""
+    close, single = _as_2d(close)
+    if _backend == "numba":
+        out = np.empty_like(close)
+        _compiled()["rsi"](close, window, out)
+    else:
+        out = _rsi_np(close, window)
+    return _shape(out, single)
+
+
+def atr(high, low, close, window: int = 14) -> np.ndarray:
+    """Wilder average true range like ta.volatility.AverageTrueRange (0 before ``window`` bars)"""
+    high, single = _as_2d(high)
+    low, _ = _as_2d(low)
+    close, _ = _as_2d(close)
+    if _backend == "numba":
+        out = np.empty_like(close)
+        _compiled()["atr"](high, low, close, window, out)
+    else:
+        out = _atr_np(high, low, close, window)
+    return _shape(out, single)
+
+
+def bollinger(close, window: int = 20, dev: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(middle, upper, lower) bands like ta.volatility.BollingerBands"""
+    close, single = _as_2d(close)
+    if _backend == "numba":
+        mavg, upper, lower = np.empty_like(close), np.empty_like(close), np.empty_like(close)
+        _compiled()["bollinger"](close, window, float(dev), mavg, upper, lower)
+    else:
+        mavg, upper, lower = _bollinger_np(close, window, dev)
+    return _shape(mavg, single), _shape(upper, single), _shape(lower, single)
+
+
+def candle_patterns(open_, high, low, close) -> np.ndarray:
+    """Pattern code (index into PATTERNS) of every bar, elementwise over any shape"""
+    arrays = [np.ascontiguousarray(a, dtype=np.float64) for a in (open_, high, low, close)]
+    if _backend == "numba":
+        out = np.empty(arrays[0].shape, dtype=np.int8)
+        _compiled()["candles"](*(a.ravel() for a in arrays), out.ravel())
+        return out
+    return _candles_np(*arrays)
+
+
+def band_signals(mode: str, rsi_, ema20, ema50, close, lower, upper, is_green, is_red) -> np.ndarray:
+    """+1 (LONG), -1 (SHORT) or 0 (WAIT) per element, by the rule set of ``mode``"""
+    floats = [np.ascontiguousarray(a, dtype=np.float64) for a in (rsi_, ema20, ema50, close, lower, upper)]
+    flags = [np.ascontiguousarray(a, dtype=np.bool_) for a in (is_green, is_red)]
+    rules = BAND_RULES.get(mode)
+    if rules is None:
+        return np.zeros(floats[0].shape, dtype=np.int8)
+    if _backend == "numba":
+        out = np.empty(floats[0].shape, dtype=np.int8)
+        _compiled()["signals"](
+            np.array(rules), *(a.ravel() for a in floats), *(a.ravel() for a in flags), out.ravel()
+        )
+        return out
+    return _signals_np(rules, *floats, *flags)
+
+
+def latest(open_, high, low, close, mode: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """Last-bar indicator values of a batch (symbols, bars), as analyze uses them.
+
+    With ``mode`` the band signal of the last bar is included as well.
+    """
+    open_, _ = _as_2d(open_)
+    high, _ = _as_2d(high)
+    low, _ = _as_2d(low)
+    close, _ = _as_2d(close)
+    _, upper, lower = bollinger(close)
+    values = {
+        "rsi": rsi(close)[:, -1],
+        "ema20": ema(close, 20)[:, -1],
+        "ema50": ema(close, 50)[:, -1],
+        "upper_band": upper[:, -1],
+        "lower_band": lower[:, -1],
+        "atr": atr(high, low, close)[:, -1],
+        "pattern": candle_patterns(open_[:, -1], high[:, -1], low[:, -1], close[:, -1]),
+    }
+    if mode is not None:
+        last_open, last_close = open_[:, -1], close[:, -1]
+        values["signal"] = band_signals(
+            mode, values["rsi"], values["ema20"], values["ema50"], last_close,
+            values["lower_band"], values["upper_band"], last_close > last_open, last_close < last_open
+        )
+    return values
+
+
+# Parity and benchmark ---------------------------------------------------------
+
+def synthetic_bars(symbols: int, bars: int, seed: int = 0) -> Tuple[np.ndarray, ...]:
+    """Random-walk (open, high, low, close) batches of shape (symbols, bars)"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (symbols, bars)), axis=1))
+    open_ = close * np.exp(rng.normal(0, 0.003, (symbols, bars)))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, (symbols, bars))))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, (symbols, bars))))
+    return open_, high, low, close
+
+
+def _ta_series(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+    c, h, l = pd.Series(close), pd.Series(high), pd.Series(low)
+    bb = ta_volatility.BollingerBands(c)
+    return {
+        "rsi": ta_momentum.RSIIndicator(c).rsi().to_numpy(),
+        "ema20": ta_trend.EMAIndicator(c, window=20).ema_indicator().to_numpy(),
+        "ema50": ta_trend.EMAIndicator(c, window=50).ema_indicator().to_numpy(),
+        "upper_band": bb.bollinger_hband().to_numpy(),
+        "lower_band": bb.bollinger_lband().to_numpy(),
+        "atr": ta_volatility.AverageTrueRange(h, l, c, window=14).average_true_range().to_numpy(),
+    }
+
+
+def parity(symbols: int = 20, bars: int = 1500, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Largest relative difference to the ``ta`` library per indicator and backend.
+
+    NaN positions must match exactly; a mismatch is reported as ``inf``.
+    """
+    open_, high, low, close = synthetic_bars(symbols, bars, seed)
+    reference = [_ta_series(high[s], low[s], close[s]) for s in range(symbols)]
+    active = _backend
+    report = {}
+    try:
+        for name in available_backends():
+            use_backend(name)
+            _, upper, lower = bollinger(close)
+            ours = {
+                "rsi": rsi(close), "ema20": ema(close, 20), "ema50": ema(close, 50),
+                "upper_band": upper, "lower_band": lower, "atr": atr(high, low, close),
+            }
+            report[name] = {}
+            for key, values in ours.items():
+                expected = np.array([r[key] for r in reference])
+                if not np.array_equal(np.isnan(expected), np.isnan(values)):
+                    report[name][key] = float("inf")
+                    continue
+                mask = ~np.isnan(expected)
+                error = np.abs(values[mask] - expected[mask]) / np.maximum(np.abs(expected[mask]), 1e-12)
+                report[name][key] = float(error.max()) if error.size else 0.0
+    finally:
+        use_backend(active)
+    return report
+
+
+def available_backends() -> List[str]:
+    return ["numpy", "numba"] if HAVE_NUMBA else ["numpy"]
+
+
+def benchmark(universes: Sequence[int], bars: int = 1500, repeat: int = 3,
+              mode: str = "aggressive", ta_sample: int = 20) -> List[Dict[str, float]]:
+    """Milliseconds to compute the analyze indicator set for a whole universe.
+
+    ``ta`` runs symbol by symbol as analyze used to; it is timed on at most
+    ``ta_sample`` symbols and scaled to the universe. The backends process
+    the universe as one batch; numba is compiled before timing.
+    """
+    active = _backend
+    rows = []
+    try:
+        for universe in universes:
+            open_, high, low, close = synthetic_bars(universe, bars)
+            sample = min(universe, ta_sample)
+            started = time.perf_counter()
+            for s in range(sample):
+                _ta_series(high[s], low[s], close[s])
+            row = {"symbols": universe, "ta": (time.perf_counter() - started) * 1000 * universe / sample}
+            for name in available_backends():
+                use_backend(name)
+                latest(open_[:1], high[:1], low[:1], close[:1], mode)  # warm up / compile
+                best = float("inf")
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    latest(open_, high, low, close, mode)
+                    best = min(best, time.perf_counter() - started)
+                row[name] = best * 1000
+            rows.append(row)
+    finally:
+        use_backend(active)
+    return rows
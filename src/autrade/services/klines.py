@@ -0,0 +1,55 @@
+from typing import List, Sequence
+
+import numpy as np
+
+# Binance kline row layout; the trailing "ignore" column is dropped
+KLINE_DTYPE = np.dtype([
+    ("timestamp", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+    ("close_time", "i8"),
+    ("quote_volume", "f8"),
+    ("num_trades", "i8"),
+    ("taker_base_vol", "f8"),
+    ("taker_quote_vol", "f8"),
+])
+_FIELDS = len(KLINE_DTYPE.names)
+
+
+def empty_klines() -> np.ndarray:
+    return np.empty(0, dtype=KLINE_DTYPE)
+
+
+def decode_klines(raw: Sequence[Sequence]) -> np.ndarray:
+    """Decode a /fapi/v1/klines response into a structured array in one pass.
+
+    NumPy parses the numeric strings directly into float64/int64 fields, so
+    no per-cell Python objects or pandas frames are created. Columns are
+    accessed by name, e.g. ``klines["close"]``.
+    """
+    if not isinstance(raw, list) or not raw:
+        return empty_klines()
+    return np.array([tuple(row[:_FIELDS]) for row in raw], dtype=KLINE_DTYPE)
+
+
+def column(klines: np.ndarray, name: str) -> np.ndarray:
+    """Contiguous float64 copy of one field, for kernels that need unit stride"""
+    return np.ascontiguousarray(klines[name], dtype=np.float64)
+
+
+def concat_klines(parts: List[np.ndarray]) -> np.ndarray:
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return empty_klines()
+    return np.concatenate(parts)
+
+
+
+def to_frame(klines: np.ndarray) -> "pandas.DataFrame":
+    """Thin DataFrame over the decoded fields for callers that want pandas"""
+    import pandas as pd
+
+    return pd.DataFrame(klines, copy=False)
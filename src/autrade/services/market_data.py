@@ -0,0 +1,136 @@
+import os
+import pickle
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ..utils.clock import clock
+from ..utils.log import get_logger
+from .klines import concat_klines
+
+log = get_logger("market_data")
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+}
+
+
+class MarketDataCache:
+    """In-memory klines and exchange metadata that survive restarts.
+
+    The cache is pickled to disk on shutdown and reloaded on start, so the
+    first scan after a restart only downloads the bars that closed while the
+    bot was down instead of the full history.
+    """
+
+    def __init__(self, path: str = "data/cache/market.pkl", exchange_info_ttl: float = 3600):
+        self.path = path
+        self.exchange_info_ttl = exchange_info_ttl
+        self.klines: Dict[Tuple[str, str], np.ndarray] = {}
+        self._used: Dict[Tuple[str, str], float] = {}  # last access per series, for eviction
+        self.exchange_info: Optional[Dict] = None
+        self.exchange_info_time: float = 0.0
+
+    def missing_bars(self, symbol: str, interval: str, limit: int) -> int:
+        """Number of bars to request so the cached series is current again"""
+        cached = self.klines.get((symbol, interval))
+        self._used[(symbol, interval)] = clock.monotonic()
+        step = INTERVAL_MS.get(interval)
+        if cached is None or len(cached) == 0 or step is None:
+            return limit
+        last_open = int(cached["timestamp"][-1])
+        now_ms = int(clock.time() * 1000)
+        # +1 re-fetches the last cached bar, which may still have been open
+        missing = (now_ms - last_open) // step + 1
+        if missing >= limit or len(cached) < limit:
+            return limit
+        return max(2, int(missing))
+
+    def merge_klines(self, symbol: str, interval: str, fresh: np.ndarray, limit: int) -> np.ndarray:
+        """Merge freshly fetched bars into the cache and return the latest ``limit`` bars"""
+        key = (symbol, interval)
+        cached = self.klines.get(key)
+        self._used[key] = clock.monotonic()
+        if len(fresh) == 0:
+            return cached[-limit:] if cached is not None else fresh
+
+        if cached is None or len(cached) == 0:
+            self.klines[key] = fresh
+            return fresh
+
+        first_fresh = int(fresh["timestamp"][0])
+        step = INTERVAL_MS.get(interval, 0)
+        if first_fresh > int(cached["timestamp"][-1]) + step:
+            # Fresh bars do not reach back to the cache; keep whichever series is longer
+            if len(fresh) >= len(cached):
+                self.klines[key] = fresh
+            return fresh
+
+        keep = max(limit, len(cached))
+        merged = concat_klines([cached[cached["timestamp"] < first_fresh], fresh])[-keep:]
+        self.klines[key] = merged
+        return merged[-limit:]
+
+    def nbytes(self) -> int:
+        return sum(series.nbytes for series in self.klines.values())
+
+    def evict(self, nbytes: int) -> int:
+        """Drop the least recently used series until ``nbytes`` are freed"""
+        freed = 0
+        for key in sorted(self.klines, key=lambda k: self._used.get(k, 0.0)):
+            if freed >= nbytes:
+                break
+            freed += self.klines.pop(key).nbytes
+            self._used.pop(key, None)
+        return freed
+
+    def get_exchange_info(self) -> Optional[Dict]:
+        if self.exchange_info is None:
+            return None
+        if clock.time() - self.exchange_info_time > self.exchange_info_ttl:
+            return None
+        return self.exchange_info
+
+    def set_exchange_info(self, info: Dict) -> None:
+        self.exchange_info = info
+        self.exchange_info_time = clock.time()
+
+    def save(self) -> None:
+        """Snapshot the caches to disk"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({
+                    "klines": self.klines,
+                    "exchange_info": self.exchange_info,
+                    "exchange_info_time": self.exchange_info_time
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            log.info("💾 Market cache saved: %s kline series", len(self.klines))
+        except Exception as e:
+            log.error("❌ Error saving market cache: %s", e)
+
+    def load(self) -> bool:
+        """Reload a previous snapshot; returns False when there is none"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            self.klines = data["klines"]
+            self.exchange_info = data["exchange_info"]
+            self.exchange_info_time = data["exchange_info_time"]
+            log.info("♻️ Market cache loaded: %s kline series", len(self.klines))
+            return True
+        except Exception as e:
+            log.warning("⚠️ Ignoring unreadable market cache: %s", e)
+            return False
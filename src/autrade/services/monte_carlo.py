@@ -0,0 +1,144 @@
+import csv
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+from ..utils.log import get_logger
+
+log = get_logger("monte_carlo")
+
+# Cells (paths x trades) simulated per chunk, bounds memory at ~100 MB
+_CHUNK_CELLS = 4_000_000
+DRAWDOWN_BINS = 24
+
+
+def load_returns(csv_path: str = "data/trades.csv", mode: Optional[str] = None) -> np.ndarray:
+    """Per-trade unlevered returns from a trade journal.
+
+    Return on margin divided by the trade's leverage, so samples can be
+    replayed at any leverage. Works on the live journal and on the journal
+    a ``simulate`` or ``replay`` run writes in its workdir.
+    """
+    returns = []
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            if mode is not None and row.get("signal_mode") != mode:
+                continue
+            try:
+                pnl = float(row["pnl"])
+                margin = float(row["margin_used"])
+                leverage = float(row["leverage"]) or 1.0
+            except (KeyError, TypeError, ValueError):
+                continue
+            if margin > 0:
+                returns.append(pnl / margin / leverage)
+    return np.asarray(returns, dtype=np.float64)
+
+
+def _longest_run(losses: np.ndarray) -> np.ndarray:
+    """Longest run of True per row"""
+    steps = np.arange(losses.shape[1])
+    last_win = np.maximum.accumulate(np.where(losses, -1, steps), axis=1)
+    return (steps - last_win).max(axis=1)
+
+
+def wilson_interval(wins: int, trades: int, z: float = 1.96):
+    if trades == 0:
+        return 0.0, 0.0
+    p = wins / trades
+    denominator = 1 + z * z / trades
+    centre = (p + z * z / (2 * trades)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trades + z * z / (4 * trades * trades)) / denominator
+    return centre - margin, centre + margin
+
+
+def simulate(
+    returns: np.ndarray,
+    balance: float = 100.0,
+    leverage: float = 1.0,
+    fraction: float = 1.0,
+    trades: Optional[int] = None,
+    paths: int = 20000,
+    ruin: float = 1.0,
+    seed: Optional[int] = None
+) -> Dict:
+    """Bootstrap equity paths from per-trade returns.
+
+    Every path draws ``trades`` returns with replacement and trades a fixed
+    margin of ``balance * fraction`` at ``leverage``, like the bot does with
+    FIXED_USDT_BALANCE; a trade never loses more than its margin. A path is
+    ruined once it has lost ``ruin`` of the balance. Paths are generated in
+    chunks so memory stays bounded however many are asked for.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n = len(returns)
+    if n == 0:
+        raise ValueError("no trades to resample")
+    trades = trades or n
+    rng = np.random.default_rng(seed)
+    margin = balance * fraction
+    outcomes = np.maximum(returns * leverage * margin, -margin)
+    floor = -balance * ruin
+
+    final = np.empty(paths)
+    max_drawdown = np.empty(paths)
+    ruined = np.empty(paths, dtype=bool)
+    streak = np.empty(paths, dtype=np.int64)
+    chunk = max(1, _CHUNK_CELLS // trades)
+    for start in range(0, paths, chunk):
+        stop = min(paths, start + chunk)
+        pnl = outcomes[rng.integers(0, n, (stop - start, trades))]
+        equity = np.cumsum(pnl, axis=1)
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), 0.0)
+        final[start:stop] = equity[:, -1]
+        max_drawdown[start:stop] = (peak - equity).max(axis=1)
+        ruined[start:stop] = equity.min(axis=1) <= floor
+        streak[start:stop] = _longest_run(pnl <= 0)
+
+    # Winrate uncertainty: resampled winrate of a sample as large as the journal
+    wins = int((returns > 0).sum())
+    boot = rng.binomial(n, wins / n, 10000) / n
+    wilson = wilson_interval(wins, n)
+    percentiles = (5, 50, 95)
+    counts, edges = np.histogram(max_drawdown / balance * 100, bins=DRAWDOWN_BINS)
+    return {
+        "samples": n,
+        "paths": paths,
+        "trades": trades,
+        "balance": balance,
+        "leverage": leverage,
+        "margin": margin,
+        "winrate": wins / n * 100,
+        "winrate_ci": [float(np.percentile(boot, 2.5)) * 100, float(np.percentile(boot, 97.5)) * 100],
+        "winrate_wilson": [wilson[0] * 100, wilson[1] * 100],
+        "expectancy": float(outcomes.mean()),
+        "final_pnl": {p: float(np.percentile(final, p)) for p in percentiles},
+        "max_drawdown": {p: float(np.percentile(max_drawdown, p)) for p in (50, 90, 95, 99)},
+        "max_drawdown_pct": {p: float(np.percentile(max_drawdown, p)) / balance * 100 for p in (50, 90, 95, 99)},
+        "risk_of_ruin": float(ruined.mean()) * 100,
+        "ruin_threshold": ruin * 100,
+        "loss_streak": {p: int(np.percentile(streak, p)) for p in (50, 95, 99)},
+        "drawdown_histogram": {"counts": counts.tolist(), "edges_pct": edges.tolist()},
+    }
+
+
+def format_report(result: Dict) -> str:
+    pnl = result["final_pnl"]
+    dd = result["max_drawdown"]
+    dd_pct = result["max_drawdown_pct"]
+    streak = result["loss_streak"]
+    lines = [
+        f"{result['paths']} paths x {result['trades']} trades, bootstrapped from {result['samples']} journal trades",
+        f"Margin {result['margin']:.2f} USDT at {result['leverage']:g}x on a {result['balance']:.2f} USDT balance",
+        "",
+        f"Winrate            {result['winrate']:.1f}%  (95% CI {result['winrate_ci'][0]:.1f}-{result['winrate_ci'][1]:.1f}%,"
+        f" Wilson {result['winrate_wilson'][0]:.1f}-{result['winrate_wilson'][1]:.1f}%)",
+        f"Expectancy         {result['expectancy']:+.4f} USDT per trade",
+        f"Final PnL          p5 {pnl[5]:+.2f}  p50 {pnl[50]:+.2f}  p95 {pnl[95]:+.2f} USDT",
+        f"Max drawdown       p50 {dd[50]:.2f}  p90 {dd[90]:.2f}  p95 {dd[95]:.2f}  p99 {dd[99]:.2f} USDT",
+        f"                   p50 {dd_pct[50]:.1f}%  p90 {dd_pct[90]:.1f}%  p95 {dd_pct[95]:.1f}%  p99 {dd_pct[99]:.1f}% of balance",
+        f"Longest loss run   p50 {streak[50]}  p95 {streak[95]}  p99 {streak[99]}",
+        f"Risk of ruin       {result['risk_of_ruin']:.2f}%  (losing {result['ruin_threshold']:g}% of the balance)",
+    ]
+    return "\n".join(lines)
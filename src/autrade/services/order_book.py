@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import random
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from ..utils.lazy import lazy_import
+from ..utils.log import get_logger
+
+aiohttp = lazy_import("aiohttp")
+
+log = get_logger("order_book")
+
+STREAM_URL = "wss://fstream.binance.com/stream"
+
+
+class OrderBook:
+    """Local copy of one symbol's book, kept in sync from a snapshot plus diffs.
+
+    Follows the Binance futures rules: diffs older than the snapshot are
+    dropped, the first applied diff must cover the snapshot's
+    ``lastUpdateId`` (or start right after it), and afterwards every diff's ``pu`` must equal the
+    previous diff's ``u``. A break marks the book unsynced until the next
+    snapshot.
+
+    Queries work on sorted top-``depth`` ladders that are rebuilt only after
+    the book changed, so repeated spread/slippage/imbalance lookups between
+    updates cost a few list operations.
+    """
+
+    def __init__(self, symbol: str, depth: int = 50):
+        self.symbol = symbol
+        self.depth = depth
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.last_update_id = 0
+        self.synced = False
+        self._snapshot_id = 0
+        self._dirty = True
+        self._bid_ladder: List[Tuple[float, float]] = []
+        self._ask_ladder: List[Tuple[float, float]] = []
+
+    def apply_snapshot(self, snapshot: Dict) -> None:
+        """Load a /fapi/v1/depth response"""
+        self.bids = {float(p): float(q) for p, q in snapshot["bids"]}
+        self.asks = {float(p): float(q) for p, q in snapshot["asks"]}
+        self._snapshot_id = self.last_update_id = snapshot["lastUpdateId"]
+        self.synced = False
+        self._dirty = True
+
+    def apply_diff(self, event: Dict) -> bool:
+        """Apply one depthUpdate event; False means a sequence gap (resync needed)"""
+        first, last, prev = event["U"], event["u"], event.get("pu")
+        if last < self._snapshot_id:
+            return True  # already contained in the snapshot
+        if not self.synced:
+            if first > self._snapshot_id + 1 or last < self._snapshot_id:
+                return False
+            self.synced = True
+        elif prev is not None and prev != self.last_update_id:
+            self.synced = False
+            return False
+
+        for side, levels in ((self.bids, event["b"]), (self.asks, event["a"])):
+            for price, qty in levels:
+                price = float(price)
+                qty = float(qty)
+                if qty == 0:
+                    side.pop(price, None)
+                else:
+                    side[price] = qty
+        self.last_update_id = last
+        self._dirty = True
+        return True
+
+    def _ladders(self) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+        if self._dirty:
+            self._bid_ladder = heapq.nlargest(self.depth, self.bids.items())
+            self._ask_ladder = heapq.nsmallest(self.depth, self.asks.items())
+            self._trim()
+            self._dirty = False
+        return self._bid_ladder, self._ask_ladder
+
+    def _trim(self) -> None:
+        # Far levels never reach the top once the book holds ten times the depth
+        limit = self.depth * 10
+        for side, ladder in ((self.bids, self._bid_ladder), (self.asks, self._ask_ladder)):
+            if len(side) > limit * 2 and ladder:
+                keep = (heapq.nlargest if side is self.bids else heapq.nsmallest)(limit, side.items())
+                side.clear()
+                side.update(keep)
+
+    def best_bid(self) -> float:
+        bids, _ = self._ladders()
+        return bids[0][0] if bids else 0.0
+
+    def best_ask(self) -> float:
+        _, asks = self._ladders()
+        return asks[0][0] if asks else 0.0
+
+    def spread_pct(self) -> float:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid <= 0 or ask <= 0:
+            return float("inf")
+        return (ask - bid) / bid * 100
+
+    def slippage(self, side: str, qty: float) -> Tuple[float, float]:
+        """Average fill price and slippage (% from the touch) of a market order of ``qty``.
+
+        Levels beyond the kept depth are unknown; an order larger than the
+        visible book is priced at the last visible level for the remainder.
+        """
+        bids, asks = self._ladders()
+        ladder = asks if side == "BUY" else bids
+        if not ladder or qty <= 0:
+            return 0.0, 0.0
+        remaining = qty
+        cost = 0.0
+        price = ladder[0][0]
+        for price, size in ladder:
+            take = min(remaining, size)
+            cost += take * price
+            remaining -= take
+            if remaining <= 0:
+                break
+        cost += remaining * price
+        average = cost / qty
+        touch = ladder[0][0]
+        return average, abs(average - touch) / touch * 100
+
+    def imbalance(self, levels: int = 10) -> float:
+        """(bid size - ask size) / total over the top ``levels``, in [-1, 1]"""
+        bids, asks = self._ladders()
+        bid_size = sum(q for _, q in bids[:levels])
+        ask_size = sum(q for _, q in asks[:levels])
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total else 0.0
+
+    def depth_qty(self, side: str, max_slippage_pct: float) -> float:
+        """Largest quantity a market ``side`` order can take within ``max_slippage_pct`` of the touch"""
+        bids, asks = self._ladders()
+        ladder = asks if side == "BUY" else bids
+        if not ladder:
+            return 0.0
+        touch = ladder[0][0]
+        limit = touch * (1 + max_slippage_pct / 100) if side == "BUY" else touch * (1 - max_slippage_pct / 100)
+        qty = 0.0
+        for price, size in ladder:
+            if (side == "BUY" and price > limit) or (side == "SELL" and price < limit):
+                break
+            qty += size
+        return qty
+
+
+class OrderBooks:
+    """Local books for a set of symbols fed by one combined diff-depth stream.
+
+    Events that arrive before a symbol's snapshot are buffered and replayed
+    once it is loaded; on a sequence gap the symbol's book is dropped and a
+    fresh snapshot is fetched while the stream keeps buffering.
+    """
+
+    def __init__(self, binance_service, depth: int = 50, speed_ms: int = 100):
+        self.binance = binance_service
+        self.depth = depth
+        self.speed_ms = speed_ms
+        self.books: Dict[str, OrderBook] = {}
+        self.resyncs = 0
+        self._wanted: Set[str] = set()
+        self._subscribed: Set[str] = set()
+        self._pending: Dict[str, List[Dict]] = {}
+        self._ws = None
+        self._request_id = 0
+
+    def get(self, symbol: str) -> Optional[OrderBook]:
+        """The symbol's book if it is currently in sync"""
+        book = self.books.get(symbol)
+        return book if book is not None and book.synced else None
+
+    def track(self, symbols: List[str]) -> None:
+        """Follow these symbols; new ones are subscribed on the open stream"""
+        self._wanted.update(symbols)
+
+    def _stream(self, symbol: str) -> str:
+        return f"{symbol.lower()}@depth@{self.speed_ms}ms"
+
+    async def _subscribe(self) -> None:
+        new = self._wanted - self._subscribed
+        if not new or self._ws is None:
+            return
+        self._request_id += 1
+        await self._ws.send_str(json.dumps({
+            "method": "SUBSCRIBE",
+            "params": [self._stream(s) for s in sorted(new)],
+            "id": self._request_id
+        }))
+        for symbol in new:
+            self._subscribed.add(symbol)
+            self._pending[symbol] = []
+        log.info("📚 Following order books of %s more symbols", len(new))
+
+    async def _load_snapshot(self, session, symbol: str) -> None:
+        snapshot = await self.binance.request(
+            session, 'GET', '/fapi/v1/depth', {'symbol': symbol, 'limit': 1000}
+        )
+        if 'error' in snapshot or 'lastUpdateId' not in snapshot:
+            log.warning("⚠️ Order book snapshot failed for %s: %s", symbol, snapshot.get('error'))
+            self._pending.pop(symbol, None)
+            self._subscribed.discard(symbol)
+            return
+        book = OrderBook(symbol, self.depth)
+        book.apply_snapshot(snapshot)
+        buffered = self._pending.pop(symbol, [])
+        self.books[symbol] = book
+        for event in buffered:
+            self.apply(event)
+
+    def apply(self, event: Dict) -> None:
+        """Route one depthUpdate event to its book, flagging gaps for resync"""
+        symbol = event["s"]
+        pending = self._pending.get(symbol)
+        if pending is not None:
+            pending.append(event)
+            return
+        book = self.books.get(symbol)
+        if book is None:
+            return
+        if not book.apply_diff(event):
+            log.warning("⚠️ Sequence gap in %s order book, resyncing", symbol)
+            self.resyncs += 1
+            del self.books[symbol]
+            self._pending[symbol] = [event]
+
+    async def _snapshots(self, session) -> None:
+        """Fetch snapshots for symbols that are buffering, a few at a time"""
+        while True:
+            await self._subscribe()
+            waiting = [s for s in self._pending if s not in self.books][:5]
+            if waiting:
+                await asyncio.gather(*[self._load_snapshot(session, s) for s in waiting])
+            else:
+                await asyncio.sleep(1)
+
+    async def run(self, session) -> None:
+        """Keep the books in sync until cancelled, reconnecting on errors"""
+        while True:
+            loader = None
+            try:
+                async with session.ws_connect(STREAM_URL, heartbeat=30) as ws:
+                    self._ws = ws
+                    self._subscribed.clear()
+                    self.books.clear()
+                    self._pending.clear()
+                    loader = asyncio.create_task(self._snapshots(session))
+                    async for message in ws:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        data = json.loads(message.data).get("data")
+                        if data and data.get("e") == "depthUpdate":
+                            self.apply(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("❌ Order book stream error: %s", e)
+            finally:
+                self._ws = None
+                if loader is not None:
+                    loader.cancel()
+            await asyncio.sleep(5)
+
+
+class SyntheticDepthStream:
+    """Stand-in for the exchange: a random book around a fixed mid, with snapshots and diffs.
+
+    ``snapshot()`` and ``events()`` produce the same shapes as
+    ``/fapi/v1/depth`` and the ``depthUpdate`` stream, with consistent
+    ``U``/``u``/``pu`` ids. ``gap_every`` loses an event now and then, so
+    the next one's ``pu`` does not follow on, to exercise resync. ``truth`` is the book the stream describes, for
+    comparing against a locally maintained one (see ``sync_check``).
+    """
+
+    def __init__(self, symbol: str = "TESTUSDT", mid: float = 100.0, tick: float = 0.01,
+                 levels: int = 200, gap_every: int = 0, seed: int = 0):
+        self.symbol = symbol
+        self.tick = tick
+        self.gap_every = gap_every
+        self.rng = random.Random(seed)
+        self.update_id = 1000
+        self.mid = mid
+        self.truth = {
+            "bids": {round(mid - tick * (i + 1), 8): self._size() for i in range(levels)},
+            "asks": {round(mid + tick * (i + 1), 8): self._size() for i in range(levels)},
+        }
+
+    def _size(self) -> float:
+        return round(self.rng.uniform(0.1, 10.0), 3)
+
+    def snapshot(self) -> Dict:
+        return {
+            "lastUpdateId": self.update_id,
+            "bids": [[str(p), str(q)] for p, q in sorted(self.truth["bids"].items(), reverse=True)],
+            "asks": [[str(p), str(q)] for p, q in sorted(self.truth["asks"].items())],
+        }
+
+    def _change(self, side: str) -> List[List[str]]:
+        book = self.truth[side]
+        changes = []
+        for _ in range(self.rng.randint(1, 6)):
+            offset = self.rng.randint(1, 20) * self.tick
+            price = round(self.mid - offset if side == "bids" else self.mid + offset, 8)
+            if price in book and self.rng.random() < 0.3:
+                del book[price]
+                changes.append([str(price), "0"])
+            else:
+                book[price] = self._size()
+                changes.append([str(price), str(book[price])])
+        return changes
+
+    def events(self, count: int) -> Iterator[Dict]:
+        for n in range(count):
+            prev = self.update_id
+            first = prev + 1
+            self.update_id += self.rng.randint(1, 5)
+            event = {
+                "e": "depthUpdate",
+                "s": self.symbol,
+                "U": first,
+                "u": self.update_id,
+                "pu": prev,
+                "b": self._change("bids"),
+                "a": self._change("asks"),
+            }
+            if self.gap_every and n and n % self.gap_every == 0:
+                continue  # lost in transit; the truth still changed
+            yield event
+
+
+async def sync_check(events: int = 20000, gap_every: int = 1000, compare_every: int = 100,
+                     depth: int = 50, seed: int = 0) -> Dict[str, int]:
+    """Keep an OrderBooks in sync from a SyntheticDepthStream and compare it with the truth.
+
+    The first snapshot is taken before events the book never receives, so
+    it is older than the buffered events and has to be fetched again; after
+    that every ``gap_every`` events a lost event (a ``pu`` gap) forces a
+    resync. Every
+    ``compare_every`` events an in-sync book is compared level by level
+    with the stream's book. Returns the counts; ``mismatches`` should be 0.
+    """
+    stream = SyntheticDepthStream(gap_every=gap_every, seed=seed)
+    stale = [stream.snapshot()]
+    for _ in stream.events(3):
+        pass  # sent before the subscription
+
+    class Exchange:
+        snapshots = 0
+
+        async def request(self, session, method, endpoint, params=None):
+            self.snapshots += 1
+            return stale.pop() if stale else stream.snapshot()
+
+    exchange = Exchange()
+    books = OrderBooks(exchange, depth)
+    symbol = stream.symbol
+    books._pending[symbol] = []
+    report = {"events": 0, "snapshots": 0, "resyncs": 0, "compared": 0, "unsynced": 0, "mismatches": 0}
+    for n, event in enumerate(stream.events(events), 1):
+        report["events"] += 1
+        books.apply(event)
+        # The snapshot request goes out while the stream keeps buffering
+        if symbol in books._pending and len(books._pending[symbol]) >= 2:
+            await books._load_snapshot(None, symbol)
+        if n % compare_every:
+            continue
+        book = books.get(symbol)
+        if book is None:
+            report["unsynced"] += 1
+            continue
+        report["compared"] += 1
+        if book.bids != stream.truth["bids"] or book.asks != stream.truth["asks"]:
+            report["mismatches"] += 1
+    report.update(snapshots=exchange.snapshots, resyncs=books.resyncs)
+    return report
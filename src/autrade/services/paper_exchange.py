@@ -0,0 +1,384 @@
+from typing import Dict, List, Optional
+
+from ..utils.clock import clock
+from ..utils.log import get_logger
+
+log = get_logger("paper")
+
+DIRECTIONS = {"BUY": 1, "SELL": -1}
+STOP_TYPES = ("STOP_MARKET", "TAKE_PROFIT_MARKET")
+# Binance's rejection of an order the account cannot margin
+MARGIN_INSUFFICIENT = {"code": -2019, "msg": "Margin is insufficient."}
+
+
+def _now_ms() -> int:
+    return int(clock.time() * 1000)
+
+
+class _Quote:
+    __slots__ = ("bid", "ask", "bid_qty", "ask_qty", "mark", "funding_rate", "next_funding", "time")
+
+    def __init__(self):
+        self.bid = self.ask = self.mark = 0.0
+        self.bid_qty = self.ask_qty = 0.0
+        self.funding_rate = 0.0
+        self.next_funding = 0
+        self.time = 0
+
+
+class _Position:
+    __slots__ = ("qty", "entry", "leverage", "realized", "fees", "funding", "update_time")
+
+    def __init__(self, leverage: int):
+        self.qty = 0.0  # signed, positive for long
+        self.entry = 0.0
+        self.leverage = leverage
+        self.realized = 0.0
+        self.fees = 0.0
+        self.funding = 0.0
+        self.update_time = 0
+
+
+class _Stop:
+    __slots__ = ("order_id", "side", "type", "stop_price", "qty", "close_position")
+
+    def __init__(self, order_id: int, side: str, type: str, stop_price: float, qty: float, close_position: bool):
+        self.order_id = order_id
+        self.side = side
+        self.type = type
+        self.stop_price = stop_price
+        self.qty = qty
+        self.close_position = close_position
+
+
+class PaperExchange:
+    """In-process futures exchange that fills orders against book-top quotes.
+
+    Feed it quotes with ``update_quote`` (live bookTicker/premiumIndex data
+    or replayed history). Market orders cross the spread and pay slippage
+    proportional to their size relative to the quantity at the touch, plus a
+    taker fee. Orders that open more exposure than the available balance
+    can margin are rejected with Binance's -2019. Stop and take-profit
+    orders trigger on the mid price and then fill like market orders at
+    whatever the book shows, so a quote that gaps through the trigger fills
+    beyond it. Funding is settled on open positions whenever a quote passes
+    the next funding time.
+
+    Order and position records mirror the Binance response shapes, so the
+    bot can treat the paper exchange like the real one.
+    """
+
+    def __init__(
+        self,
+        balance: float = 100.0,
+        taker_fee: float = 0.0004,
+        impact: float = 1.0,
+        default_depth: float = 50000.0,
+        min_spread: float = 0.0001,
+        history: int = 1000
+    ):
+        self.wallet = balance
+        self.taker_fee = taker_fee
+        self.impact = impact
+        self.default_depth = default_depth  # USDT at the touch when the quote has no size
+        self.min_spread = min_spread
+        self.history = history
+        self.quotes: Dict[str, _Quote] = {}
+        self.positions: Dict[str, _Position] = {}
+        self.stops: Dict[str, List[_Stop]] = {}
+        self.fills: Dict[str, List[Dict]] = {}
+        self._next_id = 1
+
+    def _order_id(self) -> int:
+        order_id = self._next_id
+        self._next_id += 1
+        return order_id
+
+    def update_quote(
+        self,
+        symbol: str,
+        bid: float,
+        ask: float,
+        bid_qty: float = 0.0,
+        ask_qty: float = 0.0,
+        mark: Optional[float] = None,
+        funding_rate: Optional[float] = None,
+        next_funding: Optional[int] = None,
+        ts: Optional[int] = None
+    ) -> List[Dict]:
+        """Apply a new quote, settle due funding and fire crossed stops.
+
+        Returns the fills of any stop orders that triggered.
+        """
+        ts = _now_ms() if ts is None else ts
+        quote = self.quotes.get(symbol)
+        if quote is None:
+            quote = self.quotes[symbol] = _Quote()
+        quote.bid = bid
+        quote.ask = ask
+        quote.bid_qty = bid_qty
+        quote.ask_qty = ask_qty
+        quote.mark = (bid + ask) / 2 if mark is None else mark
+        quote.time = ts
+
+        if quote.next_funding and ts >= quote.next_funding:
+            self.settle_funding(symbol, quote.funding_rate, ts)
+        if funding_rate is not None:
+            quote.funding_rate = funding_rate
+        if next_funding is not None:
+            quote.next_funding = next_funding
+
+        if symbol in self.stops:
+            return self._trigger_stops(symbol, quote, ts)
+        return []
+
+    def update_price(self, symbol: str, price: float, ts: Optional[int] = None) -> List[Dict]:
+        """Quote from a single price, e.g. a kline close while replaying"""
+        return self.update_quote(symbol, price, price, ts=ts)
+
+    def _fill_price(self, quote: _Quote, direction: int, qty: float) -> float:
+        mid = (quote.bid + quote.ask) / 2
+        spread = max(quote.ask - quote.bid, mid * self.min_spread)
+        depth = quote.ask_qty if direction > 0 else quote.bid_qty
+        if depth <= 0:
+            depth = self.default_depth / mid
+        slip = self.impact * spread * qty / depth
+        return quote.ask + slip if direction > 0 else quote.bid - slip
+
+    def market_order(
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        reduce_only: bool = False,
+        leverage: int = 1,
+        ts: Optional[int] = None,
+        order_type: str = "MARKET"
+    ) -> Dict:
+        quote = self.quotes.get(symbol)
+        if quote is None or quote.mark <= 0:
+            return {"error": f"No quote for {symbol}"}
+        direction = DIRECTIONS.get(side)
+        if direction is None or qty <= 0:
+            return {"error": f"Invalid order {side} {qty}"}
+
+        ts = _now_ms() if ts is None else ts
+        position = self.positions.get(symbol)
+        if reduce_only:
+            held = position.qty if position else 0.0
+            if held * direction >= 0:
+                return {"error": "ReduceOnly Order is rejected"}
+            qty = min(qty, abs(held))
+
+        price = self._fill_price(quote, direction, qty)
+        held = position.qty if position else 0.0
+        opening = qty if held * direction >= 0 else max(0.0, qty - abs(held))
+        if opening:
+            margin = price * opening / (position.leverage if position else leverage)
+            if margin > self.available():
+                return {"error": "HTTP 400: Margin is insufficient.", **MARGIN_INSUFFICIENT}
+
+        fee = price * qty * self.taker_fee
+        if position is None:
+            position = self.positions[symbol] = _Position(leverage)
+        realized = self._apply_fill(position, direction * qty, price)
+        position.fees += fee
+        position.update_time = ts
+        self.wallet += realized - fee
+
+        order_id = self._order_id()
+        fill = {
+            "id": order_id,
+            "orderId": order_id,
+            "symbol": symbol,
+            "side": side,
+            "price": str(price),
+            "qty": str(qty),
+            "quoteQty": str(price * qty),
+            "commission": str(fee),
+            "commissionAsset": "USDT",
+            "realizedPnl": str(realized),
+            "time": ts
+        }
+        fills = self.fills.setdefault(symbol, [])
+        fills.append(fill)
+        if len(fills) > self.history:
+            del fills[:len(fills) - self.history]
+
+        if position.qty == 0:
+            # Binance cancels closePosition stops once the position is gone
+            self.stops.pop(symbol, None)
+
+        return {
+            "orderId": order_id,
+            "symbol": symbol,
+            "status": "FILLED",
+            "side": side,
+            "type": order_type,
+            "reduceOnly": reduce_only,
+            "origQty": str(qty),
+            "executedQty": str(qty),
+            "avgPrice": str(price),
+            "cumQuote": str(price * qty),
+            "commission": str(fee),
+            "updateTime": ts
+        }
+
+    def _apply_fill(self, position: _Position, signed_qty: float, price: float) -> float:
+        """Update size and average entry, returning realized PnL"""
+        held = position.qty
+        if held == 0 or (held > 0) == (signed_qty > 0):
+            total = held + signed_qty
+            position.entry = (position.entry * abs(held) + price * abs(signed_qty)) / abs(total)
+            position.qty = total
+            return 0.0
+
+        closed = min(abs(held), abs(signed_qty))
+        realized = (price - position.entry) * closed * (1 if held > 0 else -1)
+        position.realized += realized
+        position.qty = held + signed_qty
+        if abs(position.qty) < 1e-12:
+            position.qty = 0.0
+            position.entry = 0.0
+        elif (position.qty > 0) != (held > 0):
+            # Flipped: the remainder opens at the fill price
+            position.entry = price
+        return realized
+
+    def adopt_position(self, symbol: str, qty: float, entry: float, leverage: int = 1) -> None:
+        """Take over an existing position (signed ``qty``) without trading"""
+        position = self.positions[symbol] = _Position(leverage)
+        position.qty = qty
+        position.entry = entry
+        position.update_time = _now_ms()
+
+    def place_stop(
+        self,
+        symbol: str,
+        side: str,
+        order_type: str,
+        stop_price: float,
+        qty: float = 0.0,
+        close_position: bool = True
+    ) -> Dict:
+        if order_type not in STOP_TYPES:
+            return {"error": f"Unsupported order type {order_type}"}
+        order_id = self._order_id()
+        self.stops.setdefault(symbol, []).append(
+            _Stop(order_id, side, order_type, stop_price, qty, close_position)
+        )
+        return {
+            "orderId": order_id,
+            "symbol": symbol,
+            "status": "NEW",
+            "side": side,
+            "type": order_type,
+            "stopPrice": str(stop_price),
+            "origQty": str(qty),
+            "closePosition": close_position
+        }
+
+    def cancel_all(self, symbol: str) -> None:
+        self.stops.pop(symbol, None)
+
+    def _triggered(self, stop: _Stop, price: float) -> bool:
+        # A sell stop-loss and a buy take-profit fire on a fall, the others on a rise
+        falling = (stop.side == "SELL") == (stop.type == "STOP_MARKET")
+        return price <= stop.stop_price if falling else price >= stop.stop_price
+
+    def _trigger_stops(self, symbol: str, quote: _Quote, ts: int) -> List[Dict]:
+        price = (quote.bid + quote.ask) / 2
+        fired = [stop for stop in self.stops[symbol] if self._triggered(stop, price)]
+        if not fired:
+            return []
+
+        fills = []
+        for stop in fired:
+            position = self.positions.get(symbol)
+            if stop.close_position:
+                if position is None or position.qty == 0:
+                    break
+                qty = abs(position.qty)
+            else:
+                qty = stop.qty
+            order = self.market_order(
+                symbol, stop.side, qty, reduce_only=stop.close_position,
+                ts=ts, order_type=stop.type
+            )
+            if "error" in order:
+                continue
+            order["stopPrice"] = str(stop.stop_price)
+            fills.append(order)
+            log.debug(
+                "Paper %s %s triggered at %s, filled %s",
+                stop.type, symbol, stop.stop_price, order["avgPrice"]
+            )
+
+        remaining = self.stops.get(symbol)
+        if remaining is not None:
+            fired_ids = {stop.order_id for stop in fired}
+            remaining[:] = [stop for stop in remaining if stop.order_id not in fired_ids]
+            if not remaining:
+                del self.stops[symbol]
+        return fills
+
+    def settle_funding(self, symbol: str, rate: float, ts: Optional[int] = None) -> float:
+        """Pay or receive funding on an open position; longs pay a positive rate"""
+        position = self.positions.get(symbol)
+        quote = self.quotes.get(symbol)
+        if position is None or position.qty == 0 or quote is None:
+            return 0.0
+        payment = -position.qty * quote.mark * rate
+        position.funding += payment
+        position.update_time = _now_ms() if ts is None else ts
+        self.wallet += payment
+        return payment
+
+    def _mark(self, symbol: str, position: _Position) -> float:
+        """Mark price, or the entry price until a quote has arrived"""
+        quote = self.quotes.get(symbol)
+        return quote.mark if quote is not None and quote.mark > 0 else position.entry
+
+    def position_risk(self, symbol: str) -> Optional[Dict]:
+        """Open position in the /fapi/v2/positionRisk shape, None when flat"""
+        position = self.positions.get(symbol)
+        if position is None or position.qty == 0:
+            return None
+        mark = self._mark(symbol, position)
+        direction = 1 if position.qty > 0 else -1
+        return {
+            "symbol": symbol,
+            "positionAmt": str(position.qty),
+            "entryPrice": str(position.entry),
+            "markPrice": str(mark),
+            "unRealizedProfit": str((mark - position.entry) * position.qty),
+            "liquidationPrice": str(max(0.0, position.entry * (1 - direction / position.leverage))),
+            "leverage": str(position.leverage),
+            "isolated": False,
+            "isAutoAddMargin": False,
+            "positionSide": "BOTH",
+            "notional": str(abs(position.qty * mark)),
+            "isolatedWallet": "0.0",
+            "updateTime": position.update_time
+        }
+
+    def user_trades(self, symbol: str) -> List[Dict]:
+        """Fills for ``symbol`` in the /fapi/v1/userTrades shape, oldest first"""
+        return list(self.fills.get(symbol, ()))
+
+    def available(self) -> float:
+        """Equity not yet committed as initial margin of open positions"""
+        margin = sum(
+            abs(p.qty) * p.entry / p.leverage
+            for p in self.positions.values()
+            if p.qty
+        )
+        return self.equity() - margin
+
+    def equity(self) -> float:
+        unrealized = sum(
+            (self._mark(symbol, p) - p.entry) * p.qty
+            for symbol, p in self.positions.items()
+            if p.qty
+        )
+        return self.wallet + unrealized
@@ -0,0 +1,221 @@
+import asyncio
+import gzip
+import json
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Hashable, List, Optional
+
+from ..utils.clock import clock
+from ..utils.log import get_logger
+
+log = get_logger("replay")
+
+FORMAT_VERSION = 1
+TELEGRAM_METHODS = ("send_message", "edit_message", "send_photo")
+# Request parameters that identify a call across runs. Limits, prices,
+# quantities and message texts depend on the time a call is made
+STABLE_PARAMS = ("symbol", "interval", "side", "type")
+
+
+def _call_key(kind: str, method: str, endpoint: str, params: Optional[Dict]) -> Hashable:
+    if kind != "binance":
+        # Telegram texts carry timestamps and prices; the method alone counts
+        return kind, method, endpoint
+    params = params or {}
+    return (kind, method, endpoint) + tuple(str(params.get(name, "")) for name in STABLE_PARAMS)
+
+
+class SessionRecorder:
+    """Tees every Binance request and Telegram call of a bot into a gzip JSON-lines log.
+
+    ``attach(bot)`` wraps the service instances' methods, so ``TradingBot``
+    itself is unchanged. Each record holds the call, its response, the
+    offset from the start of recording (``t``) and how long it took (``d``),
+    both read from ``clock`` so a simulated run records its virtual timeline.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._started = 0.0
+        self.records = 0
+
+    def _open(self, bot_mode: str) -> None:
+        self._file = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6)
+        self._started = clock.monotonic()
+        self._write({"v": FORMAT_VERSION, "started": clock.time(), "bot_mode": bot_mode})
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+
+    def record(self, kind: str, method: str, endpoint: str, params: Optional[Dict],
+               response, started: float) -> None:
+        if self._file is None:
+            return
+        now = clock.monotonic()
+        self._write({
+            "t": round(started - self._started, 4),
+            "d": round(now - started, 4),
+            "k": kind,
+            "m": method,
+            "e": endpoint,
+            "p": params or {},
+            "r": response
+        })
+        self.records += 1
+
+    def attach(self, bot) -> None:
+        """Record ``bot``, or every strategy of a StrategyHost"""
+        self._open(bot.config.binance.bot_mode)
+        for member in getattr(bot, "bots", [bot]):
+            member.binance_service.request = self._wrap_request(member.binance_service.request)
+            telegram = member.telegram_service
+            for name in TELEGRAM_METHODS:
+                setattr(telegram, name, self._wrap_telegram(name, getattr(telegram, name)))
+        log.info("⏺️ Recording session to %s", self.path)
+
+    def _wrap_request(self, request):
+        async def recorded_request(session, method, endpoint, params=None):
+            started = clock.monotonic()
+            response = await request(session, method, endpoint, params)
+            self.record("binance", method.upper(), endpoint, params, response, started)
+            return response
+        return recorded_request
+
+    def _wrap_telegram(self, name: str, original):
+        async def recorded(session, *args, **kwargs):
+            started = clock.monotonic()
+            response = await original(session, *args, **kwargs)
+            # Photo files are transient; keep the caption only
+            params = {"args": [] if name == "send_photo" else list(args), "kwargs": kwargs}
+            self.record("telegram", "POST", name, params, response, started)
+            return response
+        return recorded
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            log.info("⏺️ Recorded %s calls to %s", self.records, self.path)
+
+
+class SessionReplayer:
+    """Serves a recorded session back to an unmodified ``TradingBot``.
+
+    Responses are matched by call (service, method, endpoint and the
+    ``STABLE_PARAMS``) and handed out in recorded order; a call repeated more
+    often than it was recorded gets the last response again. With
+    ``pace="recorded"`` every response is held back until its recorded
+    completion time (divided by ``speed``), otherwise responses return
+    immediately.
+
+    ``run(bot)`` drives ``bot.run()`` until every recorded response has been
+    served or ``max_seconds`` of session time passed (default: the length of
+    the recording plus a minute), and returns a summary. It is meant to run
+    under ``utils.clock.run_virtual`` from the recorded start, so the bot's
+    sleeps take no wall time.
+    """
+
+    def __init__(self, path: str, pace: str = "fast", speed: float = 1.0, max_seconds: Optional[float] = None):
+        self.path = path
+        self.pace = pace
+        self.speed = speed
+        self.max_seconds = max_seconds
+        self.header: Dict = {}
+        self._queues: Dict[Hashable, Deque[Dict]] = defaultdict(deque)
+        self._last: Dict[Hashable, Dict] = {}
+        self.total = 0
+        self.served = 0
+        self.repeats = 0
+        self.misses = 0
+        self.duration = 0.0
+        self._started = 0.0
+        self._wall_started = 0.0
+        self._finished: Optional[asyncio.Event] = None
+        self._load()
+
+    def _load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            self.header = json.loads(f.readline())
+            if self.header.get("v") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported recording version {self.header.get('v')}")
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Recording was cut off mid-write
+                    break
+                key = _call_key(record["k"], record["m"], record["e"], record["p"])
+                self._queues[key].append(record)
+                self.total += 1
+                self.duration = max(self.duration, record["t"] + record["d"])
+
+    async def _serve(self, key: Hashable):
+        queue = self._queues.get(key)
+        if queue:
+            record = queue.popleft()
+            self._last[key] = record
+            self.served += 1
+            if self.served == self.total and self._finished is not None:
+                self._finished.set()
+        elif key in self._last:
+            record = self._last[key]
+            self.repeats += 1
+        else:
+            self.misses += 1
+            log.debug("Replay miss: %s", key)
+            return None
+
+        if self.pace == "recorded":
+            due = (record["t"] + record["d"]) / self.speed
+            delay = due - (clock.monotonic() - self._started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return record["r"]
+
+    def attach(self, bot) -> None:
+        async def replayed_request(session, method, endpoint, params=None):
+            response = await self._serve(_call_key("binance", method.upper(), endpoint, params))
+            return {"error": "Not in recording"} if response is None else response
+
+        for member in getattr(bot, "bots", [bot]):
+            member.binance_service.request = replayed_request
+            for name in TELEGRAM_METHODS:
+                setattr(member.telegram_service, name, self._telegram(name))
+
+    def _telegram(self, name: str):
+        async def replayed(session, *args, **kwargs):
+            params = {"args": [] if name == "send_photo" else list(args), "kwargs": kwargs}
+            return await self._serve(_call_key("telegram", "POST", name, params))
+        return replayed
+
+    async def run(self, bot) -> Dict:
+        self._finished = asyncio.Event()
+        self._started = clock.monotonic()
+        self._wall_started = time.monotonic()
+        timeout = self.max_seconds if self.max_seconds is not None else self.duration / self.speed + 60
+        task = asyncio.ensure_future(bot.run())
+        waiter = asyncio.ensure_future(self._finished.wait())
+        try:
+            await asyncio.wait({task, waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for pending in (task, waiter):
+                pending.cancel()
+            await asyncio.gather(task, waiter, return_exceptions=True)
+        return self.summary()
+
+    def summary(self) -> Dict:
+        wall = time.monotonic() - self._wall_started if self._wall_started else 0.0
+        return {
+            "recorded_calls": self.total,
+            "served": self.served,
+            "repeats": self.repeats,
+            "misses": self.misses,
+            "recorded_seconds": round(self.duration, 2),
+            "replayed_seconds": round(clock.monotonic() - self._started, 2) if self._started else 0.0,
+            "wall_seconds": round(wall, 2),
+            "calls_per_second": round((self.served + self.repeats) / wall, 1) if wall else 0.0
+        }
+
+    def remaining(self) -> List[Hashable]:
+        return [key for key, queue in self._queues.items() if queue]
@@ -0,0 +1,122 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from ..utils.clock import clock
+from ..utils.log import get_logger
+
+log = get_logger("request_cache")
+
+# Freshness budget per GET endpoint in seconds; 0 means merge in-flight calls only
+DEFAULT_TTLS: Dict[str, float] = {
+    "/fapi/v1/ticker/price": 1.0,
+    "/fapi/v1/ticker/bookTicker": 0.5,
+    "/fapi/v1/premiumIndex": 1.0,
+    "/fapi/v1/ticker/24hr": 30.0,
+    "/fapi/v1/exchangeInfo": 60.0,
+    "/fapi/v2/account": 2.0,
+    "/fapi/v2/positionRisk": 0.0,
+    "/fapi/v1/klines": 0.0,
+    "/fapi/v1/depth": 0.0,
+    "/fapi/v1/userTrades": 0.0,
+    "/fapi/v1/openOrders": 0.0,
+}
+
+
+class RequestCoalescer:
+    """Singleflight plus a short-TTL cache for idempotent requests.
+
+    Identical requests (same endpoint and parameters) that overlap in time
+    share one underlying call: the first caller starts it and later callers
+    await the same task. Successful results of endpoints with a freshness
+    budget are then served from memory until they expire. Errors are never
+    cached. A cancelled caller does not cancel the shared call.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, max_entries: int = 4096):
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.max_entries = max_entries
+        self._cache: Dict[Hashable, Tuple[float, object]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.lookups = 0
+        self.hits = 0
+        self.merges = 0
+
+    @staticmethod
+    def key(endpoint: str, params: Optional[Dict]) -> Hashable:
+        return endpoint, tuple(sorted((params or {}).items()))
+
+    async def get(self, endpoint: str, params: Optional[Dict], fetch: Callable[[], Awaitable]):
+        key = self.key(endpoint, params)
+        self.lookups += 1
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires, value = cached
+            if clock.monotonic() < expires:
+                self.hits += 1
+                return value
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.merges += 1
+        else:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key, endpoint=endpoint: self._settle(key, endpoint, t))
+        return await asyncio.shield(task)
+
+    def _settle(self, key: Hashable, endpoint: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        ttl = self.ttls.get(endpoint, 0.0)
+        if ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if isinstance(value, dict) and "error" in value:
+            return
+        if len(self._cache) >= self.max_entries:
+            self._evict()
+        self._cache[key] = (clock.monotonic() + ttl, value)
+
+    def _evict(self) -> None:
+        now = clock.monotonic()
+        for key in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+        if len(self._cache) >= self.max_entries:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def clear(self) -> int:
+        """Drop every cached result; in-flight calls are left alone"""
+        entries = len(self._cache)
+        self._cache.clear()
+        return entries
+
+    def invalidate(self, endpoint: str, symbol: Optional[str] = None) -> None:
+        """Forget cached results of ``endpoint``, optionally only for one symbol"""
+        for key in [k for k in self._cache if k[0] == endpoint]:
+            if symbol is None or ("symbol", symbol) in key[1] or not key[1]:
+                del self._cache[key]
+
+    def metrics(self) -> Dict:
+        lookups = self.lookups or 1
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "merges": self.merges,
+            "hit_ratio": round(self.hits / lookups, 3),
+            "merge_ratio": round(self.merges / lookups, 3),
+            "entries": len(self._cache),
+        }
+
+    def log_metrics(self) -> None:
+        if not self.lookups:
+            return
+        metrics = self.metrics()
+        log.info(
+            "🧮 Request cache: %s lookups, %.1f%% hits, %.1f%% merged",
+            metrics["lookups"], metrics["hit_ratio"] * 100, metrics["merge_ratio"] * 100,
+            extra={"fields": {"event": "request_cache_metrics", **metrics}}
+        )
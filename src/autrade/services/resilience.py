@@ -0,0 +1,251 @@
+import asyncio
+import random
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from ..utils.clock import clock
+from ..utils.log import get_logger
+
+log = get_logger("resilience")
+
+# (ok, retryable, payload): what one attempt of a request produced
+Outcome = Tuple[bool, bool, Dict]
+Attempt = Callable[[], Awaitable[Outcome]]
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and fails fast.
+
+    After ``reset_timeout`` seconds one probe request is let through
+    (half-open); its success closes the breaker, its failure re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and clock.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def on_success(self) -> None:
+        if self.state != self.CLOSED:
+            log.info("✅ Circuit for %s closed again", self.name)
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def on_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                log.warning("⚠️ Circuit for %s opened after %s failures", self.name, self.failures)
+            self.state = self.OPEN
+            self.opened_at = clock.monotonic()
+            self._probing = False
+
+
+class EndpointStats:
+    """Latency window and counters for one endpoint"""
+
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+        self._observed = 0
+        self._p95: Optional[float] = None
+        self._p95_at = 0
+
+    def observe(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self._observed += 1
+
+    def p95(self, min_samples: int = 20) -> Optional[float]:
+        """95th percentile latency, recomputed every 10 samples; the hedging delay"""
+        if len(self.latencies) < min_samples:
+            return None
+        if self._p95 is None or self._observed - self._p95_at >= 10:
+            self._p95 = self.percentile(0.95)
+            self._p95_at = self._observed
+        return self._p95
+
+    def percentile(self, q: float) -> Optional[float]:
+        """``q`` quantile of the current window, computed fresh and not cached"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[max(0, int(len(ordered) * q) - 1)]
+
+
+class Resilience:
+    """Timeouts, retries, hedging and circuit breaking around request attempts.
+
+    ``call`` runs an attempt factory, which is invoked once per try so
+    signed requests get a fresh timestamp and signature:
+
+    * every attempt is bounded by the endpoint's timeout;
+    * GET requests are retried on retryable failures (timeouts, connection
+      errors, 429/418/5xx) with full-jitter exponential backoff;
+    * once an endpoint has a latency history, a GET still running at that
+      endpoint's p95 gets a hedged duplicate, and the first success wins;
+    * consecutive retryable failures open the endpoint's breaker, which
+      then rejects calls immediately until a probe succeeds. ``key`` names
+      a separate breaker for calls that must not share one with the rest
+      of the endpoint.
+
+    Failures are returned as ``{"error": ...}`` dicts, like BinanceService
+    always did.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 5.0,
+        timeouts: Optional[Dict[str, float]] = None,  # by endpoint path or HTTP method
+        retries: int = 2,
+        backoff: float = 0.2,
+        max_backoff: float = 2.0,
+        hedge: bool = True,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats: Dict[str, EndpointStats] = {}
+
+    def _endpoint(self, key: str) -> Tuple[CircuitBreaker, EndpointStats]:
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(key, self.failure_threshold, self.reset_timeout)
+            self.stats[key] = EndpointStats()
+        return breaker, self.stats[key]
+
+    async def call(self, method: str, endpoint: str, attempt: Attempt, key: Optional[str] = None) -> Dict:
+        key = key or f"{method} {endpoint}"
+        breaker, stats = self._endpoint(key)
+        stats.calls += 1
+        if not breaker.allow():
+            stats.rejected += 1
+            return {"error": f"Circuit open for {key}"}
+
+        idempotent = method == "GET"
+        timeout = self.timeouts.get(endpoint, self.timeouts.get(method, self.timeout))
+        tries = self.retries + 1 if idempotent else 1
+        payload: Dict = {}
+        for n in range(tries):
+            if n:
+                stats.retries += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** (n - 1))
+                await clock.sleep(random.uniform(0, delay))
+            if idempotent and self.hedge:
+                ok, retryable, payload = await self._hedged(attempt, timeout, stats)
+            else:
+                ok, retryable, payload = await self._timed(attempt, timeout, stats)
+
+            if ok:
+                breaker.on_success()
+                return payload
+            if not retryable:
+                # The endpoint answered; the request itself was wrong
+                breaker.on_success()
+                return payload
+            stats.failures += 1
+            breaker.on_failure()
+            if breaker.state == CircuitBreaker.OPEN:
+                break
+        return payload
+
+    async def _timed(self, attempt: Attempt, timeout: float, stats: EndpointStats) -> Outcome:
+        started = clock.monotonic()
+        try:
+            outcome = await asyncio.wait_for(attempt(), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            return False, True, {"error": f"Timed out after {timeout:.1f}s"}
+        if outcome[0]:
+            stats.observe(clock.monotonic() - started)
+        return outcome
+
+    async def _hedged(self, attempt: Attempt, timeout: float, stats: EndpointStats) -> Outcome:
+        first = asyncio.ensure_future(self._timed(attempt, timeout, stats))
+        delay = stats.p95()
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        stats.hedges += 1
+        second = asyncio.ensure_future(self._timed(attempt, timeout, stats))
+        pending = {first, second}
+        outcome: Outcome = (False, True, {"error": "No attempt finished"})
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.result()
+                    if outcome[0]:
+                        if task is second:
+                            stats.hedge_wins += 1
+                        return outcome
+            return outcome
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Breaker state, counters and p95 latency per endpoint"""
+        return {
+            key: {
+                "breaker": self.breakers[key].state,
+                "calls": s.calls,
+                "failures": s.failures,
+                "retries": s.retries,
+                "timeouts": s.timeouts,
+                "hedges": s.hedges,
+                "hedge_wins": s.hedge_wins,
+                "rejected": s.rejected,
+                "p95_ms": round(s.percentile(0.95) * 1000, 1) if s.latencies else None
+            }
+            for key, s in self.stats.items()
+        }
+
+    def log_metrics(self) -> None:
+        metrics = self.metrics()
+        if not metrics:
+            return
+        open_breakers = [key for key, m in metrics.items() if m["breaker"] != CircuitBreaker.CLOSED]
+        log.info(
+            "📡 Requests: %s calls, %s retries, %s hedges, %s timeouts, open circuits: %s",
+            sum(m["calls"] for m in metrics.values()),
+            sum(m["retries"] for m in metrics.values()),
+            sum(m["hedges"] for m in metrics.values()),
+            sum(m["timeouts"] for m in metrics.values()),
+            ", ".join(open_breakers) or "none",
+            extra={"fields": {"event": "request_metrics", "endpoints": metrics}}
+        )
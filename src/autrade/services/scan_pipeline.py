@@ -0,0 +1,143 @@
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+
+from ..utils.log import get_logger
+from ..utils.tracing import tracer
+
+log = get_logger("scan_pipeline")
+
+
+def signal_strength(record: Dict) -> float:
+    """Ranking score of a candidate: RSI distance from neutral"""
+    return abs(record["rsi"] - 50)
+
+
+def strongest(candidates: List[Dict]) -> Optional[Dict]:
+    """The best ranked candidate; ties go to the earlier symbol"""
+    return max(candidates, key=signal_strength) if candidates else None
+
+
+class ScanOutcome:
+    """What one scan produced by the time it returned"""
+
+    def __init__(self, symbols: int):
+        self.symbols = symbols
+        self.analyzed = 0
+        self.candidates: List[Dict] = []
+        self.best: Optional[Dict] = None
+        self.found_at = 0.0  # perf_counter when ``best`` was ranked
+        self.early = False  # returned on a high-confidence candidate
+        self.timed_out = False
+
+    @property
+    def dropped(self) -> int:
+        """Symbols still in flight when the scan returned"""
+        return self.symbols - self.analyzed
+
+
+class ScanPipeline:
+    """Fetch, analyze and rank stages connected by queues.
+
+    ``concurrency`` fetchers pull symbols and hand their bars to a single
+    analyzer through a bounded queue, so at most that many fetched series
+    wait for the CPU at once. The ranker scores results as they arrive
+    instead of after the slowest symbol. A scan returns when every symbol
+    is ranked, when ``deadline`` seconds have passed (stragglers are
+    cancelled), or, with ``dispatch_confidence`` set, as soon as a
+    candidate's entry confidence reaches it. Candidates ``accept`` turns
+    down are neither ranked nor dispatched.
+    """
+
+    def __init__(self, trading, concurrency: int = 16, deadline: float = 0.0, dispatch_confidence: int = 0,
+                 accept: Optional[Callable[[Dict], bool]] = None):
+        self.trading = trading
+        self.accept = accept
+        self.concurrency = max(1, concurrency)
+        self.deadline = deadline
+        self.dispatch_confidence = dispatch_confidence
+
+    async def scan(self, session, symbols: List[str]) -> ScanOutcome:
+        outcome = ScanOutcome(len(symbols))
+        if not symbols:
+            return outcome
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for index, symbol in enumerate(symbols):
+            pending.put_nowait((index, symbol))
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        analyzed: asyncio.Queue = asyncio.Queue()
+
+        stages = [
+            asyncio.ensure_future(self._fetch(session, pending, fetched))
+            for _ in range(min(self.concurrency, len(symbols)))
+        ]
+        stages.append(asyncio.ensure_future(self._analyze(fetched, analyzed)))
+        ranker = asyncio.ensure_future(self._rank(analyzed, outcome))
+        try:
+            done, _ = await asyncio.wait({ranker}, timeout=self.deadline or None)
+            if not done:
+                outcome.timed_out = True
+        finally:
+            for task in stages + [ranker]:
+                task.cancel()
+            await asyncio.gather(*stages, ranker, return_exceptions=True)
+
+        if outcome.timed_out:
+            log.warning(
+                "⏳ Scan deadline of %.1fs reached, %s of %s symbols dropped",
+                self.deadline, outcome.dropped, outcome.symbols,
+                extra={"fields": {"event": "scan_deadline", "dropped": outcome.dropped, "symbols": outcome.symbols}}
+            )
+        return outcome
+
+    async def _fetch(self, session, pending: asyncio.Queue, fetched: asyncio.Queue) -> None:
+        while True:
+            try:
+                index, symbol = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                klines = await self.trading.fetch_klines(session, symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("❌ Error fetching klines for %s: %s", symbol, e)
+                klines = None
+            await fetched.put((index, symbol, klines))
+
+    async def _analyze(self, fetched: asyncio.Queue, analyzed: asyncio.Queue) -> None:
+        while True:
+            index, symbol, klines = await fetched.get()
+            result = None
+            if klines is not None:
+                try:
+                    with tracer.span("analyze", symbol=symbol):
+                        result = self.trading.evaluate(symbol, klines)
+                except Exception as e:
+                    log.error("❌ Error analyzing %s: %s", symbol, e)
+            analyzed.put_nowait((index, result))
+
+    async def _rank(self, analyzed: asyncio.Queue, outcome: ScanOutcome) -> None:
+        best_key = None
+        while outcome.analyzed < outcome.symbols:
+            index, result = await analyzed.get()
+            outcome.analyzed += 1
+            if not result or result["signal"] == "WAIT":
+                continue
+            if self.accept is not None and not self.accept(result):
+                continue
+            outcome.candidates.append(result)
+
+            if self.dispatch_confidence and result["entry_confidence_score"] >= self.dispatch_confidence:
+                outcome.best = result
+                outcome.found_at = time.perf_counter()
+                outcome.early = True
+                return
+
+            # Same order as strongest() over the full list: ties go to the earlier symbol
+            key = (signal_strength(result), -index)
+            if best_key is None or key > best_key:
+                best_key = key
+                outcome.best = result
+                outcome.found_at = time.perf_counter()
@@ -0,0 +1,129 @@
+import asyncio
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config.settings import Config, load_log_config
+from ..utils.log import get_logger, setup_logging
+from .market_data import INTERVAL_MS
+
+log = get_logger("scan_pool")
+
+# Newest bars of every scanned symbol sent back for the coordinator's
+# return correlation: the forming bar plus more closed bars than one scan
+# interval can add
+RECENT_BARS = 8
+
+# Per-process state of a scan worker, created by _init_worker
+_worker = {}
+
+
+def _init_worker(config: Config) -> None:
+    """Give the worker its own logging, event loop and services"""
+    from ..models.trade import TradeManager
+    from .binance_service import BinanceService
+    from .trading_service import TradingService
+
+    log_config = load_log_config()
+    setup_logging(log_config.level, json_path=None, repeat_window=log_config.repeat_window)
+
+    binance = BinanceService(config, TradeManager())
+    _worker["config"] = config
+    _worker["loop"] = asyncio.new_event_loop()
+    _worker["binance"] = binance
+    _worker["trading"] = TradingService(config, binance, None, binance.trade_manager)
+    _worker["session"] = None
+
+
+async def _analyze_shard(symbols: List[str]) -> Tuple[List[Dict], Dict[str, np.ndarray]]:
+    import aiohttp
+
+    session = _worker["session"]
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=_worker["binance"].ssl_context))
+        _worker["session"] = session
+
+    results = await asyncio.gather(*[
+        _worker["trading"].analyze(session, symbol)
+        for symbol in symbols
+    ])
+    candidates = [_compact(r) for r in results if r and r["signal"] != "WAIT"]
+
+    bars = {}
+    config = _worker["config"]
+    if config.correlation.max_correlation > 0:
+        klines = _worker["binance"].market_cache.klines
+        interval = config.timeframes.base_interval
+        for symbol in symbols:
+            cached = klines.get((symbol, interval))
+            if cached is not None and len(cached):
+                bars[symbol] = cached[-RECENT_BARS:].copy()
+    return candidates, bars
+
+
+def _scan_shard(symbols: List[str]) -> Tuple[List[Dict], Dict[str, np.ndarray]]:
+    """Worker entry point: fetch and analyze one shard, return candidate records and recent bars"""
+    return _worker["loop"].run_until_complete(_analyze_shard(symbols))
+
+
+def _compact(record: Dict) -> Dict:
+    """Plain Python scalars only, so records pickle small and fast"""
+    compact = {}
+    for key, value in record.items():
+        if hasattr(value, "item"):
+            value = value.item()
+        compact[key] = value
+    return compact
+
+
+class ScanPool:
+    """Partitions the symbol universe across worker processes.
+
+    Each shard is pinned to its own single-process executor (a symbol always
+    hashes to the same worker), so the worker's kline cache stays warm and
+    only delta bars are fetched. Workers only fetch and analyze; ranking,
+    risk checks and order placement stay in the coordinating process. The
+    newest bars of every symbol come back with the candidates and feed
+    ``correlation``, the coordinator's ReturnCorrelation.
+    """
+
+    def __init__(self, config: Config, workers: int, correlation=None):
+        self.workers = workers
+        self.correlation = correlation
+        self.step_ms = INTERVAL_MS[config.timeframes.base_interval]
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(config,))
+            for _ in range(workers)
+        ]
+
+    def shard(self, symbols: List[str]) -> List[List[str]]:
+        shards: List[List[str]] = [[] for _ in range(self.workers)]
+        for symbol in symbols:
+            shards[zlib.crc32(symbol.encode()) % self.workers].append(symbol)
+        return shards
+
+    async def scan(self, symbols: List[str]) -> List[Optional[Dict]]:
+        loop = asyncio.get_running_loop()
+        shards = self.shard(symbols)
+        futures = [
+            loop.run_in_executor(executor, _scan_shard, shard)
+            for executor, shard in zip(self._executors, shards)
+            if shard
+        ]
+        candidates: List[Optional[Dict]] = []
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, BaseException):
+                log.error("❌ Scan worker failed: %s", result)
+                continue
+            shard_candidates, bars = result
+            candidates.extend(shard_candidates)
+            if self.correlation is not None:
+                for symbol, recent in bars.items():
+                    self.correlation.observe(symbol, recent, self.step_ms)
+        return candidates
+
+    def close(self) -> None:
+        for executor in self._executors:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,81 @@
+import math
+from typing import Dict, List, Optional
+
+from ..utils.clock import clock
+from ..utils.log import get_logger
+
+log = get_logger("scan_scheduler")
+
+
+class ScanScheduler:
+    """Per-symbol scan cadence within a fixed klines request budget.
+
+    After every analysis a symbol's distance to a signal is taken from the
+    signal rules (RuleSet.distance: RSI versus its thresholds, closes versus
+    bands and EMAs in ATRs), the nearest of ``rules`` counting. A random walk
+    needs about d^2 bars to move d ATRs, so that is when the symbol is due
+    again, clamped to [``min_interval``, ``max_interval``]: symbols near a
+    trigger are refreshed every ``min_interval`` and quiet ones park at
+    ``max_interval``. ``due`` hands out at most ``budget`` symbols per
+    minute from a token bucket holding a minute's worth, nearest first;
+    symbols never analyzed count as nearest.
+    """
+
+    def __init__(self, rules: Optional[List] = None, budget: float = 60, min_interval: float = 10,
+                 max_interval: float = 300, bar_seconds: float = 300):
+        self.rules = [r for r in rules or [] if r is not None]
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.bar_seconds = bar_seconds
+        self.distance: Dict[str, float] = {}
+        self.next_due: Dict[str, float] = {}
+        self.tokens = float(budget)
+        self._refilled = None
+
+    def __len__(self) -> int:
+        return len(self.next_due)
+
+    def interval(self, distance: float) -> float:
+        if math.isinf(distance):
+            return self.max_interval
+        seconds = self.bar_seconds * distance ** 2
+        return min(self.max_interval, max(self.min_interval, seconds))
+
+    def observe(self, symbol: str, values: Dict) -> None:
+        """Schedule ``symbol`` from the rule fields of its last bar"""
+        distance = min((rules.distance(values) for rules in self.rules), default=math.inf)
+        self.distance[symbol] = distance
+        self.next_due[symbol] = clock.time() + self.interval(distance)
+
+    def due(self, symbols: List[str]) -> List[str]:
+        """The symbols to refresh now, in their original order"""
+        now = clock.time()
+        if self._refilled is not None:
+            self.tokens = min(self.budget, self.tokens + (now - self._refilled) * self.budget / 60)
+        self._refilled = now
+
+        listed = set(symbols)
+        for symbol in [s for s in self.next_due if s not in listed]:
+            del self.next_due[symbol]
+            self.distance.pop(symbol, None)
+
+        ready = [s for s in symbols if self.next_due.get(s, 0.0) <= now]
+        ready.sort(key=lambda s: (self.distance.get(s, 0.0), self.next_due.get(s, 0.0)))
+        chosen = set(ready[:int(self.tokens)])
+        self.tokens -= len(chosen)
+        for symbol in chosen:
+            # Until it is analyzed again; a failed fetch retries after this
+            self.next_due[symbol] = now + self.interval(self.distance.get(symbol, 0.0))
+        if len(chosen) < len(ready):
+            log.debug("🗓️ Request budget reached, %s due symbols deferred", len(ready) - len(chosen))
+        return [s for s in symbols if s in chosen]
+
+    def metrics(self) -> Dict[str, float]:
+        intervals = [self.interval(d) for d in self.distance.values()]
+        return {
+            "symbols": len(self.next_due),
+            "near": sum(1 for i in intervals if i <= self.min_interval),
+            "parked": sum(1 for i in intervals if i >= self.max_interval),
+            "tokens": round(self.tokens, 1),
+        }
@@ -0,0 +1,400 @@
+import ast
+import functools
+import json
+import math
+import operator
+import time
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..utils.log import get_logger
+from . import indicators
+
+log = get_logger("signal_rules")
+
+# Fields a condition may use; values are scalars for one symbol or arrays
+# over symbols and/or bars
+FIELDS = {
+    "open": "open of the bar",
+    "high": "high of the bar",
+    "low": "low of the bar",
+    "close": "close of the bar",
+    "volume": "volume of the bar",
+    "volume_avg10": "mean volume of the last 10 bars",
+    "price_change": "close-to-close change in percent",
+    "rsi": "RSI(14)",
+    "ema20": "EMA(20) of the close",
+    "ema50": "EMA(50) of the close",
+    "upper": "upper Bollinger band (20, 2)",
+    "lower": "lower Bollinger band (20, 2)",
+    "atr": "ATR(14), at least MIN_ATR_RATIO of the close",
+    "is_green": "close above open",
+    "is_red": "close below open",
+    "htf_trend": "higher-timeframe trend, +1, -1 or 0 (live scans only)",
+}
+
+
+def _scaled(name: str, factor: float) -> str:
+    return name if factor == 1 else f"{name} * {factor:g}"
+
+
+def _band_rules(rules: Sequence[float]) -> Dict[str, List[str]]:
+    """Conditions of one indicators.BAND_RULES row"""
+    rsi_long, rsi_short, trend_long, trend_short, band_long, band_short, touch = rules
+    below, above = ("<=", ">=") if touch else ("<", ">")
+    return {
+        "long": [
+            f"rsi < {rsi_long:g}", f"ema20 > {_scaled('ema50', trend_long)}",
+            f"close {below} {_scaled('lower', band_long)}", "is_green"
+        ],
+        "short": [
+            f"rsi > {rsi_short:g}", f"ema20 < {_scaled('ema50', trend_short)}",
+            f"close {above} {_scaled('upper', band_short)}", "is_red"
+        ],
+    }
+
+
+# The rule sets of indicators.band_signals, from the same thresholds
+BUILTIN_RULES = {mode: _band_rules(rules) for mode, rules in indicators.BAND_RULES.items()}
+
+_COMPARISONS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+_ARITHMETIC = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+}
+_FUNCTIONS = {"abs": np.abs, "min": np.minimum, "max": np.maximum}
+# Fields measured in price units, whose distance to a trigger is counted in ATRs
+PRICE_FIELDS = frozenset(("open", "high", "low", "close", "ema20", "ema50", "upper", "lower", "atr"))
+# RSI points that count as much as one ATR of price distance
+RSI_POINTS = 10.0
+
+Values = Dict[str, Union[float, bool, np.ndarray]]
+Expression = Callable[[Values], np.ndarray]
+
+
+def _compile_node(node: ast.AST, source: str) -> Tuple[Expression, FrozenSet[str]]:
+    """Closure evaluating ``node`` over a field mapping, and the fields it reads.
+
+    Only comparisons, and/or/not, + - * /, unary minus, abs/min/max, numbers
+    and the names in FIELDS are accepted; nothing is ever passed to eval.
+    """
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(value, source) for value in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        fns = [fn for fn, _ in parts]
+        return (
+            lambda values: functools.reduce(combine, (fn(values) for fn in fns)),
+            frozenset().union(*(fields for _, fields in parts)),
+        )
+    if isinstance(node, ast.Compare):
+        left = _compile_node(node.left, source)
+        operands = [left] + [_compile_node(c, source) for c in node.comparators]
+        ops = []
+        for op in node.ops:
+            if type(op) not in _COMPARISONS:
+                raise ValueError(f"Unsupported comparison in rule {source!r}")
+            ops.append(_COMPARISONS[type(op)])
+        fns = [fn for fn, _ in operands]
+
+        def compare(values):
+            # a < b < c is (a < b) and (b < c), each operand evaluated once
+            evaluated = [fn(values) for fn in fns]
+            result = ops[0](evaluated[0], evaluated[1])
+            for i in range(1, len(ops)):
+                result = np.logical_and(result, ops[i](evaluated[i], evaluated[i + 1]))
+            return result
+
+        return compare, frozenset().union(*(fields for _, fields in operands))
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in _ARITHMETIC:
+            raise ValueError(f"Unsupported operator in rule {source!r}")
+        (left, left_fields), (right, right_fields) = _compile_node(node.left, source), _compile_node(node.right, source)
+        op = _ARITHMETIC[type(node.op)]
+        return lambda values: op(left(values), right(values)), left_fields | right_fields
+    if isinstance(node, ast.UnaryOp):
+        operand, fields = _compile_node(node.operand, source)
+        if isinstance(node.op, ast.Not):
+            return lambda values: np.logical_not(operand(values)), fields
+        if isinstance(node.op, ast.USub):
+            return lambda values: np.negative(operand(values)), fields
+        raise ValueError(f"Unsupported operator in rule {source!r}")
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+            raise ValueError(f"Unsupported call in rule {source!r}; use abs(), min() or max()")
+        fn = _FUNCTIONS[node.func.id]
+        args = [_compile_node(arg, source) for arg in node.args]
+        if len(args) != (1 if node.func.id == "abs" else 2):
+            raise ValueError(f"Wrong number of arguments to {node.func.id}() in rule {source!r}")
+        arg_fns = [a for a, _ in args]
+        return lambda values: fn(*(a(values) for a in arg_fns)), frozenset().union(*(f for _, f in args))
+    if isinstance(node, ast.Name):
+        if node.id not in FIELDS:
+            raise ValueError(f"Unknown field {node.id!r} in rule {source!r}")
+        name = node.id
+        return operator.itemgetter(name), frozenset((name,))
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        constant = node.value
+        return lambda values: constant, frozenset()
+    raise ValueError(f"Unsupported expression in rule {source!r}")
+
+
+def _fields(node: ast.AST) -> FrozenSet[str]:
+    return frozenset(n.id for n in ast.walk(node) if isinstance(n, ast.Name) and n.id in FIELDS)
+
+
+def _compile_margin(node: ast.AST, source: str) -> Expression:
+    """Closure giving how far ``node`` is from holding, 0 where it holds.
+
+    A comparison's shortfall is measured in ATRs when it involves prices, in
+    RSI_POINTS of RSI, and relative to the right-hand side otherwise; all
+    its pairs add up. ``and`` adds, ``or`` takes the nearer branch, and
+    anything else (candle colour, ``not``) can flip on any tick and counts 0.
+    """
+    if isinstance(node, ast.BoolOp):
+        margins = [_compile_margin(value, source) for value in node.values]
+        combine = np.add if isinstance(node.op, ast.And) else np.minimum
+        return lambda values: functools.reduce(combine, (m(values) for m in margins))
+    if not isinstance(node, ast.Compare):
+        return lambda values: 0.0
+    operands = [node.left] + list(node.comparators)
+    pairs = []
+    for op, left, right in zip(node.ops, operands, operands[1:]):
+        if isinstance(op, (ast.Lt, ast.LtE)):
+            sign = 1.0
+        elif isinstance(op, (ast.Gt, ast.GtE)):
+            sign = -1.0
+        else:
+            continue
+        fields = _fields(left) | _fields(right)
+        scale = "atr" if fields & PRICE_FIELDS else "rsi" if "rsi" in fields else None
+        pairs.append((sign, _compile_node(left, source)[0], _compile_node(right, source)[0], scale))
+
+    def margin(values):
+        total = 0.0
+        for sign, left, right, scale in pairs:
+            rhs = right(values)
+            shortfall = np.maximum(0.0, sign * (left(values) - rhs))
+            if scale == "atr":
+                shortfall = shortfall / values["atr"]
+            elif scale == "rsi":
+                shortfall = shortfall / RSI_POINTS
+            else:
+                shortfall = shortfall / np.maximum(np.abs(rhs), 1e-12)
+            total = total + shortfall
+        return np.nan_to_num(total, nan=0.0)
+
+    return margin
+
+
+def compile_condition(source: str) -> Tuple[Expression, FrozenSet[str]]:
+    """Parse one condition such as ``"close <= lower * 1.02"``"""
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid rule {source!r}: {e.msg}") from None
+    return _compile_node(tree.body, source)
+
+
+def compile_margin(source: str) -> Expression:
+    """Distance closure of one condition, see ``_compile_margin``"""
+    return _compile_margin(ast.parse(source.strip(), mode="eval").body, source)
+
+
+class RuleSet:
+    """Entry conditions of one signal mode, compiled once.
+
+    ``long`` and ``short`` are lists of conditions that must all hold; a
+    side without conditions never signals. ``evaluate`` takes scalars for a
+    single symbol or equally shaped arrays (symbols, and bars for
+    backtests) and returns +1 (LONG), -1 (SHORT) or 0 (WAIT) per element,
+    LONG winning when both hold, exactly like indicators.band_signals.
+    """
+
+    def __init__(self, name: str, long: Sequence[str] = (), short: Sequence[str] = ()):
+        self.name = name
+        self.long = list(long)
+        self.short = list(short)
+        self._long = [compile_condition(c) for c in self.long]
+        self._short = [compile_condition(c) for c in self.short]
+        self.fields = frozenset().union(*(f for _, f in self._long + self._short))
+        self._long_margins = [compile_margin(c) for c in self.long]
+        self._short_margins = [compile_margin(c) for c in self.short]
+
+    @staticmethod
+    def _all(conditions, values: Values, shape) -> np.ndarray:
+        if not conditions:
+            return np.zeros(shape, dtype=bool)
+        result = np.broadcast_to(conditions[0][0](values), shape)
+        for fn, _ in conditions[1:]:
+            result = np.logical_and(result, fn(values))
+        return result
+
+    def evaluate(self, values: Values) -> np.ndarray:
+        missing = self.fields - values.keys()
+        if missing:
+            raise ValueError(f"Signal rules {self.name!r} need fields {', '.join(sorted(missing))}")
+        shape = np.shape(values[next(iter(self.fields))]) if self.fields else ()
+        long = self._all(self._long, values, shape)
+        short = self._all(self._short, values, shape)
+        return np.where(long, 1, np.where(short, -1, 0)).astype(np.int8)
+
+    def distance(self, values: Values) -> Union[float, np.ndarray]:
+        """How far the nearer side is from signalling, in ATR-like units; inf without conditions.
+
+        Needs ``atr`` next to the fields of the conditions. Scalars give a
+        float, arrays an array of the same shape.
+        """
+        sides = [m for m in (self._long_margins, self._short_margins) if m]
+        if not sides:
+            return math.inf
+        distance = functools.reduce(np.minimum, (sum(margin(values) for margin in side) for side in sides))
+        return float(distance) if np.ndim(distance) == 0 else distance
+
+    def signal(self, values: Values) -> str:
+        """LONG, SHORT or WAIT for the scalars of one symbol"""
+        return indicators.SIGNALS[self.evaluate(values).item()]
+
+    def __repr__(self) -> str:
+        return f"RuleSet({self.name!r}, long={self.long!r}, short={self.short!r})"
+
+
+def _conditions(spec, name: str, side: str) -> List[str]:
+    value = spec.get(side) or []
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not all(isinstance(c, str) for c in value):
+        raise ValueError(f"Signal rules {name!r}: {side} must be a condition or a list of conditions")
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def load_rules(path: str = "") -> Dict[str, RuleSet]:
+    """Built-in rule sets, plus (and overridden by) those in ``path``.
+
+    The file maps rule set names to ``long`` and ``short`` condition lists,
+    as YAML (.yaml/.yml, needs pyyaml) or JSON. Files are read and compiled
+    once per process.
+    """
+    specs = dict(BUILTIN_RULES)
+    if path:
+        with open(path) as f:
+            if path.endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:  # optional: pip install pyyaml for YAML rule files
+                    raise ValueError(f"pyyaml is needed to read {path}; pip install pyyaml or use JSON") from None
+                loaded = yaml.safe_load(f)
+            else:
+                loaded = json.load(f)
+        if not isinstance(loaded, dict):
+            raise ValueError(f"{path} must map rule set names to long/short conditions")
+        specs.update(loaded)
+    rules = {}
+    for name, spec in specs.items():
+        if not isinstance(spec, dict):
+            raise ValueError(f"Signal rules {name!r} must have long and/or short conditions")
+        rules[name] = RuleSet(name, _conditions(spec, name, "long"), _conditions(spec, name, "short"))
+    return rules
+
+
+def bar_features(open_, high, low, close, volume=None) -> Dict[str, np.ndarray]:
+    """Every rule field except ``htf_trend`` for every bar of a batch (symbols, bars).
+
+    Unlike a live scan, ``atr`` is not raised to MIN_ATR_RATIO here.
+    """
+    open_ = np.atleast_2d(np.asarray(open_, dtype=np.float64))
+    high = np.atleast_2d(np.asarray(high, dtype=np.float64))
+    low = np.atleast_2d(np.asarray(low, dtype=np.float64))
+    close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+    _, upper, lower = indicators.bollinger(close)
+    previous = np.concatenate((close[:, :1], close[:, :-1]), axis=1)
+    values = {
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "price_change": (close - previous) / previous * 100,
+        "rsi": indicators.rsi(close),
+        "ema20": indicators.ema(close, 20),
+        "ema50": indicators.ema(close, 50),
+        "upper": upper,
+        "lower": lower,
+        "atr": indicators.atr(high, low, close),
+        "is_green": close > open_,
+        "is_red": close < open_,
+    }
+    if volume is not None:
+        volume = np.atleast_2d(np.asarray(volume, dtype=np.float64))
+        window = np.cumsum(volume, axis=1)
+        window[:, 10:] = window[:, 10:] - window[:, :-10]
+        values["volume"] = volume
+        values["volume_avg10"] = window / np.minimum(np.arange(1, volume.shape[1] + 1), 10)
+    return values
+
+
+def parity(symbols: int = 20, bars: int = 1500, seed: int = 0) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Compare every built-in rule set with the hand-written kernels on all bars.
+
+    Per backend and rule set: bars evaluated, LONG/SHORT bars, bars where the
+    two disagree, and milliseconds for the rule set and the kernel.
+    """
+    open_, high, low, close = indicators.synthetic_bars(symbols, bars, seed)
+    active = indicators.backend()
+    report = {}
+    try:
+        for name in indicators.available_backends():
+            indicators.use_backend(name)
+            values = bar_features(open_, high, low, close)
+            args = (
+                values["rsi"], values["ema20"], values["ema50"], close,
+                values["lower"], values["upper"], values["is_green"], values["is_red"]
+            )
+            report[name] = {}
+            for mode, rules in load_rules().items():
+                if mode not in BUILTIN_RULES:
+                    continue
+                indicators.band_signals(mode, *(a[:1, :60] for a in args))  # warm up / compile
+                started = time.perf_counter()
+                expected = indicators.band_signals(mode, *args)
+                kernel_ms = (time.perf_counter() - started) * 1000
+                started = time.perf_counter()
+                actual = rules.evaluate(values)
+                rules_ms = (time.perf_counter() - started) * 1000
+                report[name][mode] = {
+                    "bars": int(actual.size),
+                    "long": int((expected == 1).sum()),
+                    "short": int((expected == -1).sum()),
+                    "mismatches": int((actual != expected).sum()),
+                    "rules_ms": rules_ms,
+                    "kernel_ms": kernel_ms,
+                }
+    finally:
+        indicators.use_backend(active)
+    return report
+
+
+def describe(rules: RuleSet) -> str:
+    lines = [rules.name]
+    for side, conditions in (("long", rules.long), ("short", rules.short)):
+        lines.append(f"  {side:<5}  " + (" and ".join(conditions) if conditions else "never"))
+    return "\n".join(lines)
+
+
+def resolve(name: str, path: str = "", explicit: bool = True) -> Optional[RuleSet]:
+    """The rule set called ``name``; unknown names raise when ``explicit``, else give None"""
+    rules = load_rules(path)
+    if name in rules:
+        return rules[name]
+    if explicit:
+        raise ValueError(f"Unknown signal rules {name!r}; available: {', '.join(rules)}")
+    return None
@@ -0,0 +1,308 @@
+import asyncio
+import math
+import time
+from itertools import count
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..utils.clock import clock
+from ..utils.log import get_logger
+from .klines import KLINE_DTYPE, empty_klines
+from .market_data import INTERVAL_MS
+from .replay import TELEGRAM_METHODS
+
+log = get_logger("sim_market")
+
+MINUTE_MS = 60_000
+_CHUNK = 1440  # minutes generated per step; fixed so paths do not depend on access order
+
+
+class _Path:
+    """One symbol's 1m bars, generated lazily from its own seeded stream"""
+
+    __slots__ = ("rng", "open", "high", "low", "close", "volume", "size", "_last", "_drift")
+
+    def __init__(self, seed: int, index: int, price: float):
+        self.rng = np.random.default_rng([seed, index])
+        self.open = np.empty(0)
+        self.high = np.empty(0)
+        self.low = np.empty(0)
+        self.close = np.empty(0)
+        self.volume = np.empty(0)
+        self.size = 0
+        self._last = price
+        self._drift = 0.0
+
+    def extend(self, minutes: int) -> None:
+        while self.size < minutes:
+            self._generate()
+
+    def _generate(self) -> None:
+        rng = self.rng
+        # Fat-tailed returns, a drift regime that changes every few hours and
+        # occasional bursts, so the strategy sees trends, chop and spikes
+        sigma = 0.0012 * np.exp(rng.normal(0.0, 0.3))
+        shocks = rng.standard_t(4, _CHUNK) * sigma / math.sqrt(2.0)
+        regime = rng.random(_CHUNK) < 1 / 240
+        drift = np.empty(_CHUNK)
+        level = self._drift
+        for i in range(_CHUNK):
+            if regime[i]:
+                level = rng.normal(0.0, sigma * 0.15)
+            drift[i] = level
+        self._drift = level
+        burst = rng.random(_CHUNK) < 0.004
+        shocks[burst] *= 6.0
+
+        returns = drift + shocks
+        close = self._last * np.exp(np.cumsum(returns))
+        open_ = np.concatenate(([self._last], close[:-1]))
+        wick = np.abs(rng.normal(0.0, sigma * 0.5, (2, _CHUNK)))
+        high = np.maximum(open_, close) * (1 + wick[0])
+        low = np.minimum(open_, close) * (1 - wick[1])
+        volume = rng.lognormal(0.0, 0.5, _CHUNK) * (1 + 40 * np.abs(returns) / sigma * burst + np.abs(returns) / sigma)
+        volume *= 5_000 / self._last
+
+        self.open = np.concatenate((self.open, open_))
+        self.high = np.concatenate((self.high, high))
+        self.low = np.concatenate((self.low, low))
+        self.close = np.concatenate((self.close, close))
+        self.volume = np.concatenate((self.volume, volume))
+        self.size += _CHUNK
+        self._last = float(close[-1])
+
+
+class SimulatedMarket:
+    """Deterministic stand-in for Binance futures and Telegram.
+
+    Every symbol follows its own seeded random walk of 1m bars that starts
+    ``history_days`` before ``start``; "now" is read from the process clock,
+    so under ``run_virtual`` the market moves exactly as fast as virtual
+    time. Answers the public endpoints the bot reads (exchangeInfo, 24h
+    tickers, klines, prices, book tops, premium index), while DEMO mode
+    keeps orders and positions in the paper exchange. Telegram calls succeed
+    without sending anything.
+
+    ``attach(bot)`` swaps the service methods like SessionReplayer does,
+    and ``run(bot, days)`` drives ``bot.run()`` for that much clock time.
+    """
+
+    def __init__(self, symbols: int = 20, seed: int = 7, start: Optional[float] = None,
+                 history_days: float = 6.0, spread_bps: float = 1.0):
+        self.seed = seed
+        self.start = clock.time() if start is None else start
+        self.origin_ms = (int(self.start * 1000) // MINUTE_MS - int(history_days * 1440)) * MINUTE_MS
+        self.spread = spread_bps / 10_000
+        rng = np.random.default_rng(seed)
+        prices = 10 ** rng.uniform(-2, 4.5, symbols)
+        self.symbols = [f"SIM{i:03d}USDT" for i in range(symbols)]
+        self.paths: Dict[str, _Path] = {
+            symbol: _Path(seed, i, float(price)) for i, (symbol, price) in enumerate(zip(self.symbols, prices))
+        }
+        self.requests = 0
+        self.unsupported = 0
+        self._messages = count(1)
+
+    def _minute(self) -> int:
+        """Index of the current, still open 1m bar"""
+        return max(1, (int(clock.time() * 1000) - self.origin_ms) // MINUTE_MS)
+
+    def _path(self, symbol: str, minute: int) -> _Path:
+        path = self.paths[symbol]
+        path.extend(minute)
+        return path
+
+    def price(self, symbol: str) -> float:
+        minute = self._minute()
+        return float(self._path(symbol, minute).close[minute - 1])
+
+    def klines(self, symbol: str, interval: str, limit: int) -> List[List]:
+        """Closed and current bars of ``interval``, built from completed 1m bars"""
+        minute = self._minute()
+        bars = self.bars(symbol, interval, minute, limit)
+        step_ms = INTERVAL_MS[interval]
+        return [
+            [int(t), f"{o:.8g}", f"{h:.8g}", f"{l:.8g}", f"{c:.8g}", f"{v:.6f}",
+             int(t) + step_ms - 1, f"{q:.4f}", int(v) + 1, f"{v / 2:.6f}", f"{q / 2:.4f}", "0"]
+            for t, o, h, l, c, v, q in zip(
+                bars["timestamp"], bars["open"], bars["high"], bars["low"], bars["close"],
+                bars["volume"], bars["quote_volume"]
+            )
+        ]
+
+    def bars(self, symbol: str, interval: str, minute: int, limit: Optional[int] = None,
+             closed: bool = False) -> np.ndarray:
+        """The last ``limit`` bars of ``interval`` (all when None) from the first ``minute`` 1m bars.
+
+        The newest bar may still be open unless ``closed`` is set.
+        """
+        step = INTERVAL_MS[interval] // MINUTE_MS
+        path = self._path(symbol, minute)
+
+        # Buckets are aligned to the epoch like Binance's, clipped to the path start
+        first_bucket = (self.origin_ms // MINUTE_MS + step - 1) // step * step - self.origin_ms // MINUTE_MS
+        last_bucket = first_bucket + (minute - 1 - first_bucket) // step * step
+        if closed and last_bucket + step > minute:
+            last_bucket -= step
+        first = first_bucket if limit is None else max(first_bucket, last_bucket - (limit - 1) * step)
+        starts = np.arange(first, last_bucket + 1, step)
+        if len(starts) == 0:
+            return empty_klines()
+        ends = np.minimum(starts + step, minute)
+
+        bars = np.zeros(len(starts), dtype=KLINE_DTYPE)
+        bars["timestamp"] = self.origin_ms + starts * MINUTE_MS
+        bars["open"] = path.open[starts]
+        bars["high"] = np.maximum.reduceat(path.high[:minute], starts)
+        bars["low"] = np.minimum.reduceat(path.low[:minute], starts)
+        bars["close"] = path.close[ends - 1]
+        bars["volume"] = np.add.reduceat(path.volume[:minute], starts)
+        bars["close_time"] = bars["timestamp"] + step * MINUTE_MS - 1
+        bars["quote_volume"] = bars["volume"] * bars["close"]
+        bars["num_trades"] = bars["volume"].astype(np.int64) + 1
+        bars["taker_base_vol"] = bars["volume"] / 2
+        bars["taker_quote_vol"] = bars["quote_volume"] / 2
+        return bars
+
+    def _exchange_info(self) -> Dict:
+        symbols = []
+        for symbol in self.symbols:
+            magnitude = math.floor(math.log10(self.price(symbol)))
+            symbols.append({
+                "symbol": symbol,
+                "contractType": "PERPETUAL",
+                "status": "TRADING",
+                "quoteAsset": "USDT",
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": f"{10.0 ** (magnitude - 4):.10f}"},
+                    {"filterType": "LOT_SIZE", "stepSize": f"{10.0 ** -min(3, max(0, magnitude + 1)):.3f}"}
+                ]
+            })
+        return {"symbols": symbols}
+
+    def _ticker_24hr(self) -> List[Dict]:
+        minute = self._minute()
+        tickers = []
+        for symbol in self.symbols:
+            path = self._path(symbol, minute)
+            day = slice(max(0, minute - 1440), minute)
+            last = path.close[minute - 1]
+            first = path.open[day.start]
+            tickers.append({
+                "symbol": symbol,
+                "lastPrice": f"{last:.8g}",
+                "priceChangePercent": f"{(last / first - 1) * 100:.3f}",
+                "quoteVolume": f"{float(np.dot(path.volume[day], path.close[day])):.2f}"
+            })
+        return tickers
+
+    def _book_ticker(self, symbol: str) -> Dict:
+        minute = self._minute()
+        path = self._path(symbol, minute)
+        price = path.close[minute - 1]
+        qty = path.volume[minute - 1] / 10
+        return {
+            "symbol": symbol,
+            "bidPrice": f"{price * (1 - self.spread / 2):.8g}",
+            "askPrice": f"{price * (1 + self.spread / 2):.8g}",
+            "bidQty": f"{qty:.6f}",
+            "askQty": f"{qty:.6f}"
+        }
+
+    def _premium_index(self, symbol: str) -> Dict:
+        now_ms = int(clock.time() * 1000)
+        eight_hours = 8 * 3600 * 1000
+        return {
+            "symbol": symbol,
+            "markPrice": f"{self.price(symbol):.8g}",
+            "lastFundingRate": "0.0001",
+            "nextFundingTime": (now_ms // eight_hours + 1) * eight_hours
+        }
+
+    def respond(self, method: str, endpoint: str, params: Optional[Dict], wallet: float = 0.0):
+        params = params or {}
+        symbol = params.get("symbol")
+        if symbol is not None and symbol not in self.paths:
+            return {"error": f"Invalid symbol {symbol}"}
+        if method == "GET":
+            if endpoint == "/fapi/v1/klines":
+                return self.klines(symbol, params.get("interval", "5m"), int(params.get("limit", 500)))
+            if endpoint == "/fapi/v1/ticker/price":
+                return {"symbol": symbol, "price": f"{self.price(symbol):.8g}"}
+            if endpoint == "/fapi/v1/ticker/bookTicker":
+                return self._book_ticker(symbol)
+            if endpoint == "/fapi/v1/premiumIndex":
+                return self._premium_index(symbol)
+            if endpoint == "/fapi/v1/ticker/24hr":
+                return self._ticker_24hr()
+            if endpoint == "/fapi/v1/exchangeInfo":
+                return self._exchange_info()
+            if endpoint == "/fapi/v2/account":
+                return {"assets": [{"asset": "USDT", "walletBalance": f"{wallet:.8f}"}]}
+        elif method == "POST" and endpoint == "/fapi/v1/leverage":
+            return {"symbol": symbol, "leverage": params.get("leverage")}
+        self.unsupported += 1
+        return {"error": f"{method} {endpoint} is not simulated"}
+
+    def attach(self, bot) -> None:
+        """Serve ``bot``, or every strategy of a StrategyHost"""
+        for member in getattr(bot, "bots", [bot]):
+            member.binance_service.request = self._request(member.binance_service)
+            for name in TELEGRAM_METHODS:
+                setattr(member.telegram_service, name, self._telegram())
+        log.info("🧪 Simulated market: %s symbols, seed %s", len(self.symbols), self.seed)
+
+    def _request(self, binance):
+        async def simulated_request(session, method, endpoint, params=None):
+            self.requests += 1
+            # Let other coroutines interleave as they would around real I/O
+            await asyncio.sleep(0)
+            wallet = binance.paper.wallet if binance.paper is not None else 0.0
+            return self.respond(method.upper(), endpoint, params, wallet)
+        return simulated_request
+
+    def _telegram(self):
+        async def simulated(session, *args, **kwargs):
+            return {"ok": True, "result": {"message_id": next(self._messages)}}
+        return simulated
+
+    async def run(self, bot, days: float) -> Dict:
+        started = time.perf_counter()
+        virtual_started = clock.time()
+        task = asyncio.ensure_future(bot.run())
+        try:
+            await asyncio.wait({task}, timeout=days * 86400)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
+        wall = time.perf_counter() - started
+        simulated = clock.time() - virtual_started
+        summary = {
+            "simulated_days": round(simulated / 86400, 3),
+            "wall_seconds": round(wall, 2),
+            "speedup": round(simulated / wall, 1) if wall else 0.0,
+            "requests": self.requests,
+            "unsupported_requests": self.unsupported,
+            "scans": bot.scan_count,
+        }
+        members = getattr(bot, "bots", None)
+        if members is None:
+            summary.update(self._results(bot, simulated))
+        else:
+            summary["strategies"] = {member.name: self._results(member, simulated) for member in members}
+        return summary
+
+    @staticmethod
+    def _results(bot, seconds: float) -> Dict:
+        stats = bot.trade_manager.stats.last(seconds + 1)
+        return {
+            "trades": stats.trades,
+            "winrate": round(stats.wins / stats.trades * 100, 1) if stats.trades else 0.0,
+            "net_pnl": round(stats.net_pnl, 4),
+            "max_drawdown": round(stats.max_drawdown, 4),
+            "open_positions": len(bot.trade_manager.positions)
+        }
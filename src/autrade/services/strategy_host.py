@@ -0,0 +1,172 @@
+import asyncio
+import ssl
+import time
+from typing import Dict, List
+
+from ..utils.clock import clock
+from ..utils.lazy import lazy_import
+from ..utils.log import get_logger
+from ..utils.tracing import tracer
+from .scan_pipeline import strongest
+
+aiohttp = lazy_import("aiohttp")
+
+log = get_logger("strategy_host")
+
+
+class StrategyHost:
+    """Several strategy configurations on one market-data plane.
+
+    Every strategy is a TradingBot with its own trading and risk config,
+    TradeManager, paper account and journal. The host runs a single scan
+    for all of them: klines are fetched and indicators computed once per
+    symbol by the first bot, then each strategy that may open a trade turns
+    the shared features into its own signals, ranks them and dispatches.
+    Requests also go through one request cache and one set of circuit
+    breakers, so an extra strategy costs a signal pass per symbol and the
+    price polls of its own positions.
+
+    DEMO only: strategies trading one real account would close each
+    other's positions.
+    """
+
+    def __init__(self, bots: List, market_cache):
+        if not bots:
+            raise ValueError("StrategyHost needs at least one strategy")
+        if len(bots) > 1 and any(bot.config.binance.bot_mode == "REAL" for bot in bots):
+            raise ValueError("Several strategies can only run with BOT_MODE=DEMO")
+        self.bots = bots
+        self.market_cache = market_cache
+        self.scan_count = 0
+
+        primary = self.primary
+        for bot in bots[1:]:
+            binance = bot.binance_service
+            binance.resilience = primary.binance_service.resilience
+            binance.coalescer = primary.binance_service.coalescer
+            binance.order_books = primary.order_books
+            bot.order_books = None
+            bot.trading_service.timeframes = primary.trading_service.timeframes
+            bot.trading_service.correlation = primary.trading_service.correlation
+            # The shared scan refreshes a symbol as often as its nearest strategy needs
+            if primary.trading_service.scan_scheduler is not None and bot.trading_service.rules is not None:
+                primary.trading_service.scan_scheduler.rules.append(bot.trading_service.rules)
+        for bot in bots:
+            # The host scans in-process; executors have not started any worker yet
+            if bot.scan_pool is not None:
+                bot.scan_pool.close()
+                bot.scan_pool = None
+        log.info("🧩 Hosting %s strategies: %s", len(bots),
+                 ", ".join(f"{bot.name} ({bot.config.trading.mode})" for bot in bots))
+
+    @property
+    def primary(self):
+        return self.bots[0]
+
+    @property
+    def config(self):
+        return self.primary.config
+
+    async def _features(self, session, symbols: List[str]) -> List[Dict]:
+        """Fetch every symbol's klines and compute its indicator state once"""
+        trading = self.primary.trading_service
+        settings = self.config.scan
+        limit = asyncio.Semaphore(max(1, settings.concurrency))
+
+        async def fetch(symbol):
+            async with limit:
+                return await trading.fetch_klines(session, symbol)
+
+        tasks = [asyncio.ensure_future(fetch(symbol)) for symbol in symbols]
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks, timeout=settings.deadline or None)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            log.warning("⏳ Scan deadline of %.1fs reached, %s of %s symbols dropped",
+                        settings.deadline, len(pending), len(symbols))
+
+        features = []
+        for symbol, task in zip(symbols, tasks):
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                log.error("❌ Error fetching klines for %s: %s", symbol, task.exception())
+                continue
+            try:
+                with tracer.span("analyze", symbol=symbol):
+                    state = trading.features(symbol, task.result())
+            except Exception as e:
+                log.error("❌ Error analyzing %s: %s", symbol, e)
+                continue
+            if state is not None:
+                features.append(state)
+        return features
+
+    async def scan_loop(self, session):
+        while True:
+            waits = {bot.name: bot.scan_wait() for bot in self.bots}
+            active = [bot for bot in self.bots if not waits[bot.name]]
+            if not active:
+                await clock.sleep(min(waits.values()))
+                continue
+
+            self.scan_count += 1
+            primary = self.primary
+            with tracer.span("scan", scan=self.scan_count, strategies=len(active)):
+                symbols = await primary.binance_service.get_symbols(session)
+                if primary.order_books is not None:
+                    primary.order_books.track(symbols)
+                if primary.trading_service.scan_scheduler is not None:
+                    symbols = primary.trading_service.scan_scheduler.due(symbols)
+                log.info("🔍 Scanning market for %s strategies...", len(active))
+                features = await self._features(session, symbols)
+
+                dispatches = []
+                for bot in active:
+                    with tracer.span("scan.signals", strategy=bot.name):
+                        records = [bot.trading_service.signal(state) for state in features]
+                        best = strongest([
+                            r for r in records
+                            if r and r["signal"] != "WAIT" and bot._accept_candidate(r)
+                        ])
+                    if best is not None:
+                        log.info("🎯 [%s] %s %s", bot.name, best["signal"], best["symbol"])
+                        dispatches.append(bot.dispatch(session, best, time.perf_counter()))
+                    bot.scan_count += 1
+                await asyncio.gather(*dispatches)
+
+            await clock.sleep(primary.scan_pause())
+
+    async def run(self):
+        primary = self.primary
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+        primary._install_trace_dump_handler()
+        primary._install_memory_dump_handler()
+        primary.memory.start()
+
+        while True:
+            async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context)) as session:
+                for bot in self.bots:
+                    await bot.reconcile_positions(session)
+
+                loops = [self.scan_loop(session)]
+                for bot in self.bots:
+                    loops.append(bot.update_positions(session))
+                    loops.append(bot.start_summary_loops(session))
+                if primary.order_books is not None:
+                    loops.append(primary.order_books.run(session))
+                if self.config.resilience.metrics_interval > 0:
+                    loops.append(primary.request_metrics_loop())
+                if self.config.memory.interval > 0:
+                    loops.append(primary.memory_loop())
+                await asyncio.gather(*loops)
+
+    def shutdown(self):
+        for bot in self.bots:
+            bot.shutdown()
+        self.market_cache.save()
@@ -1,6 +1,14 @@
+from __future__ import annotations
+
 from typing import Optional
-import aiohttp
 from ..config.settings import TelegramConfig
+from ..utils.lazy import lazy_import
+from ..utils.log import get_logger
+from ..utils.tracing import tracer
+
+aiohttp = lazy_import("aiohttp")
+
+log = get_logger("telegram")
 
 class TelegramService:
     def __init__(self, config: TelegramConfig):
@@ -13,23 +21,24 @@ class TelegramService:
         message: str,
         parse_mode: str = 'HTML'
     ) -> Optional[dict]:
-        try:
-            async with session.post(
-                f"{self.base_url}/sendMessage",
-                data={
-                    'chat_id': self.config.chat_id,
-                    'text': message,
-                    'parse_mode': parse_mode
-                }
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    print(f"❌ Error sending Telegram message: {await response.text()}")
-                    return None
-        except Exception as e:
-            print(f"❌ Error sending Telegram message: {e}")
-            return None
+        with tracer.span("telegram.send_message"):
+            try:
+                async with session.post(
+                    f"{self.base_url}/sendMessage",
+                    data={
+                        'chat_id': self.config.chat_id,
+                        'text': message,
+                        'parse_mode': parse_mode
+                    }
+                ) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    else:
+                        log.error("❌ Error sending Telegram message: %s", await response.text())
+                        return None
+            except Exception as e:
+                log.error("❌ Error sending Telegram message: %s", e)
+                return None
 
     async def edit_message(
         self,
@@ -39,20 +48,21 @@ class TelegramService:
         parse_mode: str = 'HTML'
     ) -> None:
         """Edit an existing message"""
-        try:
-            async with session.post(
-                f"{self.base_url}/editMessageText",
-                data={
-                    'chat_id': self.config.chat_id,
-                    'message_id': message_id,
-                    'text': text,
-                    'parse_mode': parse_mode
-                }
-            ) as response:
-                if response.status != 200:
-                    print(f"❌ Error editing Telegram message: {await response.text()}")
-        except Exception as e:
-            print(f"❌ Error editing Telegram message: {e}")
+        with tracer.span("telegram.edit_message"):
+            try:
+                async with session.post(
+                    f"{self.base_url}/editMessageText",
+                    data={
+                        'chat_id': self.config.chat_id,
+                        'message_id': message_id,
+                        'text': text,
+                        'parse_mode': parse_mode
+                    }
+                ) as response:
+                    if response.status != 200:
+                        log.error("❌ Error editing Telegram message: %s", await response.text())
+            except Exception as e:
+                log.error("❌ Error editing Telegram message: %s", e)
 
     async def send_photo(
         self,
@@ -60,12 +70,13 @@ class TelegramService:
         photo_path: str,
         caption: str = ""
     ) -> None:
-        try:
-            with open(photo_path, "rb") as photo:
-                data = aiohttp.FormData()
-                data.add_field("chat_id", self.config.chat_id)
-                data.add_field("photo", photo, filename="report.png", content_type="image/png")
-                data.add_field("caption", caption)
-                await session.post(f"{self.base_url}/sendPhoto", data=data)
-        except Exception as e:
-            print(f"Telegram photo error: {e}") 
\ No newline at end of file
+        with tracer.span("telegram.send_photo"):
+            try:
+                with open(photo_path, "rb") as photo:
+                    data = aiohttp.FormData()
+                    data.add_field("chat_id", self.config.chat_id)
+                    data.add_field("photo", photo, filename="report.png", content_type="image/png")
+                    data.add_field("caption", caption)
+                    await session.post(f"{self.base_url}/sendPhoto", data=data)
+            except Exception as e:
+                log.error("❌ Telegram photo error: %s", e)
\ No newline at end of file
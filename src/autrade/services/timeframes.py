@@ -0,0 +1,151 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.clock import clock
+from ..utils.log import get_logger
+from . import indicators
+from .klines import KLINE_DTYPE, concat_klines, empty_klines
+from .market_data import INTERVAL_MS
+
+log = get_logger("timeframes")
+
+_SUMMED = ("volume", "quote_volume", "num_trades", "taker_base_vol", "taker_quote_vol")
+
+
+def resample_klines(base: np.ndarray, interval_ms: int) -> np.ndarray:
+    """Aggregate base bars into ``interval_ms`` buckets aligned to the epoch.
+
+    The last bucket may still be forming, exactly like the live candle the
+    exchange returns. A leading bucket that the base series only partially
+    covers is dropped.
+    """
+    if len(base) == 0:
+        return empty_klines()
+
+    bucket = base["timestamp"] // interval_ms * interval_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(base)] - 1
+
+    out = np.empty(len(starts), dtype=KLINE_DTYPE)
+    out["timestamp"] = bucket[starts]
+    out["open"] = base["open"][starts]
+    out["high"] = np.maximum.reduceat(base["high"], starts)
+    out["low"] = np.minimum.reduceat(base["low"], starts)
+    out["close"] = base["close"][ends]
+    out["close_time"] = bucket[starts] + interval_ms - 1
+    for name in _SUMMED:
+        out[name] = np.add.reduceat(base[name], starts)
+
+    if base["timestamp"][0] != bucket[0]:
+        out = out[1:]
+    return out
+
+
+class MultiTimeframe:
+    """Higher-timeframe bars derived in memory from one base interval per symbol.
+
+    ``update`` re-aggregates only from the newest (possibly still forming)
+    higher-timeframe bucket onwards, so keeping 15m/1h/4h context costs a few
+    array operations per scan and no extra requests.
+    """
+
+    def __init__(self, base_interval: str, intervals: List[str]):
+        self.base_interval = base_interval
+        base_ms = INTERVAL_MS[base_interval]
+        self.intervals = []
+        for interval in intervals:
+            ms = INTERVAL_MS.get(interval)
+            if ms is None or ms <= base_ms or ms % base_ms:
+                log.warning("⚠️ Cannot derive %s bars from %s, skipping", interval, base_interval)
+                continue
+            self.intervals.append(interval)
+        self._bars: Dict[Tuple[str, str], np.ndarray] = {}
+        self._updated: Dict[str, float] = {}  # last update per symbol, for eviction
+
+    def bars(self, symbol: str, interval: str) -> np.ndarray:
+        return self._bars.get((symbol, interval), empty_klines())
+
+    def update(self, symbol: str, base: np.ndarray) -> Dict[str, np.ndarray]:
+        """Fold the latest base bars into every derived timeframe"""
+        derived = {}
+        self._updated[symbol] = clock.monotonic()
+        for interval in self.intervals:
+            ms = INTERVAL_MS[interval]
+            key = (symbol, interval)
+            bars = self._bars.get(key)
+
+            if bars is None or len(bars) == 0 or len(base) == 0:
+                bars = resample_klines(base, ms)
+            else:
+                open_bucket = bars["timestamp"][-1]
+                tail = base[base["timestamp"] >= open_bucket]
+                if len(tail) == 0 or tail["timestamp"][0] != open_bucket:
+                    # Base history no longer lines up with what we derived
+                    bars = resample_klines(base, ms)
+                else:
+                    bars = concat_klines([bars[:-1], resample_klines(tail, ms)])
+                    # Forget buckets the base window has rolled past
+                    first_covered = math.ceil(base["timestamp"][0] / ms) * ms
+                    bars = bars[bars["timestamp"] >= first_covered]
+
+            self._bars[key] = bars
+            derived[interval] = bars
+        return derived
+
+    def __len__(self) -> int:
+        return len(self._bars)
+
+    def nbytes(self) -> int:
+        return sum(bars.nbytes for bars in self._bars.values())
+
+    def evict(self, nbytes: int) -> int:
+        """Forget the least recently updated symbols until ``nbytes`` are freed"""
+        freed = 0
+        for symbol in sorted(self._updated, key=self._updated.get):
+            if freed >= nbytes:
+                break
+            for interval in self.intervals:
+                bars = self._bars.pop((symbol, interval), None)
+                if bars is not None:
+                    freed += bars.nbytes
+            del self._updated[symbol]
+        return freed
+
+    def context(self, symbol: str) -> Dict:
+        """Indicator summary per derived timeframe plus an overall trend.
+
+        ``trend`` is +1 (EMA20 above EMA50, or close above EMA20 while there
+        are fewer than 50 bars), -1 for the opposite and 0 when undetermined.
+        ``htf_trend`` is the common trend of all timeframes, or 0 if they
+        disagree.
+        """
+        frames = {}
+        trends = []
+        for interval in self.intervals:
+            bars = self._bars.get((symbol, interval))
+            if bars is None or len(bars) < 20:
+                continue
+            close = np.ascontiguousarray(bars["close"], dtype=np.float64)
+            ema20 = indicators.ema(close, 20)[-1]
+            ema50 = indicators.ema(close, 50)[-1] if len(bars) >= 50 else float("nan")
+            rsi = indicators.rsi(close)[-1]
+            last_close = float(close[-1])
+
+            reference = ema50 if not math.isnan(ema50) else None
+            fast = ema20 if reference is not None else last_close
+            slow = reference if reference is not None else ema20
+            trend = 1 if fast > slow else -1 if fast < slow else 0
+            trends.append(trend)
+            frames[interval] = {
+                "trend": trend,
+                "rsi": float(rsi),
+                "ema20": float(ema20),
+                "ema50": float(ema50),
+                "close": last_close,
+                "bars": len(bars)
+            }
+
+        htf_trend = trends[0] if trends and all(t == trends[0] for t in trends) else 0
+        return {"htf_trend": htf_trend, "timeframes": frames}
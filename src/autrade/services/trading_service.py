@@ -1,17 +1,27 @@
-from datetime import datetime
+from __future__ import annotations
+
 from decimal import Decimal, ROUND_DOWN
 from typing import Dict, List, Optional, Tuple
-import pandas as pd
-from ta.momentum import RSIIndicator
-from ta.trend import EMAIndicator
-from ta.volatility import BollingerBands, AverageTrueRange
-import aiohttp
 
 from ..config.settings import Config
-from ..models.trade import Position, Trade, TradeManager
+from ..models.trade import Position, TradeManager
+from ..utils.clock import clock
+from ..utils.lazy import lazy_import
+from ..utils.log import get_logger
+from ..utils.tracing import tracer
+from . import indicators, signal_rules
 from .binance_service import BinanceService
+from .correlation import ReturnCorrelation
+from .klines import column
+from .market_data import INTERVAL_MS
+from .scan_scheduler import ScanScheduler
+from .timeframes import MultiTimeframe
 from .telegram_service import TelegramService
 
+aiohttp = lazy_import("aiohttp")
+
+log = get_logger("trading")
+
 class TradingService:
     def __init__(
         self,
@@ -24,69 +34,43 @@ class TradingService:
         self.binance = binance_service
         self.telegram = telegram_service
         self.trade_manager = trade_manager
+        indicators.use_backend(config.indicators.backend)
+        self.timeframes = MultiTimeframe(
+            config.timeframes.base_interval,
+            config.timeframes.higher_intervals
+        )
+        self.correlation = ReturnCorrelation(config.correlation.halflife, config.correlation.min_bars)
+        # SIGNAL_RULES picks a rule set; by default the one named like the trading mode
+        self.rules = signal_rules.resolve(
+            config.signals.rules or config.trading.mode, config.signals.path, explicit=bool(config.signals.rules)
+        )
+        if self.rules is None:
+            log.warning("⚠️ No signal rules named %s, %s mode will not open trades; set SIGNAL_RULES",
+                        config.trading.mode, config.trading.mode)
+        self.scan_scheduler = None
+        if config.scan.adaptive:
+            self.scan_scheduler = ScanScheduler(
+                [self.rules], config.scan.budget, config.scan.min_interval, config.scan.max_interval,
+                INTERVAL_MS[config.timeframes.base_interval] / 1000
+            )
 
-    def generate_signal(
-        self,
-        rsi: float,
-        ema20: float,
-        ema50: float,
-        last_close: float,
-        lower_band: float,
-        upper_band: float,
-        is_green: bool,
-        is_red: bool
-    ) -> str:
-        signal_mode = self.config.trading.mode
-
-        if signal_mode == "conservative":
-            if (
-                rsi < 30 and
-                ema20 > ema50 * 1.01 and
-                last_close < lower_band * 0.99 and
-                is_green
-            ):
-                return "LONG"
-            elif (
-                rsi > 70 and
-                ema20 < ema50 * 0.99 and
-                last_close > upper_band * 1.01 and
-                is_red
-            ):
-                return "SHORT"
-
-        elif signal_mode == "moderate":
-            if (
-                rsi < 45 and
-                ema20 > ema50 and
-                last_close < lower_band and
-                is_green
-            ):
-                return "LONG"
-            elif (
-                rsi > 55 and
-                ema20 < ema50 and
-                last_close > upper_band and
-                is_red
-            ):
-                return "SHORT"
-
-        elif signal_mode == "aggressive":
-            if (
-                rsi < 50 and
-                ema20 > ema50 and
-                last_close <= lower_band * 1.02 and
-                is_green
-            ):
-                return "LONG"
-            elif (
-                rsi > 50 and
-                ema20 < ema50 and
-                last_close >= upper_band * 0.98 and
-                is_red
-            ):
-                return "SHORT"
-
-        return "WAIT"
+    def generate_signal(self, values: Dict[str, float], htf_trend: int = 0) -> str:
+        """Entry signal for the last candle by the configured signal rules.
+
+        ``values`` maps the rule fields (see signal_rules.FIELDS) to the last
+        bar's values. ``htf_trend`` is the higher-timeframe trend from
+        MultiTimeframe (+1 up, -1 down, 0 mixed); with HTF_CONFIRMATION on,
+        signals against or without a clear higher-timeframe trend are turned
+        into WAIT.
+        """
+        if self.rules is None:
+            return "WAIT"
+        signal = self.rules.signal(values)
+        if signal != "WAIT" and self.config.timeframes.require_confirmation:
+            wanted = 1 if signal == "LONG" else -1
+            if htf_trend != wanted:
+                return "WAIT"
+        return signal
 
     async def analyze(
         self,
@@ -94,102 +78,155 @@ class TradingService:
         symbol: str,
         idx: int = 0
     ) -> Optional[Dict[str, float]]:
-        df = await self.binance.get_klines(session, symbol)
-        if df.empty or len(df) < 30:
-            return None
+        with tracer.span("analyze", symbol=symbol):
+            klines = await self.fetch_klines(session, symbol)
+            return self.evaluate(symbol, klines)
+
+    async def fetch_klines(self, session: aiohttp.ClientSession, symbol: str):
+        """Base-interval bars for ``symbol``, the I/O half of ``analyze``"""
+        with tracer.span("analyze.get_klines", symbol=symbol):
+            return await self.binance.get_klines(
+                session, symbol, interval=self.config.timeframes.base_interval
+            )
 
-        # Convert numeric columns to float
-        for col in ["open", "high", "low", "close", "volume"]:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    def evaluate(self, symbol: str, klines) -> Optional[Dict[str, float]]:
+        """Indicators, signal and trade levels from fetched bars, the CPU half of ``analyze``"""
+        features = self.features(symbol, klines)
+        return self.signal(features) if features is not None else None
+
+    def features(self, symbol: str, klines) -> Optional[Dict]:
+        """Mode-independent indicator state of the last bar.
+
+        Computed once per symbol and scan; strategies that share a market
+        data plane each turn it into their own signal with ``signal``.
+        """
+        if len(klines) < 30:
+            return None
 
-        close = df["close"]
-        open_ = df["open"]
-        high = df["high"]
-        low = df["low"]
-        volume = df["volume"]
+        # Unit-stride float64 columns straight from the decoded klines
+        with tracer.span("analyze.frame", symbol=symbol):
+            close = column(klines, "close")
+            open_ = column(klines, "open")
+            high = column(klines, "high")
+            low = column(klines, "low")
+            volume = column(klines, "volume")
 
-        last_close = close.iloc[-1]
-        last_open = open_.iloc[-1]
-        last_high = high.iloc[-1]
-        last_low = low.iloc[-1]
-        last_volume = float(volume.iloc[-1])
+        last_close = float(close[-1])
+        last_open = float(open_[-1])
+        last_high = float(high[-1])
+        last_low = float(low[-1])
+        last_volume = float(volume[-1])
 
         # Calculate volume average for last 10 candles
-        volume_avg10 = float(volume.iloc[-10:].mean())
+        volume_avg10 = float(volume[-10:].mean())
 
         # Calculate price change in last 5 minutes
         # Get the most recent 2 candles
-        recent_candles = close.iloc[-2:]
+        recent_candles = close[-2:]
         if len(recent_candles) == 2:
-            prev_close = recent_candles.iloc[0]
-            current_close = recent_candles.iloc[1]
+            prev_close = recent_candles[0]
+            current_close = recent_candles[1]
             price_change_5m = ((current_close - prev_close) / prev_close) * 100
         else:
             price_change_5m = 0.0
-            print("⚠️ Not enough candles to calculate price change")
-
-        # Detect candle pattern
-        candle_pattern = ""
-        body_size = abs(last_close - last_open)
-        upper_wick = last_high - max(last_open, last_close)
-        lower_wick = min(last_open, last_close) - last_low
-        total_size = last_high - last_low
-        
-        if total_size > 0:  # Avoid division by zero
-            body_ratio = body_size / total_size
-            upper_ratio = upper_wick / total_size
-            lower_ratio = lower_wick / total_size
-            
-            if last_close > last_open:  # Bullish candle
-                if body_ratio > 0.6:
-                    if upper_ratio < 0.1 and lower_ratio < 0.1:
-                        candle_pattern = "Bullish Marubozu"
-                    else:
-                        candle_pattern = "Strong Bullish"
-                elif body_ratio < 0.3:
-                    if lower_ratio > 0.6:
-                        candle_pattern = "Hammer"
-                    elif upper_ratio > 0.6:
-                        candle_pattern = "Inverted Hammer"
-                    else:
-                        candle_pattern = "Doji"
-                elif upper_ratio < 0.1 and lower_ratio > 0.4:
-                    candle_pattern = "Bullish Engulfing"
-            else:  # Bearish candle
-                if body_ratio > 0.6:
-                    if upper_ratio < 0.1 and lower_ratio < 0.1:
-                        candle_pattern = "Bearish Marubozu"
-                    else:
-                        candle_pattern = "Strong Bearish"
-                elif body_ratio < 0.3:
-                    if upper_ratio > 0.6:
-                        candle_pattern = "Shooting Star"
-                    elif lower_ratio > 0.6:
-                        candle_pattern = "Hanging Man"
-                    else:
-                        candle_pattern = "Doji"
-                elif lower_ratio < 0.1 and upper_ratio > 0.4:
-                    candle_pattern = "Bearish Engulfing"
-
-        rsi = RSIIndicator(close).rsi().iloc[-1]
-        ema20 = EMAIndicator(close, window=20).ema_indicator().iloc[-1]
-        ema50 = EMAIndicator(close, window=50).ema_indicator().iloc[-1]
-        bb = BollingerBands(close)
-        upper_band = bb.bollinger_hband().iloc[-1]
-        lower_band = bb.bollinger_lband().iloc[-1]
-        atr = AverageTrueRange(high, low, close, window=14).average_true_range().iloc[-1]
-        min_atr = last_close * self.config.risk.min_atr_ratio
-
-        if atr < min_atr:
-            atr = min_atr
-
-        is_green = last_close > last_open
-        is_red = last_close < last_open
-
-        signal = self.generate_signal(
-            rsi, ema20, ema50, last_close,
-            lower_band, upper_band, is_green, is_red
-        )
+            log.warning("⚠️ Not enough candles to calculate price change")
+
+        # Indicators and the candle pattern of the last bar in one kernel pass
+        with tracer.span("analyze.indicators", symbol=symbol):
+            values = indicators.latest(open_, high, low, close)
+            rsi = float(values["rsi"][0])
+            ema20 = float(values["ema20"][0])
+            ema50 = float(values["ema50"][0])
+            upper_band = float(values["upper_band"][0])
+            lower_band = float(values["lower_band"][0])
+            atr = float(values["atr"][0])
+            candle_pattern = indicators.PATTERNS[values["pattern"][0]]
+
+        # Higher-timeframe context from the same base bars, no extra requests
+        with tracer.span("analyze.timeframes", symbol=symbol):
+            self.timeframes.update(symbol, klines)
+            htf = self.timeframes.context(symbol)
+
+        # Returns of newly closed bars feed the cross-symbol correlation
+        with tracer.span("analyze.correlation", symbol=symbol):
+            self.correlation.observe(symbol, klines, INTERVAL_MS[self.config.timeframes.base_interval])
+
+        state = {
+            "symbol": symbol,
+            "last_close": last_close,
+            "last_open": last_open,
+            "last_high": last_high,
+            "last_low": last_low,
+            "last_volume": last_volume,
+            "volume_avg10": volume_avg10,
+            "price_change_5m": price_change_5m,
+            "rsi": rsi,
+            "ema20": ema20,
+            "ema50": ema50,
+            "upper_band": upper_band,
+            "lower_band": lower_band,
+            "atr": atr,
+            "candle_pattern": candle_pattern,
+            "htf": htf
+        }
+        # Next refresh of this symbol by its distance to a signal
+        if self.scan_scheduler is not None:
+            self.scan_scheduler.observe(symbol, self.rule_values(state))
+        return state
+
+    def rule_values(self, features: Dict) -> Dict[str, float]:
+        """The signal rule fields (signal_rules.FIELDS) of a ``features`` result"""
+        last_close = features["last_close"]
+        last_open = features["last_open"]
+        # ATR floored at MIN_ATR_RATIO of the price, as TP/SL distances use it
+        atr = max(features["atr"], last_close * self.config.risk.min_atr_ratio)
+        return {
+            "open": last_open,
+            "high": features["last_high"],
+            "low": features["last_low"],
+            "close": last_close,
+            "volume": features["last_volume"],
+            "volume_avg10": features["volume_avg10"],
+            "price_change": features["price_change_5m"],
+            "rsi": features["rsi"],
+            "ema20": features["ema20"],
+            "ema50": features["ema50"],
+            "upper": features["upper_band"],
+            "lower": features["lower_band"],
+            "atr": atr,
+            "is_green": last_close > last_open,
+            "is_red": last_close < last_open,
+            "htf_trend": features["htf"]["htf_trend"]
+        }
+
+    def signal(self, features: Dict) -> Optional[Dict[str, float]]:
+        """Signal, confidence and trade levels for this service's trading and risk config"""
+        symbol = features["symbol"]
+        last_close = features["last_close"]
+        last_open = features["last_open"]
+        last_high = features["last_high"]
+        last_low = features["last_low"]
+        last_volume = features["last_volume"]
+        volume_avg10 = features["volume_avg10"]
+        price_change_5m = features["price_change_5m"]
+        rsi = features["rsi"]
+        ema20 = features["ema20"]
+        ema50 = features["ema50"]
+        upper_band = features["upper_band"]
+        lower_band = features["lower_band"]
+        candle_pattern = features["candle_pattern"]
+        htf = features["htf"]
+
+        # Bar closes move the paper exchange's quotes between position checks
+        self.binance.paper_price(symbol, last_close)
+
+        values = self.rule_values(features)
+        atr = values["atr"]
+        is_green = values["is_green"]
+        is_red = values["is_red"]
+
+        with tracer.span("analyze.signal", symbol=symbol):
+            signal = self.generate_signal(values, htf_trend=htf["htf_trend"])
 
         # Calculate entry confidence score (0-100)
         entry_confidence_score = 0
@@ -286,7 +323,9 @@ class TradingService:
                 "tp_price": tp_price,
                 "sl_price": sl_price,
                 "spread": spread,
-                "bb_width": bb_width
+                "bb_width": bb_width,
+                "htf_trend": htf["htf_trend"],
+                "htf": htf["timeframes"]
             }
 
         return None  # Return None when there is no signal
@@ -314,16 +353,46 @@ class TradingService:
             # Round to appropriate precision
             position_size = float(position_size.quantize(Decimal('0.1')))  # Round to 1 decimal place
 
-            print(f"💰 Balance: {float(balance):.2f} USDT")
-            print(f"🎯 Position Size: {position_size:.1f} units")
+            log.debug("💰 Balance: %.2f USDT", float(balance))
+            log.debug("🎯 Position Size: %.1f units", position_size)
             return position_size
 
         except Exception as e:
-            print(f"Error calculating position size: {e}")
+            log.error("Error calculating position size: %s", e)
+            return 0.0
+
+    def _fit_to_book(self, symbol: str, side: str, position_size: float) -> float:
+        """Skip wide books and cap the size to what the book absorbs within MAX_SLIPPAGE_PCT"""
+        if self.binance.order_books is None:
+            return position_size
+        book = self.binance.order_books.get(symbol)
+        if book is None:
+            return position_size
+
+        settings = self.config.order_book
+        spread = book.spread_pct()
+        if spread >= settings.max_spread_pct:
+            log.warning("⚠️ Spread too wide for %s (%.4f%%), skipping trade", symbol, spread)
             return 0.0
 
+        available = book.depth_qty(side, settings.max_slippage_pct)
+        if position_size > available:
+            log.info("📚 Capping %s size from %s to %s to stay within book depth", symbol, position_size, available)
+            position_size = float(int(available * 10) / 10)  # same 0.1 step as calculate_position_size
+
+        _, slippage = book.slippage(side, position_size)
+        log.debug(
+            "📚 %s book: spread %.4f%%, est. slippage %.4f%%, imbalance %+.2f",
+            symbol, spread, slippage, book.imbalance()
+        )
+        return position_size
+
     async def process_trade(self, session: aiohttp.ClientSession, trade_data: Dict) -> Optional[Position]:
         """Process a trade based on analysis results"""
+        with tracer.span("process_trade", symbol=trade_data.get("symbol")):
+            return await self._process_trade(session, trade_data)
+
+    async def _process_trade(self, session: aiohttp.ClientSession, trade_data: Dict) -> Optional[Position]:
         try:
             symbol = trade_data["symbol"]
             signal = trade_data["signal"]
@@ -331,38 +400,49 @@ class TradingService:
             
             # Check if we already have a position for this symbol
             if symbol in self.trade_manager.positions:
-                print(f"⚠️ Already have a position for {symbol}")
+                log.warning("⚠️ Already have a position for %s", symbol)
                 return None
             
             # Check if we have enough confidence to trade
             if entry_confidence_score <= 30:
-                print(f"⚠️ Confidence score too low ({entry_confidence_score}) for {symbol}, skipping trade")
+                log.warning("⚠️ Confidence score too low (%s) for %s, skipping trade", entry_confidence_score, symbol)
                 return None
             
             # Get current price and calculate position size
-            current_price = await self.binance.get_mark_price(session, symbol)
+            with tracer.span("process_trade.mark_price", symbol=symbol):
+                current_price = await self.binance.get_mark_price(session, symbol)
             if current_price <= 0:
-                print(f"❌ Invalid price for {symbol}: {current_price}")
+                log.error("❌ Invalid price for %s: %s", symbol, current_price)
                 return None
             
             # Calculate position size based on risk management
-            balance = await self.binance.get_account_balance(session)
-            position_size = self.calculate_position_size(balance, current_price)
+            with tracer.span("process_trade.balance", symbol=symbol):
+                balance = await self.binance.get_account_balance(session)
+            if balance <= 0:
+                log.error("❌ No balance left to size %s: %s USDT", symbol, balance)
+                return None
+            position_size = self.calculate_position_size(current_price, trade_data["atr"])
             
+            # Signals are LONG/SHORT, orders are BUY/SELL
+            side = "BUY" if signal == "LONG" else "SELL"
+            position_size = self._fit_to_book(symbol, side, position_size)
             if position_size <= 0:
-                print(f"❌ Invalid position size for {symbol}: {position_size}")
+                log.error("❌ Invalid position size for %s: %s", symbol, position_size)
                 return None
             
-            # Place the order
+            # Place the order; the paper exchange also rests TP/SL stops
+            demo = self.config.binance.bot_mode == "DEMO"
             order = await self.binance.place_order(
                 session,
                 symbol,
-                signal,
-                position_size
+                side,
+                position_size,
+                tp_price=trade_data["tp_price"] if demo else None,
+                sl_price=trade_data["sl_price"] if demo else None
             )
             
-            if not order:
-                print(f"❌ Failed to place order for {symbol}")
+            if not order or "error" in order:
+                log.error("❌ Failed to place order for %s", symbol)
                 return None
             
             # Create position object
@@ -372,7 +452,7 @@ class TradingService:
                 side=signal,
                 tp_price=trade_data["tp_price"],
                 sl_price=trade_data["sl_price"],
-                timestamp=datetime.now(),
+                timestamp=clock.now(),
                 margin=position_size * current_price / self.config.trading.leverage,
                 leverage=self.config.trading.leverage,
                 mark_price=current_price,
@@ -395,12 +475,12 @@ class TradingService:
                 entry_confidence_score=entry_confidence_score
             )
             
-            # Add position to manager
-            self.trade_manager.add_position(symbol, position)
+            # Add position to manager; the book returns a live row view
+            position = self.trade_manager.add_position(symbol, position)
             
             # Send Telegram notification
             mode_prefix = "🤖 DEMO" if self.config.binance.bot_mode == "DEMO" else "💰 REAL"
-            direction = "Long 🚀" if signal == "BUY" else "Short 🔻"
+            direction = "Long 🚀" if signal == "LONG" else "Short 🔻"
             message = (
                 f"<pre>\n"
                 f"{mode_prefix} New Position : {symbol} ({direction})\n"
@@ -418,14 +498,15 @@ class TradingService:
                 f"   • Confidence : {entry_confidence_score:.1f}\n\n"
                 f"🎯 TP           : {trade_data['tp_price']:.6f}\n"
                 f"🛑 SL           : {trade_data['sl_price']:.6f}\n"
-                f"⏰ Time         : {datetime.now().strftime('%H:%M:%S')}\n"
+                f"⏰ Time         : {clock.now().strftime('%H:%M:%S')}\n"
                 f"</pre>"
             )
             
-            await self.telegram.send_message(session, message)
+            with tracer.span("process_trade.telegram", symbol=symbol):
+                await self.telegram.send_message(session, message)
             
             return position
             
         except Exception as e:
-            print(f"❌ Error processing trade: {e}")
+            log.error("❌ Error processing trade: %s", e)
             return None 
\ No newline at end of file
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+ROOT_LOGGER = "autrade"
+
+
+# Argument types that cannot change between the log call and formatting
+_IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the background listener.
+
+    The stock handler renders the message in the calling thread; here a
+    record whose arguments are all immutable scalars goes onto the queue
+    untouched, so a log call on the event loop costs one unbounded ``put``.
+    Any other argument (a position dict, a list) may change before the
+    listener gets to it, so those records are rendered here first.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        # A lone dict argument arrives as ``args`` itself, so dicts always count as mutable
+        if args and (isinstance(args, dict) or not all(isinstance(a, _IMMUTABLE_ARGS) for a in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class RepeatFilter(logging.Filter):
+    """Drop identical messages repeated within ``window`` seconds.
+
+    When the message is next let through, it carries the number of copies
+    that were suppressed in the meantime.
+    """
+
+    def __init__(self, window: float = 60.0):
+        super().__init__()
+        self.window = window
+        self._seen: Dict[Tuple[str, int, str], Tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = record.created
+        last = self._seen.get(key)
+        if last is not None and now - last[0] < self.window:
+            self._seen[key] = (last[0], last[1] + 1)
+            return False
+        suppressed = last[1] if last is not None else 0
+        self._seen[key] = (now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        if len(self._seen) > 10_000:
+            cutoff = now - self.window
+            self._seen = {k: v for k, v in self._seen.items() if v[0] >= cutoff}
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, with structured ``fields`` merged in"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(message)s", datefmt="%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (repeated {suppressed}x)"
+        return text
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the ``autrade`` namespace, e.g. ``get_logger("binance")``"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_path: Optional[str] = "data/logs/autrade.jsonl",
+    console: bool = True,
+    repeat_window: float = 60.0
+) -> QueueListener:
+    """Route all ``autrade`` loggers through a queue to a background writer thread.
+
+    Returns the started listener; call ``stop()`` on shutdown to flush it.
+    """
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ConsoleFormatter())
+        handlers.append(console_handler)
+    if json_path:
+        os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+        file_handler = logging.FileHandler(json_path, encoding="utf-8")
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+
+    # Filters run on the listener thread, never on the event loop
+    for handler in handlers:
+        handler.addFilter(RepeatFilter(repeat_window))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers.clear()
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    root.propagate = False
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,284 @@
+import gc
+import json
+import os
+import time
+import tracemalloc
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from .clock import clock
+from .log import get_logger
+
+log = get_logger("memory")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 * 1024
+
+# Allocation traces that only describe the instrumentation itself
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int:
+    """Current resident set size; the peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if peak > 1 << 32 else peak * 1024
+
+
+class _Gauge:
+    __slots__ = ("name", "items", "nbytes", "evict", "evicted")
+
+    def __init__(self, name: str, items: Callable[[], int],
+                 nbytes: Optional[Callable[[], int]], evict: Optional[Callable[[int], int]]):
+        self.name = name
+        self.items = items
+        self.nbytes = nbytes
+        self.evict = evict
+        self.evicted = 0
+
+
+class MemoryMonitor:
+    """Memory accounting for a process that runs for weeks.
+
+    Caches register a gauge (item count, optionally bytes) and optionally an
+    eviction hook ``evict(nbytes) -> freed``. ``sample()`` reads RSS and the
+    gauges, diffs a tracemalloc snapshot against the previous one when
+    tracing is on, and evicts the largest caches first when the cache
+    budget or the RSS budget is exceeded, down to ``headroom`` of the
+    budget so eviction does not run on every sample. Garbage collector
+    pauses are timed per generation through ``gc.callbacks``.
+    ``export(path)`` writes everything, including the top allocation sites
+    since start, as JSON.
+    """
+
+    def __init__(self, budget_mb: float = 0.0, cache_budget_mb: float = 0.0,
+                 tracemalloc_frames: int = 0, top: int = 10, headroom: float = 0.8):
+        self.budget = int(budget_mb * MB)
+        self.cache_budget = int(cache_budget_mb * MB)
+        self.frames = tracemalloc_frames
+        self.top = top
+        self.headroom = headroom
+        self._gauges: Dict[str, _Gauge] = {}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self.growth: List[Dict] = []  # top sites of the last snapshot diff
+        self.samples = 0
+        self.evictions = 0
+        self.rss = 0
+        self.rss_peak = 0
+        self.started = clock.time()
+
+        self._gc_started = 0.0
+        self._gc_generation = 0
+        self.gc_collections = [0, 0, 0]
+        self.gc_seconds = [0.0, 0.0, 0.0]
+        self.gc_max = [0.0, 0.0, 0.0]
+        self.gc_collected = 0
+        self.gc_uncollectable = 0
+        self._gc_pauses: Deque[float] = deque(maxlen=1024)
+
+    def register(self, name: str, items: Callable[[], int], nbytes: Optional[Callable[[], int]] = None,
+                 evict: Optional[Callable[[int], int]] = None) -> None:
+        self._gauges[name] = _Gauge(name, items, nbytes, evict)
+
+    def start(self) -> None:
+        if self._gc_callback not in gc.callbacks:
+            gc.callbacks.append(self._gc_callback)
+        if self.frames > 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            self._baseline = self._snapshot()
+            self._previous = self._baseline
+
+    def stop(self) -> None:
+        if self._gc_callback in gc.callbacks:
+            gc.callbacks.remove(self._gc_callback)
+        if self._baseline is not None and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._baseline = self._previous = None
+
+    def _gc_callback(self, phase: str, info: Dict) -> None:
+        if phase == "start":
+            self._gc_generation = info["generation"]
+            self._gc_started = time.perf_counter()
+            return
+        pause = time.perf_counter() - self._gc_started
+        generation = self._gc_generation
+        self.gc_collections[generation] += 1
+        self.gc_seconds[generation] += pause
+        if pause > self.gc_max[generation]:
+            self.gc_max[generation] = pause
+        self.gc_collected += info.get("collected", 0)
+        self.gc_uncollectable += info.get("uncollectable", 0)
+        self._gc_pauses.append(pause)
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+
+    def _top(self, snapshot: tracemalloc.Snapshot, since: tracemalloc.Snapshot, limit: int) -> List[Dict]:
+        key = "traceback" if self.frames > 1 else "lineno"
+        stats = snapshot.compare_to(since, key)
+        return [
+            {
+                "site": [str(frame) for frame in stat.traceback] if self.frames > 1 else str(stat.traceback[0]),
+                "size_kb": round(stat.size / 1024, 1),
+                "growth_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count,
+                "count_growth": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+
+    def gauges(self) -> Dict[str, Dict]:
+        readings = {}
+        for gauge in self._gauges.values():
+            try:
+                reading = {"items": gauge.items()}
+                if gauge.nbytes is not None:
+                    reading["bytes"] = gauge.nbytes()
+            except Exception as e:
+                reading = {"error": str(e)}
+            if gauge.evicted:
+                reading["evicted_bytes"] = gauge.evicted
+            readings[gauge.name] = reading
+        return readings
+
+    def cache_bytes(self) -> int:
+        return sum(g.nbytes() for g in self._gauges.values() if g.nbytes is not None)
+
+    def evict(self, nbytes: int, flush: bool = False) -> int:
+        """Free at least ``nbytes`` from evictable caches, largest first.
+
+        With ``flush``, caches that cannot size themselves are emptied too.
+        """
+        sized = [(g.nbytes(), g) for g in self._gauges.values() if g.evict is not None and g.nbytes is not None]
+        freed = 0
+        for size, gauge in sorted(sized, key=lambda s: s[0], reverse=True):
+            if freed >= nbytes:
+                break
+            if size <= 0:
+                continue
+            released = gauge.evict(nbytes - freed)
+            gauge.evicted += released
+            freed += released
+        if flush:
+            for gauge in self._gauges.values():
+                if gauge.evict is not None and gauge.nbytes is None:
+                    gauge.evict(0)
+        self.evictions += 1
+        return freed
+
+    def _enforce(self) -> None:
+        if self.cache_budget:
+            cached = self.cache_bytes()
+            if cached > self.cache_budget:
+                freed = self.evict(cached - int(self.cache_budget * self.headroom))
+                log.warning(
+                    "🧹 Caches at %.1f MB exceed the %.1f MB budget, evicted %.1f MB",
+                    cached / MB, self.cache_budget / MB, freed / MB,
+                    extra={"fields": {"event": "cache_eviction", "cache_bytes": cached, "freed_bytes": freed}}
+                )
+        if self.budget and self.rss > self.budget:
+            freed = self.evict(self.rss - int(self.budget * self.headroom), flush=True)
+            collected = gc.collect()
+            log.warning(
+                "🧹 RSS %.1f MB exceeds the %.1f MB budget, evicted %.1f MB of caches, %s objects collected",
+                self.rss / MB, self.budget / MB, freed / MB, collected,
+                extra={"fields": {"event": "memory_eviction", "rss_bytes": self.rss, "freed_bytes": freed}}
+            )
+
+    def sample(self) -> Dict:
+        """Read RSS and gauges, diff allocations, enforce budgets"""
+        self.samples += 1
+        self.rss = rss_bytes()
+        self.rss_peak = max(self.rss_peak, self.rss)
+        if self._previous is not None:
+            snapshot = self._snapshot()
+            self.growth = self._top(snapshot, self._previous, self.top)
+            self._previous = snapshot
+        self._enforce()
+        return self.metrics()
+
+    def _gc_metrics(self) -> Dict:
+        pauses = sorted(self._gc_pauses)
+        p99 = pauses[min(len(pauses) - 1, int(len(pauses) * 0.99))] if pauses else 0.0
+        return {
+            "collections": list(self.gc_collections),
+            "pause_ms_total": [round(s * 1000, 2) for s in self.gc_seconds],
+            "pause_ms_max": [round(s * 1000, 2) for s in self.gc_max],
+            "pause_ms_p99": round(p99 * 1000, 2),
+            "collected": self.gc_collected,
+            "uncollectable": self.gc_uncollectable,
+            "tracked_objects": len(gc.get_objects()),
+        }
+
+    def metrics(self) -> Dict:
+        metrics = {
+            "rss_mb": round(self.rss / MB, 1),
+            "rss_peak_mb": round(self.rss_peak / MB, 1),
+            "cache_mb": round(self.cache_bytes() / MB, 2),
+            "budget_mb": round(self.budget / MB, 1),
+            "cache_budget_mb": round(self.cache_budget / MB, 1),
+            "evictions": self.evictions,
+            "gauges": self.gauges(),
+            "gc": self._gc_metrics(),
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            metrics["traced_mb"] = round(current / MB, 1)
+            metrics["traced_peak_mb"] = round(peak / MB, 1)
+        return metrics
+
+    def log_metrics(self) -> None:
+        metrics = self.sample()
+        gc_metrics = metrics["gc"]
+        log.info(
+            "🧠 Memory: RSS %.1f MB (peak %.1f), caches %.2f MB, GC %s/%s/%s collections, max pause %.1f ms",
+            metrics["rss_mb"], metrics["rss_peak_mb"], metrics["cache_mb"],
+            *gc_metrics["collections"], max(gc_metrics["pause_ms_max"]),
+            extra={"fields": {"event": "memory_metrics", **metrics}}
+        )
+        for site in self.growth[:3]:
+            if site["growth_kb"] > 0:
+                log.info("📈 Allocation growth %+.1f KB at %s", site["growth_kb"], site["site"],
+                         extra={"fields": {"event": "memory_growth", **site}})
+
+    def export(self, path: str) -> str:
+        """Write metrics and, when tracing, the top allocation sites since start as JSON"""
+        report = {
+            "time": clock.now().isoformat(),
+            "uptime_seconds": round(clock.time() - self.started, 1),
+            "samples": self.samples,
+            **self.sample(),
+            "growth_since_last_sample": self.growth,
+        }
+        if self._baseline is not None:
+            snapshot = self._snapshot()
+            report["growth_since_start"] = self._top(snapshot, self._baseline, self.top * 5)
+            key = "traceback" if self.frames > 1 else "lineno"
+            report["largest"] = [
+                {"site": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in snapshot.statistics(key)[:self.top * 5]
+            ]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return path
@@ -1,4 +1,9 @@
-from PIL import Image, ImageDraw, ImageFont
+from .lazy import lazy_import
+
+# Pillow is only needed when a report image is actually rendered
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
 
 def create_trading_report(symbol, pnl, trade_time, output_path, bot_name="autrade", background_path="./assets/bg.png"):
     # Load chart background dan resize
@@ -28,8 +33,6 @@ def create_summary_report(
     total, win, loss, winrate, net_pnl, net_pct,
     output_path, background_path="./assets/bg.png", bot_name="autrade", mode="Summary"
 ):
-    from PIL import Image, ImageDraw, ImageFont
-
     # Load background dan resize
     bg = Image.open(background_path).convert("RGBA").resize((1150, 768))
     draw = ImageDraw.Draw(bg)
@@ -62,4 +65,53 @@ def create_summary_report(
     draw.text((margin_left, 700), bot_name, font=font_small, fill="white")
 
     # Simpan ke file
-    bg.save(output_path)
\ No newline at end of file
+    bg.save(output_path)
+
+def create_risk_report(result, output_path, background_path="./assets/bg.png", bot_name="autrade", mode="Monte Carlo"):
+    # Load background dan resize
+    bg = Image.open(background_path).convert("RGBA").resize((1150, 768))
+    draw = ImageDraw.Draw(bg)
+
+    # Load fonts
+    font_large = ImageFont.truetype("./assets/DejaVuSans-Bold.ttf", 60)
+    font_medium = ImageFont.truetype("./assets/DejaVuSans-Bold.ttf", 30)
+    font_small = ImageFont.truetype("./assets/DejaVuSans.ttf", 24)
+
+    # Format teks
+    ruin = result["risk_of_ruin"]
+    ruin_color = (0, 255, 0) if ruin < 1 else (255, 200, 0) if ruin < 5 else (255, 0, 0)
+    pnl = result["final_pnl"]
+    dd_pct = result["max_drawdown_pct"]
+    low, high = result["winrate_ci"]
+
+    # Posisi teks (kiri)
+    margin_left = 80
+    draw.text((margin_left, 150), mode, font=font_medium, fill="white")
+
+    draw.text((margin_left, 230), f"Risk of Ruin ({result['ruin_threshold']:g}% loss)", font=font_small, fill="white")
+    draw.text((margin_left, 260), f"{ruin:.2f}%", font=font_large, fill=ruin_color)
+
+    draw.text((margin_left, 350), f"Max DD p50 / p95: {dd_pct[50]:.1f}% / {dd_pct[95]:.1f}%", font=font_medium, fill="white")
+    draw.text((margin_left, 400), f"Winrate: {result['winrate']:.1f}% (95% CI {low:.1f}-{high:.1f}%)", font=font_small, fill="white")
+    draw.text((margin_left, 440), f"Final PnL p5 / p50 / p95: {pnl[5]:+.2f} / {pnl[50]:+.2f} / {pnl[95]:+.2f} USDT",
+              font=font_small, fill="white")
+    draw.text((margin_left, 480), f"{result['paths']} paths x {result['trades']} trades, {result['leverage']:g}x",
+              font=font_small, fill="white")
+
+    # Histogram max drawdown (kanan)
+    counts = result["drawdown_histogram"]["counts"]
+    edges = result["drawdown_histogram"]["edges_pct"]
+    left, bottom, width, height = 760, 600, 330, 300
+    bar = width / len(counts)
+    tallest = max(counts) or 1
+    for i, count in enumerate(counts):
+        top = bottom - height * count / tallest
+        draw.rectangle((left + i * bar, top, left + (i + 1) * bar - 2, bottom), fill=(255, 120, 80))
+    draw.text((left, bottom + 10), f"{edges[0]:.0f}%", font=font_small, fill="white")
+    draw.text((left + width - 60, bottom + 10), f"{edges[-1]:.0f}%", font=font_small, fill="white")
+    draw.text((left, bottom - height - 40), "Max drawdown", font=font_small, fill="white")
+
+    draw.text((margin_left, 700), bot_name, font=font_small, fill="white")
+
+    # Simpan ke file
+    bg.save(output_path)
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+# (name, start_us, duration_us, lane, tags)
+SpanRecord = Tuple[str, float, float, int, Optional[Dict]]
+
+
+class _NoopSpan:
+    """Shared do-nothing span handed out while tracing is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def tag(self, **tags) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("_tracer", "name", "tags", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, tags: Optional[Dict]):
+        self._tracer = tracer
+        self.name = name
+        self.tags = tags
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.tag(error=exc_type.__name__)
+        self._tracer._record(self.name, self.start, end, self.tags)
+        return False
+
+    def tag(self, **tags) -> None:
+        """Attach tags discovered while the span is running"""
+        if self.tags is None:
+            self.tags = tags
+        else:
+            self.tags.update(tags)
+
+
+class Tracer:
+    """Stage-level span recorder with a bounded ring buffer.
+
+    ``with tracer.span("analyze", symbol=symbol):`` times a block. Finished
+    spans go to a ring buffer that can be written out in Chrome trace-event
+    format (load it in chrome://tracing or Perfetto). While disabled,
+    ``span`` returns a shared no-op object, so instrumented code pays one
+    attribute check per span.
+    """
+
+    def __init__(self, enabled: bool = False, capacity: int = 20000):
+        self.enabled = enabled
+        self._spans: Deque[SpanRecord] = deque(maxlen=capacity)
+        self._lanes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._origin_wall = time.time()
+
+    def configure(self, enabled: bool, capacity: Optional[int] = None) -> None:
+        self.enabled = enabled
+        if capacity is not None and capacity != self._spans.maxlen:
+            self._spans = deque(self._spans, maxlen=capacity)
+
+    def span(self, name: str, **tags):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, tags or None)
+
+    def _lane(self) -> int:
+        """Small integer per asyncio task (or thread), used as the trace 'tid'"""
+        try:
+            key = id(asyncio.current_task())
+        except RuntimeError:
+            key = threading.get_ident()
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = len(self._lanes) + 1
+            if lane > 4096:
+                self._lanes.clear()
+                lane = 1
+            self._lanes[key] = lane
+        return lane
+
+    def _record(self, name: str, start: float, end: float, tags: Optional[Dict]) -> None:
+        record = (
+            name,
+            (start - self._origin) * 1e6,
+            (end - start) * 1e6,
+            self._lane(),
+            tags
+        )
+        with self._lock:
+            self._spans.append(record)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def chrome_trace(self, since: float = 0.0) -> Dict:
+        """Spans that started after ``since`` (perf_counter seconds) as a trace-event document"""
+        since_us = max(0.0, (since - self._origin) * 1e6) if since else 0.0
+        with self._lock:
+            spans = list(self._spans)
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round(start, 1),
+                "dur": round(duration, 1),
+                "pid": pid,
+                "tid": lane,
+                "args": tags or {}
+            }
+            for name, start, duration, lane, tags in spans
+            if start >= since_us
+        ]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"origin_unix": self._origin_wall}
+        }
+
+    def dump(self, path: str, since: float = 0.0) -> str:
+        """Write the buffer (optionally only spans after ``since``) to ``path``"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(since), f, default=str)
+        return path
+
+
+# Process-wide tracer, switched on from config at startup
+tracer = Tracer()